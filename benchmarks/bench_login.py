@@ -0,0 +1,194 @@
+"""
+登录性能基准测试
+
+在本地模拟门户上测量各种登录方式的吞吐量与延迟，无需连接校园网：
+
+    python benchmarks/bench_login.py --logins 200 --latency 0.02 --concurrency 50
+"""
+import argparse
+import asyncio
+import configparser
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from campus_network.core.login import CampusNetworkLogin
+from campus_network.core.async_login import AsyncCampusNetworkLogin
+from campus_network.testing import MockPortalServer
+
+
+class _UnpooledSession:
+    """模拟改造前的行为：每次请求都使用模块级 requests.post 重新建立连接"""
+    def __init__(self, url: str, headers: Dict):
+        self.url = url
+        self.headers = headers
+
+    def post(self, url=None, data=None, timeout=5, **kwargs):
+        return requests.post(url or self.url, headers=self.headers, data=data, timeout=timeout, **kwargs)
+
+    def stats(self) -> Dict:
+        return {}
+
+    def close(self):
+        pass
+
+
+class UnpooledLogin(CampusNetworkLogin):
+    def _create_session(self):
+        return _UnpooledSession(self.url, self.headers)
+
+
+def write_config(directory: str, url: str) -> str:
+    """生成指向模拟门户的配置文件"""
+    config = configparser.ConfigParser()
+    config['Network'] = {
+        'url': url,
+        'user_id': 'bench',
+        'password': 'bench',
+        'service': '教学区免费上网',
+        'auto_login': 'false',
+        'custom_ip': '172.17.0.1'
+    }
+    config['Debug'] = {'enable_packet_capture': 'false'}
+    # 只测登录本身，不保存门户会话也不发送心跳
+    config['Session'] = {'enabled': 'false'}
+    path = os.path.join(directory, 'config.ini')
+    with open(path, 'w', encoding='utf-8') as f:
+        config.write(f)
+    return path
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(name: str, latencies: List[float], attempts: List[int], successes: int, elapsed: float) -> Dict:
+    count = len(latencies)
+    return {
+        'mode': name,
+        'logins': count,
+        'success': successes,
+        'logins_per_sec': count / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'mean_ms': (statistics.mean(latencies) * 1000) if latencies else 0.0,
+        'retries': sum(max(0, a - 1) for a in attempts)
+    }
+
+
+def bench_sync(name: str, client: CampusNetworkLogin, logins: int) -> Dict:
+    """顺序执行同步登录"""
+    latencies, attempts = [], []
+    successes = 0
+    start = time.perf_counter()
+    for _ in range(logins):
+        counter = [0]
+
+        def on_attempt(attempt, success, message, will_retry):
+            counter[0] = attempt
+
+        t0 = time.perf_counter()
+        if client.login(on_attempt=on_attempt):
+            successes += 1
+        latencies.append(time.perf_counter() - t0)
+        attempts.append(counter[0])
+    return summarize(name, latencies, attempts, successes, time.perf_counter() - start)
+
+
+def bench_async(client: AsyncCampusNetworkLogin, logins: int, concurrency: int) -> Dict:
+    """并发执行异步登录"""
+    latencies, attempts = [], []
+    successes = [0]
+
+    async def one(semaphore):
+        async with semaphore:
+            counter = [0]
+
+            def on_attempt(attempt, success, message, will_retry):
+                counter[0] = attempt
+
+            t0 = time.perf_counter()
+            if await client.login(on_attempt=on_attempt):
+                successes[0] += 1
+            latencies.append(time.perf_counter() - t0)
+            attempts.append(counter[0])
+
+    async def run():
+        semaphore = asyncio.Semaphore(concurrency)
+        try:
+            await asyncio.gather(*(one(semaphore) for _ in range(logins)))
+        finally:
+            await client.close()
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    return summarize(f'async x{concurrency}', latencies, attempts, successes[0], time.perf_counter() - start)
+
+
+def print_report(results: List[Dict], server_stats: List[Dict]):
+    header = f"{'模式':<14}{'次数':>6}{'成功':>6}{'登录/秒':>10}{'p50ms':>9}{'p95ms':>9}{'p99ms':>9}{'重试':>6}{'连接':>6}"
+    print(header)
+    print('-' * len(header))
+    for result, stats in zip(results, server_stats):
+        print(f"{result['mode']:<14}{result['logins']:>6}{result['success']:>6}"
+              f"{result['logins_per_sec']:>10.1f}{result['p50_ms']:>9.1f}{result['p95_ms']:>9.1f}"
+              f"{result['p99_ms']:>9.1f}{result['retries']:>6}{stats.get('connections', 0):>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='校园网登录性能基准测试（离线）')
+    parser.add_argument('--logins', type=int, default=200, help='每种模式的登录次数')
+    parser.add_argument('--concurrency', type=int, default=50, help='异步模式并发数')
+    parser.add_argument('--latency', type=float, default=0.01, help='模拟门户固定延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='模拟门户随机延迟上限（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--online-rate', type=float, default=0.0)
+    parser.add_argument('--malformed-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--modes', default='unpooled,pooled,async', help='要测试的模式，逗号分隔')
+    args = parser.parse_args()
+
+    modes = [m.strip() for m in args.modes.split(',') if m.strip()]
+    results, server_stats = [], []
+    with tempfile.TemporaryDirectory() as tmp, \
+            MockPortalServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                             online_rate=args.online_rate, malformed_rate=args.malformed_rate,
+                             seed=args.seed) as server:
+        config_path = write_config(tmp, server.url)
+        for mode in modes:
+            server.reset_stats()
+            # 屏蔽客户端的控制台输出，避免干扰计时
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                if mode == 'unpooled':
+                    client = UnpooledLogin(config_path)
+                    result = bench_sync('sync-unpooled', client, args.logins)
+                elif mode == 'pooled':
+                    client = CampusNetworkLogin(config_path)
+                    result = bench_sync('sync-pooled', client, args.logins)
+                    client.close()
+                elif mode == 'async':
+                    result = bench_async(AsyncCampusNetworkLogin(config_path), args.logins, args.concurrency)
+                else:
+                    continue
+            results.append(result)
+            server_stats.append(server.stats())
+
+    print_report(results, server_stats)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,19 @@
-from .core.login import CampusNetworkLogin
-from .core.startup import startup
-from .gui.main_window import MainWindow
+__version__ = "1.0.0"
 
-__version__ = "1.0.0" 
\ No newline at end of file
+# 按需导入：访问对应名称时才加载子模块，避免无界面场景导入 PySide6
+_LAZY_IMPORTS = {
+    'CampusNetworkLogin': 'campus_network.core.login',
+    'startup': 'campus_network.core.startup',
+    'MainWindow': 'campus_network.gui.main_window',
+}
+
+__all__ = list(_LAZY_IMPORTS)
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        import importlib
+        value = getattr(importlib.import_module(_LAZY_IMPORTS[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
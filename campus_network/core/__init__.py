@@ -1,4 +1,18 @@
-from .login import CampusNetworkLogin
-from .startup import startup
+# 按需导入：aiohttp、pywin32 等依赖只在使用对应功能时才加载
+_LAZY_IMPORTS = {
+    'CampusNetworkLogin': '.login',
+    'AsyncCampusNetworkLogin': '.async_login',
+    'startup': '.startup',
+    'METRICS': '.metrics',
+}
 
-__all__ = ['CampusNetworkLogin', 'startup'] 
\ No newline at end of file
+__all__ = list(_LAZY_IMPORTS)
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        import importlib
+        value = getattr(importlib.import_module(_LAZY_IMPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,461 @@
+import asyncio
+import json
+import time
+from datetime import timedelta
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple, Union
+from urllib.parse import urlencode, urlsplit
+
+import aiohttp
+
+from .portal import PortalCore, PortalClientFacade, config_modified
+from .settings import ClientSettings
+from .retry import RetryPolicy
+from .template import Identity, LoginRequest
+from .keepalive import SessionManager, SessionRecord
+from .probe import OnlineProber, OnlineStatus, ProbeResult, ProbeStrategy, TcpProbe
+from .result import PortalResult
+from .metrics import (METRICS, PHASE_METRIC, LOGIN_METRIC, ATTEMPTS_METRIC, RETRIES_METRIC,
+                      CONNECTIONS_METRIC, SESSION_METRIC)
+
+
+DEFAULT_ASYNC_POOL_SIZE = 100
+
+
+class _AsyncResponse:
+    """已读取完毕的异步响应，接口与 requests.Response 保持一致，便于复用日志记录"""
+    def __init__(self, status_code: int, headers, text: str, elapsed: timedelta):
+        self.status_code = status_code
+        self.headers = headers
+        self.text = text
+        # 发出请求到收到响应头的时间，与 requests.Response.elapsed 含义相同
+        self.elapsed = elapsed
+
+    @property
+    def is_redirect(self) -> bool:
+        return 'Location' in self.headers and self.status_code in (301, 302, 303, 307, 308)
+
+    def json(self):
+        return json.loads(self.text)
+
+
+def _metrics_trace_config() -> aiohttp.TraceConfig:
+    """记录 DNS 解析与新建连接耗时"""
+    async def on_dns_start(session, ctx, params):
+        ctx.dns_started = time.perf_counter()
+
+    async def on_dns_end(session, ctx, params):
+        METRICS.observe(PHASE_METRIC, time.perf_counter() - ctx.dns_started, phase='dns')
+
+    async def on_connect_start(session, ctx, params):
+        ctx.connect_started = time.perf_counter()
+
+    async def on_connect_end(session, ctx, params):
+        METRICS.observe(PHASE_METRIC, time.perf_counter() - ctx.connect_started, phase='connect')
+        METRICS.inc(CONNECTIONS_METRIC)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_dns_resolvehost_start.append(on_dns_start)
+    trace_config.on_dns_resolvehost_end.append(on_dns_end)
+    trace_config.on_connection_create_start.append(on_connect_start)
+    trace_config.on_connection_create_end.append(on_connect_end)
+    return trace_config
+
+
+class AsyncOnlineProber(OnlineProber):
+    """
+    异步在线状态探测
+    与 OnlineProber 使用相同的策略配置与判断规则，请求通过 aiohttp 发送；
+    所有轻量探测都无法判断时才回退到提交登录表单的检测方式
+    """
+    def __init__(self, client, pool_size: int = DEFAULT_ASYNC_POOL_SIZE):
+        self.pool_size = pool_size
+        self._http: Optional[aiohttp.ClientSession] = None
+        super().__init__(client)
+
+    def _get_session(self):
+        """HTTP 探测改用 aiohttp 会话，见 _get_http"""
+        return None
+
+    def _get_http(self) -> aiohttp.ClientSession:
+        """探测使用独立会话，不带门户专用的请求头"""
+        if self._http is None or self._http.closed:
+            self._http = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.pool_size))
+        return self._http
+
+    async def _probe_strategy(self, strategy: ProbeStrategy) -> ProbeResult:
+        start = time.perf_counter()
+        try:
+            if isinstance(strategy, TcpProbe):
+                _, writer = await asyncio.wait_for(asyncio.open_connection(strategy.host, strategy.port),
+                                                   strategy.timeout)
+                writer.close()
+                try:
+                    await writer.wait_closed()
+                except OSError:
+                    # 连接已经建立，关闭时出错不影响结论
+                    pass
+                status, detail = OnlineStatus.ONLINE, f"{strategy.host}:{strategy.port} 可连接"
+            else:
+                timeout = aiohttp.ClientTimeout(total=strategy.timeout)
+                async with self._get_http().get(strategy.url, allow_redirects=False, timeout=timeout) as resp:
+                    text = await resp.text(errors='replace')
+                    status, detail = strategy.classify(_AsyncResponse(resp.status, resp.headers, text, timedelta(0)))
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+            status, detail = strategy.classify_error(e), str(e) or type(e).__name__
+        return ProbeResult(status, strategy.name, time.perf_counter() - start, detail)
+
+    async def probe(self) -> ProbeResult:
+        """探测当前在线状态"""
+        result = ProbeResult(OnlineStatus.UNKNOWN, 'none')
+        for strategy in self.strategies:
+            result = await self._probe_strategy(strategy)
+            if result.is_conclusive:
+                break
+        else:
+            if self.use_login_fallback:
+                start = time.perf_counter()
+                online = await self.client._check_internet_connection()
+                status = OnlineStatus.ONLINE if online else OnlineStatus.CAPTIVE
+                result = ProbeResult(status, 'login', time.perf_counter() - start)
+        self.last_result = result
+        return result
+
+    async def close(self):
+        if self._http is not None and not self._http.closed:
+            await self._http.close()
+        self._http = None
+
+
+class AsyncSessionManager(SessionManager):
+    """异步客户端的门户会话管理：请求通过 aiohttp 发送，心跳作为事件循环中的任务运行"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._task: Optional[asyncio.Task] = None
+
+    def _cookies(self) -> Dict[str, str]:
+        return {cookie.key: cookie.value for cookie in self.client._get_http().cookie_jar}
+
+    def _restore_cookies(self, cookies: Dict[str, str]):
+        self.client._get_http().cookie_jar.update_cookies(cookies)
+
+    async def _call(self, method: str, record: SessionRecord) -> Optional[PortalResult]:
+        """以保存的会话调用门户接口，网络错误时返回 None"""
+        data = urlencode({'method': method, 'userIndex': record.user_index}).encode('ascii')
+        try:
+            response = await self.client._post(data, timeout=self.client.retry_policy.timeout,
+                                               url=self.client.endpoints.preferred)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"门户会话请求失败: {str(e) or type(e).__name__}")
+            METRICS.inc(SESSION_METRIC, action=method, result='network_error')
+            return None
+        result = PortalResult.from_response(response)
+        METRICS.inc(SESSION_METRIC, action=method, result=result.outcome.value)
+        return result
+
+    async def resume(self) -> bool:
+        record = self._current(self.client.settings.user_id)
+        if record is None:
+            return False
+        self._restore_cookies(record.cookies)
+        return self._on_resumed(record, await self._call('getOnlineUserInfo', record))
+
+    async def keepalive(self) -> Optional[bool]:
+        record = self.record
+        if record is None:
+            return None
+        return self._on_keepalive(await self._call('keepalive', record))
+
+    def start(self):
+        """在当前事件循环中启动心跳任务，心跳间隔为 0 时不启动"""
+        if self.keepalive_interval <= 0:
+            return
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self):
+        while True:
+            record = self.record
+            if record is None:
+                return
+            await asyncio.sleep(self.interval(record))
+            alive = await self.keepalive()
+            if alive is False:
+                identity = self._on_expired(record)
+                if identity is None:
+                    return
+                await self.client.login(identity, persist_session=True)
+
+    async def stop(self):
+        """停止心跳任务，已保存的会话保留供下次启动恢复"""
+        task, self._task = self._task, None
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+
+class AsyncCampusNetworkLogin(PortalClientFacade):
+    """
+    校园网络异步登录客户端
+    功能：
+    1. 与 CampusNetworkLogin 共用配置、请求头与登录数据（同一套 PortalCore），但不是它的子类：
+       登录、探测、关闭等方法都是协程
+    2. 基于 aiohttp 的非阻塞请求，单进程即可并发大量登录与探测
+    3. 重试等待使用 asyncio.sleep，不阻塞事件循环
+    """
+    def __init__(self, config_path: Optional[str] = None):
+        self.core = PortalCore(config_path)
+        self.pool_size = self.config.getint('Network', 'async_pool_size', fallback=DEFAULT_ASYNC_POOL_SIZE)
+        # aiohttp 会话在事件循环内按需创建
+        self._http: Optional[aiohttp.ClientSession] = None
+        # 连接复用统计，与同步客户端的 get_connection_stats 返回相同的字段
+        self._requests = 0
+        self._connections = 0
+        # 每次发送门户请求前以实际请求的地址调用，用于按主机限速
+        self.throttle: Optional[Callable[[str], Awaitable[None]]] = None
+        # 轻量级在线状态探测
+        self.prober = self._create_prober()
+        # 门户会话：重启后校验恢复，登录后定期发送心跳
+        self.sessions = self._create_session_manager()
+        self.config_service.subscribe(self._on_config_changed)
+
+    def apply_config(self, changed: Optional[Set[Tuple[str, str]]] = None):
+        """配置修改后调用，与同步客户端相同：更新共用部分、在线探测与会话管理"""
+        self.core.apply_config(changed)
+        if config_modified(changed, 'Probe') or config_modified(changed, 'Network', 'url'):
+            self.prober.reconfigure()
+        if self.sessions is not None and config_modified(changed, 'Session'):
+            self.sessions.reconfigure()
+
+    def _on_config_changed(self, config, changed):
+        """配置文件被修改后热加载，无需重启"""
+        self.core.config = config
+        self.apply_config(changed)
+        self._log(f"配置已重新加载: {', '.join(f'{s}.{k}' for s, k in sorted(changed))}")
+
+    def _create_prober(self) -> AsyncOnlineProber:
+        return AsyncOnlineProber(
+            self, self.config.getint('Network', 'async_pool_size', fallback=DEFAULT_ASYNC_POOL_SIZE))
+
+    def _create_session_manager(self) -> Optional[AsyncSessionManager]:
+        return AsyncSessionManager.from_config(self)
+
+    def _get_http(self) -> aiohttp.ClientSession:
+        """获取（必要时创建）aiohttp 会话"""
+        if self._http is None or self._http.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=30)
+            self._http = aiohttp.ClientSession(headers=self.core.headers, connector=connector,
+                                               trace_configs=[_metrics_trace_config(), self._stats_trace_config()])
+        return self._http
+
+    def _stats_trace_config(self) -> aiohttp.TraceConfig:
+        """统计本客户端发出的请求数与新建连接数"""
+        async def on_request_start(session, ctx, params):
+            self._requests += 1
+
+        async def on_connect_end(session, ctx, params):
+            self._connections += 1
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connect_end)
+        return trace_config
+
+    async def _post(self, data: bytes, timeout, url: Optional[str] = None) -> _AsyncResponse:
+        """发送 POST 请求并读取完整响应，timeout 为 (连接超时, 读取超时)"""
+        connect, read = timeout
+        url = url or self.url
+        if self.throttle is not None:
+            await self.throttle(url)
+        http = self._get_http()
+        client_timeout = aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+        started = time.perf_counter()
+        async with http.post(url, data=data, timeout=client_timeout) as resp:
+            elapsed = timedelta(seconds=time.perf_counter() - started)
+            text = await resp.text(encoding='utf-8')
+            return _AsyncResponse(resp.status, resp.headers, text, elapsed)
+
+    async def _send_login(self, url: str, request: LoginRequest, policy: RetryPolicy,
+                          primary: bool = True):
+        """向指定门户地址发送一次预编译的登录请求，返回 (响应, 解析结果)；primary 表示发往首选地址"""
+        # 记录请求数据包
+        with METRICS.phase('log'):
+            self.core.log_request('POST', url, self.core.headers, request.fields)
+
+        request_started = time.perf_counter()
+        response = await self._post(request.body, timeout=policy.timeout, url=url)
+        self.core.observe_request(request_started, response, primary)
+        with METRICS.phase('parse'):
+            result = PortalResult.from_response(response)
+        return response, result
+
+    async def _race_login(self, identity: Identity, request: LoginRequest, policy: RetryPolicy,
+                          persist_session: bool):
+        """
+        发送登录请求，返回 (响应, 解析结果)
+        多个门户地址时竞速、开启对冲时补发慢请求，已发出的请求稍后成功时与同步版本一样处理
+        """
+        targets, delay = self.hedging.plan(self.endpoints)
+
+        async def send(url):
+            return await self._send_login(url, request, policy, primary=url == targets[0])
+
+        _, (response, result) = await self.endpoints.race_async(
+            send,
+            lambda sent: sent[1].portal_healthy,
+            targets,
+            delay,
+            failover=len(self.endpoints.urls) > 1,
+            on_late=lambda url, sent, won: self._on_duplicate(identity, won[1], sent[1], persist_session),
+            # 只有开启对冲时按分位数补发的请求才计为对冲
+            on_hedge=self.core.on_hedge if self.hedging.enabled else None
+        )
+        return response, result
+
+    def _on_duplicate(self, identity: Identity, winner: PortalResult, result: PortalResult,
+                      persist_session: bool):
+        """落后的请求稍后也登录成功：必要时保存落后请求带回的会话，见 PortalCore.late_success"""
+        if self.core.late_success(winner, result) and persist_session and self.sessions is not None:
+            self.sessions.record_login(identity, result)
+
+    async def login(self, account: Optional[Union[Dict, Identity]] = None, on_attempt=None,
+                    persist_session: Optional[bool] = None) -> bool:
+        """
+        执行登录操作，多个协程可同时调用
+        account: 账号字典或 Identity，为空时使用配置文件中的账号与本机设备信息
+        on_attempt: 每次尝试结束后回调 on_attempt(次数, 是否成功, 说明, 是否还会重试)
+        persist_session: 是否保存门户会话并发送心跳，默认只在使用配置中的账号时保存
+        """
+        if persist_session is None:
+            persist_session = account is None
+        # 本次调用全程使用同一份设置快照
+        settings = self.settings
+        if isinstance(account, Identity):
+            identity = account
+        elif account is None:
+            # 检查账号密码是否已设置
+            if not settings.has_credentials:
+                self._log("错误：请先设置账号和密码")
+                return False
+            identity = self.resolve_identity(settings=settings)
+        elif not account.get('user_id') or not account.get('password'):
+            self._log("错误：账号或密码为空")
+            return False
+        else:
+            identity = self.resolve_identity(account, settings)
+
+        # 熔断器放行的试探请求无论如何结束都会留下结果
+        with self.breaker.attempt():
+            if not self.breaker.allow():
+                self._log(f"认证门户连续失败，暂停登录 {self.breaker.retry_after():.0f} 秒")
+                return False
+
+            with METRICS.timer(LOGIN_METRIC):
+                return await self._login_attempts(settings, identity, on_attempt, persist_session)
+
+    async def _login_attempts(self, settings: ClientSettings, identity: Identity, on_attempt,
+                              persist_session: bool) -> bool:
+        """按重试策略发送登录请求"""
+        policy = settings.retry_policy
+        started = time.monotonic()
+        for attempt in range(1, policy.max_attempts + 1):
+            message = ''
+            retryable = True
+            METRICS.inc(ATTEMPTS_METRIC)
+            try:
+                with METRICS.phase('template'):
+                    request = self.prepare_request(identity)
+
+                # 多个门户地址竞速、慢请求对冲，取最先得到的有效响应
+                response, result = await self._race_login(identity, request, policy, persist_session)
+
+                # 记录响应数据包（与登录判断共用同一次解析）
+                with METRICS.phase('log'):
+                    self.core.log_response(response, result)
+                    self._log(f"尝试第 {attempt} 次登录: {response.text}")
+
+                message = self.core.handle_result(attempt, result, on_attempt)
+                if message is None:
+                    if persist_session and self.sessions is not None:
+                        self.sessions.record_login(identity, result)
+                    return True
+                retryable = policy.should_retry(result)
+
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                message = f"第 {attempt} 次尝试失败: {str(e) or type(e).__name__}"
+                self.core.network_error(message)
+
+            delay = self.core.retry_delay(policy, attempt, started, retryable)
+            if on_attempt:
+                on_attempt(attempt, False, message, delay is not None)
+            if delay is None:
+                return False
+            METRICS.inc(RETRIES_METRIC)
+            self._log(f"等待 {delay:.1f} 秒后重试...")
+            await asyncio.sleep(delay)
+
+    async def check_online(self) -> bool:
+        """轻量检测是否已在线，必要时才回退到提交登录表单的检测"""
+        result = await self.prober.probe()
+        self._log(f"网络状态: {result.status.value} ({result.strategy}, {result.latency * 1000:.0f}ms)")
+        return result.status == OnlineStatus.ONLINE
+
+    async def _check_internet_connection(self) -> bool:
+        """提交登录表单检查网络连接状态（轻量探测的最后回退）"""
+        try:
+            request = self.prepare_request(self.resolve_identity())
+            url = self.endpoints.preferred
+
+            # 记录请求数据包
+            self.core.log_request('POST', url, self.core.headers, request.fields)
+
+            response = await self._post(request.body, timeout=(self.retry_policy.connect_timeout, 3), url=url)
+            # 解析并记录响应数据包
+            return self.core.check_result(response)
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error_msg = f"网络请求失败: {str(e) or type(e).__name__}"
+            print(error_msg)
+            self.core.logger.error(error_msg)
+            return False
+
+    async def resume_session(self) -> bool:
+        """用上次保存的门户会话恢复在线状态，成功时无需完整登录"""
+        return self.sessions is not None and await self.sessions.resume()
+
+    async def ensure_connection(self) -> bool:
+        """确保网络连接"""
+        if await self.resume_session() or await self.check_online():
+            return True
+        return await self.login()
+
+    def get_connection_stats(self) -> Dict:
+        """获取连接池复用统计"""
+        reused = max(0, self._requests - self._connections)
+        return {
+            'host': urlsplit(self.url).netloc,
+            'pool_size': self.pool_size,
+            'requests': self._requests,
+            'connections': self._connections,
+            'reused': reused,
+            'reuse_ratio': (reused / self._requests) if self._requests else 0.0
+        }
+
+    async def close(self):
+        """停止心跳、释放地址池并关闭 aiohttp 会话（需 await，或使用 async with）"""
+        if self.sessions is not None:
+            await self.sessions.stop()
+        self.endpoints.close()
+        await self.prober.close()
+        if self._http is not None and not self._http.closed:
+            await self._http.close()
+        self._http = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
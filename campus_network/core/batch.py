@@ -0,0 +1,180 @@
+import asyncio
+import csv
+import json
+import os
+import sys
+import time
+from typing import Dict, Iterator, Optional, TextIO, Tuple
+from urllib.parse import urlsplit
+
+from .async_login import AsyncCampusNetworkLogin
+from .retry import CircuitBreaker
+
+
+ACCOUNT_FIELDS = ('user_id', 'password', 'ip', 'mac', 'service')
+
+
+def _read_jsonl(f: TextIO) -> Iterator[Tuple[Dict, str]]:
+    """逐行解析 JSONL，返回 (行数据, 错误说明)，格式错误的行数据为空"""
+    for line in f:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield {}, f"JSON 格式错误: {str(e)}"
+            continue
+        if not isinstance(row, dict):
+            yield {}, "每行应为一个 JSON 对象"
+            continue
+        yield row, ''
+
+
+def load_accounts(path: str) -> Iterator[Dict]:
+    """
+    逐行读取批量登录账号
+    支持 CSV（首行为表头）和 JSONL（每行一个 JSON 对象）两种格式，
+    字段为 user_id, password, ip, mac, service，其中 ip/mac/service 可省略
+    无法解析的行不中断读取，以 error 字段说明原因
+    """
+    is_jsonl = os.path.splitext(path)[1].lower() in ('.jsonl', '.json', '.ndjson')
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        if is_jsonl:
+            rows = _read_jsonl(f)
+        else:
+            rows = ((row, '') for row in csv.DictReader(f))
+        for row, error in rows:
+            account = {key: (str(row.get(key)).strip() if row.get(key) is not None else '') for key in ACCOUNT_FIELDS}
+            if error:
+                account['error'] = error
+            yield account
+
+
+class RateLimiter:
+    """令牌桶限速器，限制每秒发往同一主机的请求数"""
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1, int(rate)))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """获取一个令牌，不足时等待"""
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class BatchLoginRunner:
+    """
+    批量多账号/多设备登录
+    功能：
+    1. 限制同时进行的登录数量
+    2. 按实际请求的门户主机限速（包括重试、对冲与竞速请求），避免瞬间压垮认证服务器
+    3. 每完成一行立即输出一条 JSON 结果
+    """
+    def __init__(self, client: AsyncCampusNetworkLogin, concurrency: int = 32, rate: float = 20.0):
+        self.client = client
+        self.concurrency = max(1, int(concurrency))
+        self.rate = rate
+        self._limiters: Dict[str, RateLimiter] = {}
+        client.throttle = self._throttle
+
+    def _get_limiter(self, url: str) -> RateLimiter:
+        """获取目标主机对应的限速器"""
+        host = urlsplit(url).netloc
+        if host not in self._limiters:
+            self._limiters[host] = RateLimiter(self.rate)
+        return self._limiters[host]
+
+    async def _throttle(self, url: str):
+        """每个门户请求发送前按目标主机获取令牌"""
+        await self._get_limiter(url).acquire()
+
+    async def _login_row(self, index: int, account: Dict) -> Dict:
+        """登录单行账号并生成结果"""
+        start = time.perf_counter()
+        error = account.get('error', '')
+        messages = []
+        success = False
+        if not error:
+            try:
+                # 批量账号不是本机账号，不保存门户会话
+                success = await self.client.login(
+                    account, on_attempt=lambda attempt, ok, message, will_retry: messages.append(message),
+                    persist_session=False)
+            except Exception as e:
+                error = str(e)
+            else:
+                if not success:
+                    error = self._failure_reason(messages)
+        return {
+            'line': index,
+            'user_id': account.get('user_id', ''),
+            'ip': account.get('ip', ''),
+            'mac': account.get('mac', ''),
+            'success': success,
+            'elapsed': round(time.perf_counter() - start, 3),
+            'error': error
+        }
+
+    def _failure_reason(self, messages) -> str:
+        """登录失败的原因：最后一次尝试的说明，未发出请求时说明熔断状态"""
+        breaker = self.client.breaker
+        if not messages and breaker.state != CircuitBreaker.CLOSED:
+            return f"认证门户连续失败，暂停登录 {breaker.retry_after():.0f} 秒"
+        return next((message for message in reversed(messages) if message), '') or '登录失败'
+
+    async def run(self, accounts, output: TextIO) -> Dict:
+        """执行批量登录，结果按完成顺序写入 output"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        summary = {'total': 0, 'success': 0, 'failed': 0}
+        tasks = set()
+
+        async def worker(index, account):
+            try:
+                result = await self._login_row(index, account)
+            finally:
+                semaphore.release()
+            summary['success' if result['success'] else 'failed'] += 1
+            output.write(json.dumps(result, ensure_ascii=False) + '\n')
+            output.flush()
+
+        for index, account in enumerate(accounts, 1):
+            # 先占用并发名额再创建任务，避免一次性为整份文件创建协程
+            await semaphore.acquire()
+            summary['total'] += 1
+            task = asyncio.create_task(worker(index, account))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        if tasks:
+            await asyncio.gather(*tasks)
+        return summary
+
+
+def run_batch(input_path: str, output_path: Optional[str] = None,
+              concurrency: int = 32, rate: float = 20.0) -> Dict:
+    """从文件读取账号执行批量登录，output_path 为空时输出到标准输出"""
+    async def _run():
+        output = open(output_path, 'w', encoding='utf-8') if output_path else sys.stdout
+        try:
+            async with AsyncCampusNetworkLogin() as client:
+                runner = BatchLoginRunner(client, concurrency, rate)
+                return await runner.run(load_accounts(input_path), output)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+    summary = asyncio.run(_run())
+    print(f"批量登录完成: 共 {summary['total']} 个，成功 {summary['success']} 个，失败 {summary['failed']} 个")
+    return summary
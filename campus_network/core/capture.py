@@ -0,0 +1,90 @@
+import json
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+
+# 需要脱敏的表单字段
+SENSITIVE_FIELDS = ('password', 'userId')
+
+
+class CaptureRecord:
+    """
+    抓包记录
+    只保存原始请求/响应对象和时间戳，文本在真正被显示或写入时才格式化，
+    格式化结果会被缓存，多个消费者共享同一份文本
+    """
+    kind = ''
+
+    def __init__(self):
+        self.timestamp = time.time()
+        self._text: Optional[str] = None
+
+    def render(self) -> str:
+        """格式化为可读文本"""
+        if self._text is None:
+            self._text = '\n'.join(["\n" + "=" * 50,
+                                    f"时间: {datetime.fromtimestamp(self.timestamp).strftime('%Y-%m-%d %H:%M:%S')}"]
+                                   + self._render_lines())
+        return self._text
+
+    def _render_lines(self):
+        raise NotImplementedError
+
+    def __str__(self):
+        return self.render()
+
+
+class RequestRecord(CaptureRecord):
+    """请求数据包记录"""
+    kind = 'request'
+
+    def __init__(self, method: str, url: str, headers: Dict, data: Optional[Dict] = None):
+        super().__init__()
+        self.method = method
+        self.url = url
+        self.headers = headers
+        self.data = data
+
+    def _render_lines(self):
+        lines = [f"Method: {self.method}", f"URL: {self.url}", "Headers:"]
+        lines.extend(f"  {key}: {value}" for key, value in self.headers.items())
+        if self.data:
+            lines.append("Data:")
+            for key, value in self.data.items():
+                # 对敏感信息进行脱敏
+                if key in SENSITIVE_FIELDS:
+                    value = '*' * len(str(value))
+                lines.append(f"  {key}: {value}")
+        return lines
+
+
+class ResponseRecord(CaptureRecord):
+    """响应数据包记录"""
+    kind = 'response'
+
+    def __init__(self, response, result=None):
+        super().__init__()
+        self.response = response
+        # 调用方已解析的 PortalResult，格式化时直接复用，不再重复解析
+        self.result = result
+
+    def _render_lines(self):
+        response = self.response
+        lines = [f"Status Code: {response.status_code}", "Headers:"]
+        lines.extend(f"  {key}: {value}" for key, value in response.headers.items())
+        if self.result is not None:
+            body = self.result.data
+        else:
+            try:
+                body = json.loads(response.text)
+            except ValueError:
+                body = None
+        if body is not None:
+            # 格式化JSON响应，保留中文
+            lines.append("Body (JSON):")
+            lines.append(json.dumps(body, ensure_ascii=False, indent=2))
+        else:
+            lines.append("Body:")
+            lines.append(response.text)
+        return lines
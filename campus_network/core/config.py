@@ -0,0 +1,344 @@
+import atexit
+import configparser
+import ctypes
+import ctypes.util
+import io
+import os
+import select
+import struct
+import sys
+import threading
+import time
+import weakref
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from .session import DEFAULT_POOL_SIZE
+from .settings import DEFAULT_URL
+
+
+DEFAULT_DEBOUNCE = 0.5
+DEFAULT_POLL_INTERVAL = 2.0
+
+
+def get_config_path() -> str:
+    """获取配置文件路径（程序目录下的 config.ini）"""
+    if getattr(sys, 'frozen', False):
+        # 打包后的路径
+        base_path = os.path.dirname(sys.executable)
+    else:
+        # 开发环境路径
+        base_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return os.path.join(base_path, 'config.ini')
+
+
+def default_config() -> configparser.ConfigParser:
+    """首次运行或配置文件损坏时使用的默认配置"""
+    config = configparser.ConfigParser()
+    config['Network'] = {
+        'url': DEFAULT_URL,
+        'user_id': '',
+        'password': '',
+        'service': '教学区免费上网',
+        'auto_login': 'false',
+        'pool_size': str(DEFAULT_POOL_SIZE)
+    }
+    config['Debug'] = {
+        'enable_packet_capture': 'false'
+    }
+    return config
+
+
+def _to_text(config: configparser.ConfigParser) -> str:
+    buffer = io.StringIO()
+    config.write(buffer)
+    return buffer.getvalue()
+
+
+def _flatten(config: configparser.ConfigParser) -> Dict[Tuple[str, str], str]:
+    return {(section, key): value
+            for section in config.sections()
+            for key, value in config.items(section, raw=True)}
+
+
+class _InotifyWatcher:
+    """基于 inotify 的目录监视（仅 Linux），监视目录以便覆盖“写临时文件再替换”的情况"""
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_CLOEXEC = 0o2000000
+    _EVENT = struct.Struct('iIII')
+
+    def __init__(self, directory: str):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._fd = libc.inotify_init1(self.IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 失败')
+        mask = self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+        if libc.inotify_add_watch(self._fd, os.fsencode(directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, 'inotify_add_watch 失败')
+
+    def wait(self, timeout: float) -> Set[str]:
+        """等待目录变化，返回发生变化的文件名"""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+        data = os.read(self._fd, 64 * 1024)
+        names = set()
+        offset = 0
+        while offset + self._EVENT.size <= len(data):
+            _, _, _, length = self._EVENT.unpack_from(data, offset)
+            offset += self._EVENT.size
+            names.add(os.fsdecode(data[offset:offset + length].rstrip(b'\0')))
+            offset += length
+        return names
+
+    def close(self):
+        os.close(self._fd)
+
+
+class ConfigService:
+    """
+    配置服务
+    功能：
+    1. 同一配置文件在进程内只解析一次，所有客户端共用
+    2. 监视配置文件（Linux 使用 inotify，其他系统轮询），外部修改后热加载并通知订阅者
+    3. 修改配置时合并短时间内的多次写入，写临时文件后原子替换，不阻塞调用方
+    每次变更都生成新的 ConfigParser 并整体替换，读取方拿到的对象不会被修改
+    """
+    def __init__(self, path: str, debounce: float = DEFAULT_DEBOUNCE,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL):
+        self.path = os.path.abspath(path)
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.is_first_run = False
+        self._lock = threading.RLock()
+        self._subscribers = []
+        self._write_timer: Optional[threading.Timer] = None
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._last_text = ''
+        self.config = self._load()
+
+    def _load(self) -> configparser.ConfigParser:
+        """加载配置文件，不存在时创建默认配置"""
+        print(f"尝试加载配置文件: {self.path}")
+        self.is_first_run = not os.path.exists(self.path)
+        if self.is_first_run:
+            print("首次运行，创建默认配置...")
+            config = default_config()
+            try:
+                self._write(config)
+                print(f"配置文件已创建: {self.path}")
+            except OSError as e:
+                print(f"创建配置文件失败: {str(e)}")
+            return config
+
+        try:
+            config = self._read()
+            print("配置文件加载成功")
+            return config
+        except (OSError, configparser.Error) as e:
+            print(f"读取配置文件失败: {str(e)}")
+            # 使用默认配置
+            return default_config()
+
+    def _read(self) -> configparser.ConfigParser:
+        with open(self.path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        config = configparser.ConfigParser()
+        config.read_string(text, source=self.path)
+        self._last_text = text
+        return config
+
+    def subscribe(self, callback: Callable[[configparser.ConfigParser, Set[Tuple[str, str]]], None]):
+        """
+        订阅配置变更，callback(新配置, 变化的 (节, 键) 集合)
+        绑定方法只保存弱引用，客户端释放后自动取消订阅
+        """
+        ref = weakref.WeakMethod(callback) if hasattr(callback, '__self__') else (lambda: callback)
+        with self._lock:
+            self._subscribers.append(ref)
+
+    def _notify(self, config: configparser.ConfigParser, changed: Set[Tuple[str, str]]):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for ref in subscribers:
+            callback = ref()
+            if callback is None:
+                continue
+            try:
+                callback(config, changed)
+            except Exception as e:
+                print(f"应用配置变更失败: {str(e)}")
+        with self._lock:
+            # 清理已释放的客户端
+            self._subscribers = [ref for ref in self._subscribers if ref() is not None]
+
+    def _swap(self, config: configparser.ConfigParser) -> Set[Tuple[str, str]]:
+        """替换当前配置，返回变化的键"""
+        with self._lock:
+            old, self.config = _flatten(self.config), config
+        new = _flatten(config)
+        return {key for key in old.keys() | new.keys() if old.get(key) != new.get(key)}
+
+    def update(self, values: Dict[str, Dict[str, str]], save: bool = True):
+        """
+        修改配置：values 为 {节: {键: 值}}
+        立即对所有订阅者生效，文件在防抖时间后由后台线程写入
+        """
+        with self._lock:
+            config = configparser.ConfigParser()
+            config.read_dict({section: dict(self.config.items(section, raw=True))
+                              for section in self.config.sections()})
+            for section, items in values.items():
+                if not config.has_section(section):
+                    config.add_section(section)
+                for key, value in items.items():
+                    config.set(section, key, str(value))
+            changed = self._swap(config)
+            if save:
+                self.save()
+        if changed:
+            self._notify(config, changed)
+
+    def save(self):
+        """在防抖时间后写入文件，期间的多次保存只写一次"""
+        with self._lock:
+            if self._write_timer is not None:
+                self._write_timer.cancel()
+            self._write_timer = threading.Timer(self.debounce, self.flush)
+            self._write_timer.daemon = True
+            self._write_timer.start()
+
+    def flush(self):
+        """立即写入尚未保存的配置"""
+        with self._lock:
+            if self._write_timer is not None:
+                self._write_timer.cancel()
+                self._write_timer = None
+            config = self.config
+        try:
+            self._write(config)
+        except OSError as e:
+            print(f"保存配置文件失败: {str(e)}")
+
+    def _write(self, config: configparser.ConfigParser):
+        """写临时文件后原子替换，其他进程不会读到写了一半的文件"""
+        text = _to_text(config)
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        for attempt in range(3):
+            try:
+                os.replace(tmp_path, self.path)
+                break
+            except PermissionError:
+                # Windows 上文件正被其他进程读取时替换会失败，稍后重试
+                if attempt == 2:
+                    os.remove(tmp_path)
+                    raise
+                time.sleep(0.1)
+        with self._lock:
+            self._last_text = text
+
+    def reload(self) -> Set[Tuple[str, str]]:
+        """重新读取配置文件，内容有变化时替换并通知订阅者，返回变化的键"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                text = f.read()
+        except OSError:
+            return set()
+        with self._lock:
+            if text == self._last_text:
+                # 本进程刚写入的内容
+                return set()
+        config = configparser.ConfigParser()
+        try:
+            config.read_string(text, source=self.path)
+        except configparser.Error as e:
+            print(f"配置文件格式错误，忽略本次修改: {str(e)}")
+            return set()
+        with self._lock:
+            self._last_text = text
+            changed = self._swap(config)
+        if changed:
+            print(f"配置文件已变更: {', '.join(f'{s}.{k}' for s, k in sorted(changed))}")
+            self._notify(config, changed)
+        return changed
+
+    def watch(self):
+        """在后台线程监视配置文件的外部修改"""
+        with self._lock:
+            if self._watcher is not None:
+                return
+            self._stop_event.clear()
+            # 返回前完成监视注册，之后的修改都不会遗漏
+            inotify = None
+            if sys.platform.startswith('linux'):
+                try:
+                    inotify = _InotifyWatcher(os.path.dirname(self.path))
+                except (OSError, AttributeError) as e:
+                    print(f"无法使用 inotify 监视配置文件，改为轮询: {str(e)}")
+            self._watcher = threading.Thread(target=self._watch_loop, args=(inotify, self._stat()),
+                                             name='ConfigWatcher', daemon=True)
+            self._watcher.start()
+
+    def _watch_loop(self, inotify: Optional[_InotifyWatcher], last):
+        name = os.path.basename(self.path)
+        try:
+            if inotify is not None:
+                while not self._stop_event.is_set():
+                    if name in inotify.wait(1.0):
+                        # 等待写入方完成后再读取
+                        self._stop_event.wait(0.2)
+                        self.reload()
+            else:
+                while not self._stop_event.wait(self.poll_interval):
+                    current = self._stat()
+                    if current != last:
+                        last = current
+                        self.reload()
+        finally:
+            if inotify is not None:
+                inotify.close()
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def stop(self):
+        """停止监视并写入尚未保存的配置"""
+        self._stop_event.set()
+        with self._lock:
+            watcher, self._watcher = self._watcher, None
+            pending = self._write_timer is not None
+        if watcher is not None:
+            watcher.join(timeout=2)
+        if pending:
+            self.flush()
+
+
+_services: Dict[str, ConfigService] = {}
+_services_lock = threading.Lock()
+
+
+def get_config_service(path: Optional[str] = None) -> ConfigService:
+    """获取配置文件对应的配置服务，同一文件在进程内共用一个实例"""
+    path = os.path.abspath(path or get_config_path())
+    with _services_lock:
+        service = _services.get(path)
+        if service is None:
+            service = _services[path] = ConfigService(path)
+            # 退出前写入防抖中尚未保存的配置
+            atexit.register(service.stop)
+        return service
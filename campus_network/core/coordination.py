@@ -0,0 +1,408 @@
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import socket
+import sys
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from .launcher import APP_NAME
+
+
+DEFAULT_PORT = 47831
+DEFAULT_STATUS_TTL = 30.0
+DEFAULT_LOGIN_TIMEOUT = 120.0
+SECRET_FILE = 'coordination.key'
+# 单条协调消息的最大长度
+MAX_MESSAGE_SIZE = 65536
+
+
+def default_status_dir() -> str:
+    """
+    共享状态文件所在目录，只对当前用户可写：
+    Linux 优先使用 XDG_RUNTIME_DIR，Windows 使用 LOCALAPPDATA，其他情况使用用户缓存目录
+    不使用公共的 /tmp，避免其他用户伪造“已在线”状态阻止登录
+    """
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+        return os.path.join(base, APP_NAME)
+    runtime = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime and os.path.isdir(runtime):
+        return os.path.join(runtime, APP_NAME)
+    cache = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache, APP_NAME)
+
+
+def load_secret(directory: str) -> bytes:
+    """
+    读取本机实例间通信的密钥，首次使用时生成，文件只对当前用户可读写
+    其他用户或进程没有密钥，即使抢先占用端口也无法冒充主实例，也无法请求登录
+    """
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    path = os.path.join(directory, SECRET_FILE)
+    if not os.path.exists(path):
+        # 先写临时文件再硬链接到目标位置，同时启动的实例只有一个能创建成功，且不会读到空文件
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='ascii') as f:
+            f.write(secrets.token_hex(32))
+        try:
+            os.link(tmp_path, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp_path)
+    with open(path, 'r', encoding='ascii') as f:
+        if hasattr(os, 'getuid'):
+            stat = os.fstat(f.fileno())
+            if stat.st_uid != os.getuid() or stat.st_mode & 0o077:
+                raise PermissionError(f"协调密钥文件不属于当前用户或权限过宽: {path}")
+        secret = f.read().strip()
+    if not secret:
+        raise OSError(f"协调密钥文件为空: {path}")
+    return secret.encode('ascii')
+
+
+class HostStatusCache:
+    """
+    本机共享的最近网络状态
+    保存在当前用户目录下的 JSON 文件中，该用户的所有实例共用；超过有效期视为未知
+    """
+    def __init__(self, path: Optional[str] = None, ttl: float = DEFAULT_STATUS_TTL):
+        if not path:
+            directory = default_status_dir()
+            try:
+                os.makedirs(directory, mode=0o700, exist_ok=True)
+            except OSError as e:
+                print(f"创建共享状态目录失败: {str(e)}")
+            path = os.path.join(directory, 'status.json')
+        self.path = path
+        self.ttl = ttl
+
+    def read(self) -> Optional[Dict]:
+        """读取未过期的状态，没有或已过期返回 None"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                status = json.load(f)
+            if time.time() - status['timestamp'] <= self.ttl:
+                return status
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return None
+
+    def write(self, online: bool, source: str = '') -> Dict:
+        """写入状态（先写临时文件再替换，读取方不会读到半个文件）"""
+        status = {'online': online, 'timestamp': time.time(), 'pid': os.getpid(), 'source': source}
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        try:
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(status, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"写入共享状态失败: {str(e)}")
+        return status
+
+
+class HostCoordinator:
+    """
+    本机多实例协调
+    功能：
+    1. 通过独占本地端口选出一个负责登录的主实例
+    2. 其他实例把登录请求转交给主实例，同一时间只有一次门户登录
+    3. 其他实例可订阅主实例推送的网络状态
+    4. 主实例退出后，下一个需要登录或正在订阅的实例接管
+    所有消息都用状态目录中只对当前用户可读的密钥签名，双方都校验，未签名或签名错误的消息直接丢弃
+    """
+    def __init__(self, port: int = DEFAULT_PORT, cache: Optional[HostStatusCache] = None,
+                 login_timeout: float = DEFAULT_LOGIN_TIMEOUT, secret: Optional[bytes] = None):
+        self.port = port
+        self.cache = cache or HostStatusCache()
+        self.login_timeout = login_timeout
+        self.secret = secret if secret is not None else load_secret(os.path.dirname(os.path.abspath(self.cache.path)))
+        self._server: Optional[socket.socket] = None
+        self._login_func: Optional[Callable[[], bool]] = None
+        self._lock = threading.Lock()
+        self._flight: Optional[Dict] = None
+        self._subscribers = []
+        self._stop_event = threading.Event()
+
+    @classmethod
+    def from_config(cls, config) -> Optional['HostCoordinator']:
+        """从配置文件 [Coordination] 节创建，关闭协调或无法读取密钥时返回 None"""
+        if not config.getboolean('Coordination', 'enabled', fallback=True):
+            return None
+        cache = HostStatusCache(
+            config.get('Coordination', 'status_file', fallback=None),
+            config.getfloat('Coordination', 'status_ttl', fallback=DEFAULT_STATUS_TTL)
+        )
+        try:
+            return cls(
+                config.getint('Coordination', 'port', fallback=DEFAULT_PORT),
+                cache,
+                config.getfloat('Coordination', 'login_timeout', fallback=DEFAULT_LOGIN_TIMEOUT)
+            )
+        except OSError as e:
+            print(f"读取协调密钥失败，不与本机其他实例协调: {str(e)}")
+            return None
+
+    def _sign(self, scope: str, body: str) -> str:
+        return hmac.new(self.secret, f'{scope}\n{body}'.encode('utf-8'), hashlib.sha256).hexdigest()
+
+    def _pack(self, scope: str, message: Dict) -> bytes:
+        """编码一条带签名的消息；scope 区分请求与各连接的回复，防止把一种消息当作另一种"""
+        body = json.dumps(message)
+        return (json.dumps({'msg': body, 'mac': self._sign(scope, body)}) + '\n').encode('utf-8')
+
+    def _unpack(self, scope: str, line) -> Optional[Dict]:
+        """解码并校验一条消息，签名不符或格式错误返回 None"""
+        try:
+            envelope = json.loads(line)
+            body = envelope['msg']
+            if not hmac.compare_digest(self._sign(scope, body), str(envelope['mac'])):
+                return None
+            message = json.loads(body)
+        except (ValueError, KeyError, TypeError):
+            return None
+        return message if isinstance(message, dict) else None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._server is not None
+
+    def acquire(self, login_func: Callable[[], bool]) -> bool:
+        """尝试成为主实例，login_func 用于替其他实例执行登录"""
+        with self._lock:
+            if self._server is not None:
+                return True
+            server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            if hasattr(socket, 'SO_EXCLUSIVEADDRUSE'):
+                # Windows：禁止其他进程共用同一端口
+                server.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+            else:
+                # 其他系统：监听中的端口仍无法重复绑定，只是允许复用 TIME_WAIT 状态的端口
+                server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            try:
+                server.bind(('127.0.0.1', self.port))
+                server.listen(16)
+            except OSError:
+                server.close()
+                return False
+            self._server = server
+            self._login_func = login_func
+            self._stop_event.clear()
+        threading.Thread(target=self._accept_loop, name='CoordinatorServer', daemon=True).start()
+        return True
+
+    def release(self):
+        """放弃主实例身份并停止订阅"""
+        self._stop_event.set()
+        with self._lock:
+            server, self._server = self._server, None
+            subscribers, self._subscribers = self._subscribers, []
+        conns = [conn for conn, _ in subscribers]
+        if server is not None:
+            conns.append(server)
+        for conn in conns:
+            try:
+                # 先 shutdown 才能唤醒阻塞在 accept/recv 上的线程
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            conn.close()
+
+    def _accept_loop(self):
+        server = self._server
+        while server is not None and not self._stop_event.is_set():
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._handle, args=(conn,), name='CoordinatorClient', daemon=True).start()
+
+    def _handle(self, conn: socket.socket):
+        """处理其他实例的请求：login 转交登录，subscribe 订阅状态推送；未通过校验的请求直接关闭"""
+        try:
+            conn.settimeout(5.0)
+            line = conn.makefile('r', encoding='utf-8').readline(MAX_MESSAGE_SIZE)
+            conn.settimeout(None)
+        except (OSError, ValueError):
+            conn.close()
+            return
+        request = self._unpack('request', line)
+        nonce = request.get('nonce') if request is not None else None
+        if not isinstance(nonce, str) or not nonce:
+            conn.close()
+            return
+
+        if request.get('op') == 'subscribe':
+            with self._lock:
+                self._subscribers.append((conn, nonce))
+            status = self.cache.read()
+            if status is not None:
+                self._send(conn, nonce, status)
+            return
+
+        try:
+            if request.get('op') == 'login':
+                status = self.cache.read() if request.get('use_cache', True) else None
+                if status is not None and status['online']:
+                    online = True
+                else:
+                    online = self.single_flight(self._login_func)
+                self._send(conn, nonce, {'online': online})
+        finally:
+            conn.close()
+
+    def _send(self, conn: socket.socket, nonce: str, message: Dict) -> bool:
+        """向请求方发送回复，以请求中的随机数签名"""
+        try:
+            conn.sendall(self._pack(f'reply:{nonce}', message))
+            return True
+        except OSError:
+            return False
+
+    def single_flight(self, login_func: Callable[[], bool]) -> bool:
+        """执行登录；已有登录在进行时等待并共享其结果，不重复请求门户"""
+        with self._lock:
+            flight = self._flight
+            owner = flight is None
+            if owner:
+                flight = self._flight = {'done': threading.Event(), 'online': False}
+        if not owner:
+            flight['done'].wait()
+            return flight['online']
+
+        online = False
+        try:
+            online = bool(login_func())
+        finally:
+            flight['online'] = online
+            with self._lock:
+                self._flight = None
+            flight['done'].set()
+            self.publish(online, 'login')
+        return online
+
+    def publish(self, online: bool, source: str = ''):
+        """更新共享状态，主实例同时推送给所有订阅者"""
+        status = self.cache.write(online, source)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        dead = [sub for sub in subscribers if not self._send(sub[0], sub[1], status)]
+        if dead:
+            with self._lock:
+                self._subscribers = [sub for sub in self._subscribers if sub not in dead]
+
+    def _connect(self, timeout: float = 1.0) -> Optional[socket.socket]:
+        try:
+            return socket.create_connection(('127.0.0.1', self.port), timeout=timeout)
+        except OSError:
+            return None
+
+    def request_login(self, cancel_event: Optional[threading.Event] = None,
+                      use_cache: bool = True) -> Optional[bool]:
+        """请主实例登录并等待结果；无法联系主实例、回复未通过校验或被取消时返回 None"""
+        conn = self._connect()
+        if conn is None:
+            return None
+        deadline = time.monotonic() + self.login_timeout
+        nonce = secrets.token_hex(16)
+        buffer = b''
+        try:
+            conn.sendall(self._pack('request', {'op': 'login', 'use_cache': use_cache, 'nonce': nonce}))
+            conn.settimeout(0.5)
+            while b'\n' not in buffer:
+                if (cancel_event is not None and cancel_event.is_set()) or time.monotonic() > deadline:
+                    return None
+                try:
+                    chunk = conn.recv(4096)
+                except socket.timeout:
+                    continue
+                if not chunk or len(buffer) > MAX_MESSAGE_SIZE:
+                    return None
+                buffer += chunk
+            reply = self._unpack(f'reply:{nonce}', buffer.split(b'\n', 1)[0])
+            if reply is None:
+                print("负责登录的实例回复未通过校验，忽略")
+                return None
+            return bool(reply['online'])
+        except (OSError, ValueError, KeyError):
+            return None
+        finally:
+            conn.close()
+
+    def subscribe(self, callback: Callable[[Dict], None],
+                  login_func: Optional[Callable[[], bool]] = None) -> threading.Thread:
+        """
+        在后台线程订阅主实例推送的状态，callback(status) 在该线程中调用
+        主实例退出后，若提供了 login_func 则尝试接管为主实例
+        """
+        thread = threading.Thread(target=self._subscribe_loop, args=(callback, login_func),
+                                  name='CoordinatorSubscriber', daemon=True)
+        thread.start()
+        return thread
+
+    def _subscribe_loop(self, callback, login_func):
+        while not self._stop_event.is_set():
+            if login_func is not None and self.acquire(login_func):
+                return
+            conn = self._connect()
+            if conn is None:
+                self._stop_event.wait(1.0)
+                continue
+            nonce = secrets.token_hex(16)
+            try:
+                conn.settimeout(None)
+                conn.sendall(self._pack('request', {'op': 'subscribe', 'nonce': nonce}))
+                for line in conn.makefile('r', encoding='utf-8'):
+                    status = self._unpack(f'reply:{nonce}', line)
+                    if status is not None:
+                        callback(status)
+            except OSError:
+                pass
+            finally:
+                conn.close()
+            self._stop_event.wait(1.0)
+
+
+def coordinated_login(client, coordinator: Optional[HostCoordinator],
+                      cancel_event: Optional[threading.Event] = None,
+                      on_attempt=None, use_cache: bool = True) -> bool:
+    """
+    与本机其他实例协调后登录
+    1. 共享状态显示其他实例刚确认在线时直接返回
+    2. 成为主实例后自己登录，期间其他实例的登录请求共享本次结果
+    3. 已有主实例时转交给主实例登录；联系不上主实例才自己登录
+    use_cache 为真时（启动与自动登录）还会先尝试恢复上次保存的门户会话
+    """
+    if use_cache:
+        status = coordinator.cache.read() if coordinator is not None else None
+        if status is not None and status['online']:
+            client._log(f"本机其他实例 {time.time() - status['timestamp']:.0f} 秒前已确认在线，跳过登录")
+            return True
+        if client.resume_session():
+            if coordinator is not None:
+                coordinator.publish(True, 'session')
+            return True
+
+    if coordinator is None:
+        return client.login(cancel_event=cancel_event, on_attempt=on_attempt)
+
+    if coordinator.acquire(client.login):
+        return coordinator.single_flight(
+            lambda: client.login(cancel_event=cancel_event, on_attempt=on_attempt))
+
+    client._log("本机已有实例负责登录，等待其结果...")
+    online = coordinator.request_login(cancel_event, use_cache)
+    if online is not None:
+        client._log("其他实例登录成功" if online else "其他实例登录失败")
+        return online
+    if cancel_event is not None and cancel_event.is_set():
+        client._log("登录已取消")
+        return False
+    client._log("无法联系负责登录的实例，自行登录")
+    return client.login(cancel_event=cancel_event, on_attempt=on_attempt)
@@ -0,0 +1,367 @@
+import asyncio
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+DEFAULT_RACE_DELAY = 0.25
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_COOLDOWN = 30.0
+DEFAULT_RACE_WORKERS = 32
+# 延迟滑动平均中新样本的权重
+LATENCY_ALPHA = 0.3
+
+
+def parse_endpoints(value: str) -> Tuple[str, ...]:
+    """解析逗号或换行分隔的门户地址列表，去掉重复项并保持顺序"""
+    urls = []
+    for url in re.split(r'[\s,]+', value or ''):
+        if url and url not in urls:
+            urls.append(url)
+    return tuple(urls)
+
+
+class EndpointHealth:
+    """单个门户地址的健康状态"""
+    __slots__ = ('url', 'latency', 'failures', 'down_until')
+
+    def __init__(self, url: str):
+        self.url = url
+        self.latency: Optional[float] = None
+        self.failures = 0
+        self.down_until = 0.0
+
+    def record_success(self, latency: float):
+        self.latency = latency if self.latency is None else \
+            self.latency + LATENCY_ALPHA * (latency - self.latency)
+        self.failures = 0
+        self.down_until = 0.0
+
+    def record_failure(self, threshold: int, cooldown: float):
+        self.failures += 1
+        if self.failures >= threshold:
+            self.down_until = time.monotonic() + cooldown
+
+    @property
+    def available(self) -> bool:
+        return self.down_until <= time.monotonic()
+
+    def __repr__(self):
+        latency = 'n/a' if self.latency is None else f'{self.latency * 1000:.0f}ms'
+        return f"EndpointHealth({self.url}, {latency}, failures={self.failures})"
+
+
+class EndpointPool:
+    """
+    门户地址池
+    功能：
+    1. 记录每个地址的响应延迟与连续失败次数，连续失败的地址暂停使用一段时间
+    2. 按延迟排序，记住最快的地址，下次优先使用
+    3. 竞速发送请求：先请求最优地址，超过 race_delay 未响应或失败时再请求下一个，
+       取最先得到的有效响应，其余请求不再等待
+    4. 尚未测得延迟的地址在竞速时与最优地址同时请求，避免更快的新地址一直得不到测量
+    """
+    def __init__(self, urls: Sequence[str], race_delay: float = DEFAULT_RACE_DELAY,
+                 failure_threshold: int = DEFAULT_FAILURE_THRESHOLD, cooldown: float = DEFAULT_COOLDOWN,
+                 max_workers: int = DEFAULT_RACE_WORKERS):
+        self.race_delay = race_delay
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.max_workers = max(1, max_workers)
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # race_async 中仍在进行的落后请求，保留引用直到完成
+        self._late_tasks = set()
+        self._health: Dict[str, EndpointHealth] = {}
+        self.update(urls)
+
+    @classmethod
+    def from_config(cls, config, urls: Sequence[str]) -> 'EndpointPool':
+        """按配置文件 [Endpoints] 节创建"""
+        return cls(
+            urls,
+            config.getfloat('Endpoints', 'race_delay', fallback=DEFAULT_RACE_DELAY),
+            config.getint('Endpoints', 'failure_threshold', fallback=DEFAULT_FAILURE_THRESHOLD),
+            config.getfloat('Endpoints', 'cooldown', fallback=DEFAULT_COOLDOWN),
+            config.getint('Endpoints', 'race_workers', fallback=DEFAULT_RACE_WORKERS)
+        )
+
+    def reconfigure(self, config):
+        """配置修改后更新竞速与暂停参数，保留各地址的健康状态；竞速线程数在重建线程池后生效"""
+        self.race_delay = config.getfloat('Endpoints', 'race_delay', fallback=DEFAULT_RACE_DELAY)
+        self.failure_threshold = max(1, config.getint('Endpoints', 'failure_threshold',
+                                                      fallback=DEFAULT_FAILURE_THRESHOLD))
+        self.cooldown = config.getfloat('Endpoints', 'cooldown', fallback=DEFAULT_COOLDOWN)
+
+    @property
+    def urls(self) -> Tuple[str, ...]:
+        return tuple(self._health)
+
+    def update(self, urls: Sequence[str]):
+        """更换地址列表，保留仍在列表中的地址的健康状态"""
+        with self._lock:
+            self._health = {url: self._health.get(url) or EndpointHealth(url) for url in urls}
+
+    def health(self) -> List[EndpointHealth]:
+        return list(self._health.values())
+
+    def ordered(self) -> List[str]:
+        """
+        可用地址按延迟从低到高排列，未测得延迟的按配置顺序排在其后，暂停中的放在最后
+        第一个未测得延迟的可用地址提前到第二位，竞速时与最优地址同时请求（见 _explores）
+        """
+        health = list(self._health.values())
+        ranked = sorted(
+            range(len(health)),
+            key=lambda i: (not health[i].available, health[i].latency is None, health[i].latency or 0.0, i)
+        )
+        measured = sum(1 for h in health if h.available and h.latency is not None)
+        if 1 < measured < len(ranked) and health[ranked[measured]].available:
+            ranked.insert(1, ranked.pop(measured))
+        return [health[i].url for i in ranked]
+
+    def _explores(self, targets: Sequence[str]) -> bool:
+        """第一个地址已测得延迟、第二个地址尚未测得时，两个地址同时请求"""
+        if len(targets) < 2 or targets[0] == targets[1]:
+            return False
+        first, second = self._health.get(targets[0]), self._health.get(targets[1])
+        return (first is not None and second is not None and first.latency is not None
+                and second.latency is None and second.available)
+
+    @property
+    def preferred(self) -> str:
+        """当前最优的地址"""
+        return self.ordered()[0]
+
+    def record_success(self, url: str, latency: float):
+        health = self._health.get(url)
+        if health is not None:
+            health.record_success(latency)
+
+    def record_failure(self, url: str):
+        health = self._health.get(url)
+        if health is not None:
+            health.record_failure(self.failure_threshold, self.cooldown)
+
+    def _record(self, url: str, accepted: bool, latency: float):
+        if accepted:
+            self.record_success(url, latency)
+        else:
+            self.record_failure(url)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='EndpointRace')
+            return self._executor
+
+    def race(self, send: Callable[[str], Any], accept: Callable[[Any], bool],
+             targets: Optional[Sequence[str]] = None,
+             delay: Optional[float] = None, failover: bool = True,
+             on_late: Optional[Callable[[str, Any, Any], None]] = None,
+             on_hedge: Optional[Callable[[str, str], None]] = None) -> Tuple[str, Any]:
+        """
+        竞速发送请求，返回 (地址, 结果)
+        send(url) 发送请求并返回结果；accept(result) 判断结果是否有效
+        targets 可重复同一地址（对冲请求）；failover 为假时出错不提前发送下一个请求
+        on_late(url, result, winner) 在落后的请求稍后得到有效结果时调用，winner 为先返回的结果
+        on_hedge(event, url) 只针对因等待超过 delay 而补发的请求：补发时 event 为 'sent'，
+        其结果被采用时为 'won'；出错后改发的请求与同时测量新地址的请求不算在内
+        所有地址都没有有效结果时返回最后一个结果，全部出错时抛出最后一个异常
+        """
+        targets = list(targets) if targets is not None else self.ordered()
+        delay = self.race_delay if delay is None else delay
+        if len(targets) == 1:
+            # 只有一个地址时直接在当前线程发送
+            url = targets[0]
+            started = time.perf_counter()
+            try:
+                result = send(url)
+            except Exception:
+                self.record_failure(url)
+                raise
+            self._record(url, accept(result), time.perf_counter() - started)
+            return url, result
+
+        def timed(url: str):
+            started = time.perf_counter()
+            return send(url), time.perf_counter() - started
+
+        def settle(future: Future, url: str, winner: Any):
+            # 落后的请求完成后仍记录其健康状态
+            if future.cancelled():
+                return
+            try:
+                result, latency = future.result()
+            except Exception:
+                self.record_failure(url)
+                return
+            accepted = accept(result)
+            self._record(url, accepted, latency)
+            if accepted and on_late is not None:
+                on_late(url, result, winner)
+
+        executor = self._get_executor()
+        pending: Dict[Future, str] = {}
+        # 因等待超时而补发的请求
+        hedges = set()
+        fallback: Optional[Tuple[str, Any]] = None
+        error: Optional[BaseException] = None
+        index = 0
+        if self._explores(targets):
+            # 未测得延迟的地址与最优地址同时请求
+            for url in targets[:2]:
+                pending[executor.submit(timed, url)] = url
+            index = 2
+        # 上一个地址出错或响应无效时不再等待，立即请求下一个
+        start_next = not pending
+        while index < len(targets) or pending:
+            if index < len(targets) and (start_next or not pending):
+                if index and not pending and not failover:
+                    # 对冲请求只在响应慢时补发，出错交由调用方按重试策略处理
+                    break
+                start_next = False
+                pending[executor.submit(timed, targets[index])] = targets[index]
+                index += 1
+            done, _ = wait(pending, timeout=delay if index < len(targets) else None,
+                           return_when=FIRST_COMPLETED)
+            if not done:
+                # 当前地址迟迟未响应，再请求下一个地址
+                future = executor.submit(timed, targets[index])
+                pending[future] = targets[index]
+                hedges.add(future)
+                if on_hedge is not None:
+                    on_hedge('sent', targets[index])
+                index += 1
+                continue
+            for future in done:
+                url = pending.pop(future)
+                try:
+                    result, latency = future.result()
+                except Exception as e:
+                    self.record_failure(url)
+                    error = e
+                    start_next = failover
+                    continue
+                accepted = accept(result)
+                self._record(url, accepted, latency)
+                if accepted:
+                    for other, other_url in pending.items():
+                        if not other.cancel():
+                            other.add_done_callback(lambda f, u=other_url: settle(f, u, result))
+                    if future in hedges and on_hedge is not None:
+                        on_hedge('won', url)
+                    return url, result
+                fallback = (url, result)
+                start_next = failover
+        if fallback is not None:
+            return fallback
+        raise error
+
+    async def race_async(self, send: Callable[[str], Awaitable[Any]], accept: Callable[[Any], bool],
+                         targets: Optional[Sequence[str]] = None,
+                         delay: Optional[float] = None, failover: bool = True,
+                         on_late: Optional[Callable[[str, Any, Any], None]] = None,
+                         on_hedge: Optional[Callable[[str, str], None]] = None) -> Tuple[str, Any]:
+        """
+        race 的异步版本，得到有效结果后取消其余请求
+        给出 on_late 时不取消已发出的请求，等其完成后与 race 一样记录健康状态并回调
+        """
+        targets = list(targets) if targets is not None else self.ordered()
+        delay = self.race_delay if delay is None else delay
+
+        async def timed(url: str):
+            started = time.perf_counter()
+            return await send(url), time.perf_counter() - started
+
+        if len(targets) == 1:
+            url = targets[0]
+            try:
+                result, latency = await timed(url)
+            except Exception:
+                self.record_failure(url)
+                raise
+            self._record(url, accept(result), latency)
+            return url, result
+
+        def settle(task: asyncio.Task, url: str, winner: Any):
+            self._late_tasks.discard(task)
+            if task.cancelled():
+                return
+            try:
+                result, latency = task.result()
+            except Exception:
+                self.record_failure(url)
+                return
+            accepted = accept(result)
+            self._record(url, accepted, latency)
+            if accepted:
+                on_late(url, result, winner)
+
+        pending: Dict[asyncio.Task, str] = {}
+        hedges = set()
+        fallback: Optional[Tuple[str, Any]] = None
+        error: Optional[BaseException] = None
+        index = 0
+        if self._explores(targets):
+            for url in targets[:2]:
+                pending[asyncio.ensure_future(timed(url))] = url
+            index = 2
+        start_next = not pending
+        try:
+            while index < len(targets) or pending:
+                if index < len(targets) and (start_next or not pending):
+                    if index and not pending and not failover:
+                        break
+                    start_next = False
+                    pending[asyncio.ensure_future(timed(targets[index]))] = targets[index]
+                    index += 1
+                done, _ = await asyncio.wait(pending, timeout=delay if index < len(targets) else None,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    task = asyncio.ensure_future(timed(targets[index]))
+                    pending[task] = targets[index]
+                    hedges.add(task)
+                    if on_hedge is not None:
+                        on_hedge('sent', targets[index])
+                    index += 1
+                    continue
+                for task in done:
+                    url = pending.pop(task)
+                    try:
+                        result, latency = task.result()
+                    except Exception as e:
+                        self.record_failure(url)
+                        error = e
+                        start_next = failover
+                        continue
+                    accepted = accept(result)
+                    self._record(url, accepted, latency)
+                    if accepted:
+                        if on_late is not None:
+                            # 已发出的请求可能已被门户处理，等其完成后交给调用方
+                            for other, other_url in pending.items():
+                                self._late_tasks.add(other)
+                                other.add_done_callback(lambda t, u=other_url: settle(t, u, result))
+                            pending.clear()
+                        if task in hedges and on_hedge is not None:
+                            on_hedge('won', url)
+                        return url, result
+                    fallback = (url, result)
+                    start_next = failover
+        finally:
+            for task in pending:
+                task.cancel()
+        if fallback is not None:
+            return fallback
+        raise error
+
+    def close(self):
+        for task in list(self._late_tasks):
+            task.cancel()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
@@ -0,0 +1,74 @@
+import threading
+from collections import deque
+from typing import List, Optional, Tuple
+
+from .endpoints import EndpointPool
+
+
+DEFAULT_HEDGE_PERCENTILE = 95.0
+DEFAULT_HEDGE_WINDOW = 200
+DEFAULT_HEDGE_MIN_SAMPLES = 20
+DEFAULT_HEDGE_INITIAL_DELAY = 1.0
+DEFAULT_HEDGE_MIN_DELAY = 0.05
+
+
+class HedgePolicy:
+    """
+    登录请求对冲
+    功能：
+    1. 记录最近若干次门户请求的耗时
+    2. 请求超过近期耗时的指定分位数仍未响应时，在另一个连接上补发一次相同请求，取先返回的结果
+    3. 样本不足时使用固定的初始等待时间
+    """
+    def __init__(self, enabled: bool = False, percentile: float = DEFAULT_HEDGE_PERCENTILE,
+                 window: int = DEFAULT_HEDGE_WINDOW, min_samples: int = DEFAULT_HEDGE_MIN_SAMPLES,
+                 initial_delay: float = DEFAULT_HEDGE_INITIAL_DELAY, min_delay: float = DEFAULT_HEDGE_MIN_DELAY):
+        self.enabled = enabled
+        self.percentile = min(100.0, max(0.0, percentile))
+        self.min_samples = max(1, min_samples)
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=max(1, window))
+
+    @classmethod
+    def from_config(cls, config) -> 'HedgePolicy':
+        """从配置文件 [Hedging] 节读取"""
+        return cls(
+            enabled=config.getboolean('Hedging', 'enabled', fallback=False),
+            percentile=config.getfloat('Hedging', 'percentile', fallback=DEFAULT_HEDGE_PERCENTILE),
+            window=config.getint('Hedging', 'window', fallback=DEFAULT_HEDGE_WINDOW),
+            min_samples=config.getint('Hedging', 'min_samples', fallback=DEFAULT_HEDGE_MIN_SAMPLES),
+            initial_delay=config.getfloat('Hedging', 'initial_delay', fallback=DEFAULT_HEDGE_INITIAL_DELAY),
+            min_delay=config.getfloat('Hedging', 'min_delay', fallback=DEFAULT_HEDGE_MIN_DELAY)
+        )
+
+    def record(self, latency: float):
+        """记录一次完成的门户请求耗时"""
+        with self._lock:
+            self._samples.append(latency)
+
+    def samples(self) -> List[float]:
+        with self._lock:
+            return list(self._samples)
+
+    def delay(self) -> float:
+        """补发前的等待时间：近期耗时的分位数"""
+        samples = sorted(self.samples())
+        if len(samples) < self.min_samples:
+            return self.initial_delay
+        index = min(len(samples) - 1, int(len(samples) * self.percentile / 100))
+        return max(self.min_delay, samples[index])
+
+    def plan(self, endpoints: EndpointPool) -> Tuple[List[str], Optional[float]]:
+        """
+        本次请求的目标地址与补发等待时间
+        只有一个门户地址时对同一地址补发；多个地址时按分位数提前请求下一个地址
+        未开启时使用地址池默认的竞速方式
+        """
+        targets = endpoints.ordered()
+        if not self.enabled:
+            return targets, None
+        if len(targets) == 1:
+            targets = targets * 2
+        return targets, self.delay()
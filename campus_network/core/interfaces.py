@@ -0,0 +1,133 @@
+import ipaddress
+import socket
+import threading
+import time
+import uuid
+from typing import Optional
+
+from .readiness import DEFAULT_CAMPUS_SUBNET
+from .metrics import METRICS
+
+
+DEFAULT_IDENTITY_TTL = 300.0
+FALLBACK_IP = "172.17.0.0"
+
+
+class HostIdentity:
+    """本机在校园网中的身份（IP 与 MAC）"""
+    def __init__(self, ip: str, mac: str, interface: str = '', source: str = ''):
+        self.ip = ip
+        self.mac = mac
+        self.interface = interface
+        self.source = source
+
+    def __repr__(self):
+        return f"HostIdentity({self.ip}, {self.mac}, {self.interface!r}, {self.source})"
+
+
+def normalize_mac(mac: str) -> str:
+    """统一为不带分隔符的大写 MAC 地址"""
+    return ''.join(c for c in mac if c.isalnum()).upper()
+
+
+class HostIdentityResolver:
+    """
+    本机网卡身份解析
+    功能：
+    1. 枚举网卡，选出位于校园网网段的网卡的 IP 与 MAC，不依赖主机名解析
+    2. 结果缓存，超过有效期或网络变化时才重新枚举
+    """
+    def __init__(self, campus_subnet: str = DEFAULT_CAMPUS_SUBNET,
+                 portal_host: Optional[str] = None, ttl: float = DEFAULT_IDENTITY_TTL):
+        self.campus_subnet = ipaddress.ip_network(campus_subnet, strict=False)
+        self.portal_host = portal_host
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._cached: Optional[HostIdentity] = None
+        self._expires = 0.0
+
+    def resolve(self) -> HostIdentity:
+        """获取本机身份，优先使用缓存"""
+        identity = self._cached
+        if identity is not None and time.monotonic() < self._expires:
+            return identity
+        with self._lock:
+            if self._cached is None or time.monotonic() >= self._expires:
+                with METRICS.phase('identity'):
+                    self._cached = self._discover()
+                self._expires = time.monotonic() + self.ttl
+            return self._cached
+
+    def invalidate(self):
+        """网络发生变化时调用，下次解析会重新枚举网卡"""
+        with self._lock:
+            self._expires = 0.0
+
+    def _discover(self) -> HostIdentity:
+        """枚举网卡查找本机身份"""
+        try:
+            import psutil
+        except ImportError:
+            psutil = None
+
+        if psutil is not None:
+            identity = self._discover_psutil(psutil)
+            if identity is not None:
+                return identity
+
+        # 没有可用网卡信息时，使用系统为到达门户所选的源地址
+        ip = self._route_source_ip() or FALLBACK_IP
+        return HostIdentity(ip, self._node_mac(), source='fallback')
+
+    def _discover_psutil(self, psutil) -> Optional[HostIdentity]:
+        stats = psutil.net_if_stats()
+        candidates = []
+        for name, addresses in psutil.net_if_addrs().items():
+            if name in stats and not stats[name].isup:
+                continue
+            ipv4 = [a.address for a in addresses if a.family == socket.AF_INET]
+            macs = [a.address for a in addresses if a.family == psutil.AF_LINK and a.address]
+            mac = normalize_mac(macs[0]) if macs else ''
+            for ip in ipv4:
+                try:
+                    address = ipaddress.ip_address(ip)
+                except ValueError:
+                    continue
+                if address.is_loopback or address.is_link_local:
+                    continue
+                candidates.append((address, name, mac))
+
+        # 1. 校园网网段
+        for address, name, mac in candidates:
+            if address in self.campus_subnet and mac:
+                return HostIdentity(str(address), mac, name, 'subnet')
+
+        # 2. 系统到门户的路由所用的源地址
+        route_ip = self._route_source_ip()
+        for address, name, mac in candidates:
+            if str(address) == route_ip and mac:
+                return HostIdentity(str(address), mac, name, 'route')
+
+        # 3. 任意私有地址网卡
+        for address, name, mac in candidates:
+            if address.is_private and mac:
+                return HostIdentity(str(address), mac, name, 'private')
+        return None
+
+    def _route_source_ip(self) -> Optional[str]:
+        """通过 UDP connect 获取到达门户所用的本机地址（不发送数据，不需要 DNS）"""
+        if not self.portal_host:
+            return None
+        try:
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                sock.connect((self.portal_host, 80))
+                return sock.getsockname()[0]
+        except OSError:
+            return None
+
+    @staticmethod
+    def _node_mac() -> str:
+        try:
+            return uuid.UUID(int=uuid.getnode()).hex[-12:].upper()
+        except Exception:
+            return "000000000000"
@@ -0,0 +1,275 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, NamedTuple, Optional
+
+import requests
+
+from .metrics import METRICS, SESSION_METRIC
+from .result import PortalOutcome, PortalResult
+from .template import Identity
+
+
+DEFAULT_SESSION_FILE = 'session.json'
+DEFAULT_MAX_AGE = 86400.0
+DEFAULT_KEEPALIVE_INTERVAL = 300.0
+# 按门户返回的 keepaliveInterval 发送心跳时提前的比例，避免刚好卡在超时边界
+KEEPALIVE_MARGIN = 0.8
+
+
+class SessionRecord(NamedTuple):
+    """
+    登录成功后门户分配的会话，持久化到本地以便重启后恢复
+    同时记录登录所用的身份（不含密码），会话失效时以同一身份重新登录
+    """
+    user_id: str
+    user_index: str
+    cookies: Dict[str, str]
+    logged_in_at: float
+    keepalive_interval: float
+    service: str = ''
+    ip: str = ''
+    mac: str = ''
+
+    @classmethod
+    def from_result(cls, identity: Identity, result: PortalResult,
+                    cookies: Dict[str, str]) -> Optional['SessionRecord']:
+        """从登录成功的响应中提取会话，门户未返回 userIndex 时返回 None"""
+        data = result.data or {}
+        user_index = data.get('userIndex')
+        if result.outcome != PortalOutcome.SUCCESS or not user_index:
+            return None
+        try:
+            interval = float(data.get('keepaliveInterval') or 0)
+        except (TypeError, ValueError):
+            interval = 0.0
+        return cls(identity.user_id, str(user_index), dict(cookies), time.time(), interval,
+                   identity.service, identity.ip, identity.mac)
+
+
+class SessionStore:
+    """会话文件读写，写入时先写临时文件再替换，文件只对当前用户可读"""
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> Optional[SessionRecord]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return SessionRecord(
+                str(data['user_id']),
+                str(data['user_index']),
+                dict(data.get('cookies') or {}),
+                float(data['logged_in_at']),
+                float(data.get('keepalive_interval') or 0),
+                str(data.get('service') or ''),
+                str(data.get('ip') or ''),
+                str(data.get('mac') or '')
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def save(self, record: SessionRecord):
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        try:
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(record._asdict(), f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"保存门户会话失败: {str(e)}")
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class SessionManager:
+    """
+    门户会话管理
+    功能：
+    1. 登录成功后保存门户返回的 userIndex 与 Cookie
+    2. 启动时用一次 getOnlineUserInfo 请求校验保存的会话，有效即视为在线，无需完整登录
+    3. 在门户空闲超时之前周期性发送 keepalive，会话失效时立即重新登录
+    """
+    def __init__(self, client, store: SessionStore, max_age: float = DEFAULT_MAX_AGE,
+                 keepalive_interval: float = DEFAULT_KEEPALIVE_INTERVAL):
+        self.client = client
+        self.store = store
+        self.max_age = max_age
+        self.keepalive_interval = keepalive_interval
+        self.record: Optional[SessionRecord] = store.load()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_config(cls, client) -> Optional['SessionManager']:
+        """按配置文件 [Session] 节创建，未开启时返回 None"""
+        config = client.config
+        if not config.getboolean('Session', 'enabled', fallback=True):
+            return None
+        path = config.get('Session', 'file', fallback='') or \
+            os.path.join(os.path.dirname(os.path.abspath(client.config_path)), DEFAULT_SESSION_FILE)
+        return cls(
+            client,
+            SessionStore(path),
+            config.getfloat('Session', 'max_age', fallback=DEFAULT_MAX_AGE),
+            config.getfloat('Session', 'keepalive_interval', fallback=DEFAULT_KEEPALIVE_INTERVAL)
+        )
+
+    def reconfigure(self):
+        """配置修改后更新会话文件、有效期与心跳间隔，运行中的心跳在下一次等待时生效"""
+        fresh = self.from_config(self.client)
+        if fresh is None:
+            return
+        self.store = fresh.store
+        self.max_age = fresh.max_age
+        self.keepalive_interval = fresh.keepalive_interval
+
+    def _call(self, method: str, record: SessionRecord) -> Optional[PortalResult]:
+        """以保存的会话调用门户接口，网络错误时返回 None"""
+        try:
+            response = self.client.session.post(
+                self.client.endpoints.preferred,
+                data={'method': method, 'userIndex': record.user_index},
+                timeout=self.client.retry_policy.timeout
+            )
+        except requests.exceptions.RequestException as e:
+            print(f"门户会话请求失败: {str(e)}")
+            METRICS.inc(SESSION_METRIC, action=method, result='network_error')
+            return None
+        response.encoding = 'utf-8'
+        result = PortalResult.from_response(response)
+        METRICS.inc(SESSION_METRIC, action=method, result=result.outcome.value)
+        return result
+
+    def _cookies(self) -> Dict[str, str]:
+        return self.client.session.cookies()
+
+    def _restore_cookies(self, cookies: Dict[str, str]):
+        self.client.session.restore_cookies(cookies)
+
+    def record_login(self, identity: Identity, result: PortalResult):
+        """本机账号登录成功后保存会话并开始发送心跳"""
+        record = SessionRecord.from_result(identity, result, self._cookies())
+        if record is None:
+            return
+        with self._lock:
+            self.record = record
+        self.store.save(record)
+        self.start()
+
+    def invalidate(self):
+        """丢弃保存的会话"""
+        with self._lock:
+            self.record = None
+        self.store.clear()
+
+    def _current(self, user_id: str) -> Optional[SessionRecord]:
+        """当前账号可用的会话：账号已更换或会话过旧时丢弃"""
+        record = self.record
+        if record is None:
+            return None
+        if record.user_id != user_id or time.time() - record.logged_in_at > self.max_age:
+            self.invalidate()
+            return None
+        return record
+
+    def resume(self) -> bool:
+        """用保存的会话恢复在线状态，只发送一次 getOnlineUserInfo 请求"""
+        record = self._current(self.client.settings.user_id)
+        if record is None:
+            return False
+        self._restore_cookies(record.cookies)
+        return self._on_resumed(record, self._call('getOnlineUserInfo', record))
+
+    def _on_resumed(self, record: SessionRecord, result: Optional[PortalResult]) -> bool:
+        """处理会话校验结果，有效时开始发送心跳"""
+        if result is None:
+            return False
+        if result.outcome != PortalOutcome.SUCCESS:
+            self.client._log("保存的门户会话已失效，需要重新登录")
+            self.invalidate()
+            return False
+        self.client._log(f"已恢复 {time.time() - record.logged_in_at:.0f} 秒前的门户会话，无需重新登录")
+        self.start()
+        return True
+
+    def relogin_identity(self, record: SessionRecord) -> Optional[Identity]:
+        """
+        会话失效后重新登录使用的身份：与会话相同的账号与设备，密码取自配置
+        配置中的账号已更换时返回 None，不以其他账号重新登录
+        """
+        settings = self.client.settings
+        if record.user_id != settings.user_id or not settings.password:
+            return None
+        if not record.ip or not record.mac:
+            # 旧版本保存的会话没有设备信息
+            return self.client.resolve_identity(settings=settings)
+        return Identity(record.user_id, settings.password, record.service or settings.service,
+                        record.ip, record.mac)
+
+    def _on_expired(self, record: SessionRecord) -> Optional[Identity]:
+        identity = self.relogin_identity(record)
+        if identity is None:
+            self.client._log("门户会话已失效，配置中的账号已更换，不再自动重新登录")
+        else:
+            self.client._log("门户会话已失效，立即重新登录")
+        return identity
+
+    def interval(self, record: SessionRecord) -> float:
+        """心跳间隔：门户给出空闲超时时按其比例提前，否则使用配置值"""
+        if record.keepalive_interval > 0:
+            return record.keepalive_interval * KEEPALIVE_MARGIN
+        return self.keepalive_interval
+
+    def keepalive(self) -> Optional[bool]:
+        """发送一次心跳：会话有效返回 True，已失效返回 False，无会话或网络错误返回 None"""
+        record = self.record
+        if record is None:
+            return None
+        return self._on_keepalive(self._call('keepalive', record))
+
+    def _on_keepalive(self, result: Optional[PortalResult]) -> Optional[bool]:
+        if result is None:
+            return None
+        if result.outcome == PortalOutcome.SUCCESS:
+            return True
+        self.invalidate()
+        return False
+
+    def start(self):
+        """启动心跳线程，心跳间隔为 0 时不启动"""
+        if self.keepalive_interval <= 0:
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name='PortalKeepalive', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            record = self.record
+            if record is None or self._stop_event.wait(self.interval(record)):
+                return
+            alive = self.keepalive()
+            if alive is False:
+                identity = self._on_expired(record)
+                if identity is None:
+                    return
+                # 登录成功后会重新保存会话并继续发送心跳
+                self.client.login(cancel_event=self._stop_event, identity=identity, persist_session=True)
+
+    def stop(self):
+        """停止心跳，已保存的会话保留供下次启动恢复"""
+        self._stop_event.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=2)
@@ -0,0 +1,170 @@
+import ctypes
+import os
+import platform
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import List, Optional
+
+
+APP_NAME = "CQEVTCampusNetwork"
+RUN_KEY = r'SOFTWARE\Microsoft\Windows\CurrentVersion\Run'
+FROZEN_EXE_NAME = "重庆工程职业技术学院校园网自动登录.exe"
+
+
+class PhaseTimer:
+    """记录启动各阶段耗时"""
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.phases.append((name, elapsed))
+            print(f"[启动阶段] {name}: {elapsed * 1000:.0f}ms")
+
+    def report(self):
+        """输出各阶段耗时汇总"""
+        total = time.perf_counter() - self.started
+        summary = ', '.join(f"{name} {elapsed * 1000:.0f}ms" for name, elapsed in self.phases)
+        print(f"[启动阶段] 总耗时 {total * 1000:.0f}ms ({summary})")
+
+
+def is_windows() -> bool:
+    return platform.system().lower() == 'windows'
+
+
+def is_admin() -> bool:
+    """检查是否有管理员权限"""
+    try:
+        return bool(ctypes.windll.shell32.IsUserAnAdmin())
+    except Exception:
+        return False
+
+
+def get_app_dir() -> str:
+    """程序所在目录"""
+    if getattr(sys, 'frozen', False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _get_program() -> List[str]:
+    """启动本程序所需的可执行文件和脚本路径"""
+    app_dir = get_app_dir()
+    if getattr(sys, 'frozen', False):
+        return [sys.executable]
+    return [os.path.join(app_dir, ".venv", "Scripts", "pythonw.exe"), os.path.join(app_dir, "main.py")]
+
+
+def get_startup_command() -> str:
+    """写入注册表启动项的命令：同一进程内完成开机登录"""
+    return ' '.join(f'"{part}"' for part in _get_program()) + ' --auto-login --startup'
+
+
+def spawn_gui():
+    """以普通窗口模式启动本程序"""
+    subprocess.Popen(_get_program(), cwd=get_app_dir())
+
+
+def elevate(args: List[str]) -> bool:
+    """以管理员权限重新运行本程序执行指定操作，返回是否成功发起"""
+    if not is_windows():
+        return False
+    if getattr(sys, 'frozen', False):
+        exe_path = sys.executable
+        params = " ".join(args)
+    else:
+        exe_path = sys.executable.replace("pythonw.exe", "python.exe")
+        main_py = os.path.join(get_app_dir(), "main.py")
+        params = f'"{main_py}" {" ".join(args)}'
+    print(f"请求管理员权限: {exe_path} {params}")
+    try:
+        # 隐藏窗口运行，只执行注册表写入
+        result = ctypes.windll.shell32.ShellExecuteW(None, "runas", exe_path, params, get_app_dir(), 0)
+        if result <= 32:  # 如果返回值小于等于32，表示发生错误
+            print(f"提升权限失败，错误码: {result}")
+            return False
+        return True
+    except Exception as e:
+        print(f"提升权限失败: {str(e)}")
+        return False
+
+
+def read_startup_entry() -> Optional[str]:
+    """读取当前的开机启动项，读取不需要管理员权限"""
+    if not is_windows():
+        return None
+    import winreg
+    try:
+        with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, RUN_KEY, 0, winreg.KEY_READ) as key:
+            value, _ = winreg.QueryValueEx(key, APP_NAME)
+            return value
+    except OSError:
+        return None
+
+
+def set_startup_entry(enabled: bool, elevate_if_needed: bool = True) -> bool:
+    """
+    设置或移除开机启动项
+    启动项已是目标状态时不写注册表；只有确实需要写入且权限不足时才提升权限
+    """
+    if not is_windows():
+        print("当前系统不支持开机自启动设置")
+        return False
+
+    cmd = get_startup_command()
+    current = read_startup_entry()
+    if (enabled and current == cmd) or (not enabled and current is None):
+        return True
+
+    import winreg
+    try:
+        with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, RUN_KEY, 0, winreg.KEY_SET_VALUE) as key:
+            if enabled:
+                winreg.SetValueEx(key, APP_NAME, 0, winreg.REG_SZ, cmd)
+                print(f"已设置开机自启动: {cmd}")
+            else:
+                winreg.DeleteValue(key, APP_NAME)
+                print("已移除开机自启动")
+        return True
+    except PermissionError:
+        if elevate_if_needed and not is_admin():
+            return elevate(['--register-startup' if enabled else '--unregister-startup'])
+        print("写入注册表失败：权限不足")
+        return False
+    except OSError as e:
+        print(f"写入注册表失败: {str(e)}")
+        return False
+
+
+def boot_login(timer: Optional[PhaseTimer] = None) -> bool:
+    """在当前进程中完成开机登录：等待网络就绪后登录，不加载界面"""
+    timer = timer or PhaseTimer()
+    with timer.phase('加载登录模块'):
+        from .login import CampusNetworkLogin
+        from .readiness import wait_for_network
+        from .coordination import HostCoordinator, coordinated_login
+
+    try:
+        with timer.phase('读取配置'):
+            client = CampusNetworkLogin()
+            coordinator = HostCoordinator.from_config(client.config)
+        try:
+            with timer.phase('等待网络就绪'):
+                wait_for_network(client)
+            with timer.phase('登录'):
+                return coordinated_login(client, coordinator)
+        finally:
+            if coordinator is not None:
+                coordinator.release()
+            client.close()
+    except Exception as e:
+        print(f"自动登录出错: {str(e)}")
+        return False
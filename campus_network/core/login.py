@@ -1,21 +1,20 @@
 import requests
 import time
-import json
-import configparser
-import os
-import subprocess
 import platform
-from typing import Dict, Optional
-import socket
-import uuid
-import logging
-from datetime import datetime
-import winreg
-import sys
-import shutil
-import ctypes
+from typing import Dict, Optional, Set, Tuple
+import threading
+from .session import PortalSession, DEFAULT_POOL_SIZE
+from .probe import OnlineProber, OnlineStatus
+from .template import Identity, LoginRequest
+from .settings import ClientSettings
+from .config import get_config_path
+from .retry import RetryPolicy
+from .keepalive import SessionManager
+from .result import PortalResult
+from .portal import PortalCore, PortalClientFacade, config_modified
+from .metrics import METRICS, LOGIN_METRIC, ATTEMPTS_METRIC, RETRIES_METRIC
 
-class CampusNetworkLogin:
+class CampusNetworkLogin(PortalClientFacade):
     """
     校园网络自动登录客户端
     功能：
@@ -23,404 +22,245 @@ class CampusNetworkLogin:
     2. 自动检测网络状态
     3. 执行校园网络登录
     4. 登录失败自动重试
+    配置、身份解析与结果处理由 PortalCore 提供，与异步客户端共用
     """
-    def __init__(self):
+    def __init__(self, config_path: Optional[str] = None):
         self.is_windows = platform.system().lower() == 'windows'
-        self.log_callback = None  # 初始化日志回调
-        # 初始化配置和基本参数
-        self.config = self._load_config()
-        self.url = self.config.get('Network', 'url')
-        self.max_retries = 3  # 最大重试次数
-        # 添加自定义IP支持
-        self.custom_ip = self.config.get('Network', 'custom_ip', fallback=None)
-        # 添加抓包开关
-        self.enable_packet_capture = self.config.getboolean('Debug', 'enable_packet_capture', fallback=False)
-        self._setup_logging()
-        
-    def _setup_logging(self):
-        """设置日志记录，使用UTF-8编码"""
-        if not self.enable_packet_capture:
-            self.logger = logging.getLogger('NetworkLogger')
-            self.logger.setLevel(logging.DEBUG)
-            return
+        self.core = PortalCore(config_path)
+        self.session = self._create_session()
+        # 轻量级在线状态探测
+        self.prober = self._create_prober()
+        # 门户会话：重启后校验恢复，登录后定期发送心跳
+        self.sessions = self._create_session_manager()
+        self.config_service.subscribe(self._on_config_changed)
 
-        # 创建logs目录
-        logs_dir = 'logs'
-        if not os.path.exists(logs_dir):
-            os.makedirs(logs_dir)
-            
-        log_filename = os.path.join(logs_dir, f'network_logs_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log')
-        handler = logging.FileHandler(log_filename, encoding='utf-8')
-        handler.setLevel(logging.DEBUG)
-        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-        handler.setFormatter(formatter)
-        
-        self.logger = logging.getLogger('NetworkLogger')
-        self.logger.setLevel(logging.DEBUG)
-        self.logger.addHandler(handler)
+    def apply_config(self, changed: Optional[Set[Tuple[str, str]]] = None):
+        """
+        self.config 修改后调用：更新共用部分，再按修改的配置项更新在线探测与会话管理；
+        changed 为空时视为全部修改
+        """
+        self.core.apply_config(changed)
+        if config_modified(changed, 'Probe') or config_modified(changed, 'Network', 'url'):
+            self.prober.reconfigure()
+        if self.sessions is not None and config_modified(changed, 'Session'):
+            self.sessions.reconfigure()
 
-    def _log_request(self, method: str, url: str, headers: Dict, data: Optional[Dict] = None):
-        """记录请求数据包"""
-        try:
-            log_message = [
-                "\n" + "="*50,
-                f"时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-                f"Method: {method}",
-                f"URL: {url}",
-                "Headers:"
-            ]
-            
-            for key, value in headers.items():
-                log_message.append(f"  {key}: {value}")
-            
-            if data:
-                log_message.append("Data:")
-                for key, value in data.items():
-                    # 对敏感信息进行脱敏
-                    if key in ['password', 'userId']:
-                        value = '*' * len(str(value))
-                    log_message.append(f"  {key}: {value}")
-            
-            message = '\n'.join(log_message)
-            if hasattr(self, 'log_callback'):
-                self.log_callback('request', message)
-        except Exception as e:
-            print(f"记录请求日志失败: {str(e)}")
+    def _on_config_changed(self, config, changed):
+        """配置文件被修改（界面保存或外部编辑）后热加载，无需重启"""
+        self.core.config = config
+        self.apply_config(changed)
+        self._log(f"配置已重新加载: {', '.join(f'{s}.{k}' for s, k in sorted(changed))}")
 
-    def _log_response(self, response):
-        """记录响应数据包"""
-        try:
-            log_message = [
-                "\n" + "="*50,
-                f"时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-                f"Status Code: {response.status_code}",
-                "Headers:"
-            ]
-            
-            for key, value in response.headers.items():
-                log_message.append(f"  {key}: {value}")
-            
-            try:
-                # 尝试格式化JSON响应
-                body = response.json()
-                # 修复中文编码
-                formatted_body = json.dumps(body, ensure_ascii=False, indent=2)
-                log_message.append("Body (JSON):")
-                log_message.append(formatted_body)
-            except json.JSONDecodeError:
-                log_message.append("Body:")
-                log_message.append(response.text)
-            
-            message = '\n'.join(log_message)
-            if hasattr(self, 'log_callback'):
-                self.log_callback('response', message)
-        except Exception as e:
-            print(f"记录响应日志失败: {str(e)}")
+    def _create_prober(self) -> OnlineProber:
+        return OnlineProber(self)
 
-    def _load_config(self) -> configparser.ConfigParser:
-        """加载配置文件"""
-        config = configparser.ConfigParser()
-        config_path = self.get_config_path()
-        
-        self._log(f"尝试加载配置文件: {config_path}")
-        self.is_first_run = not os.path.exists(config_path)
-        
-        if self.is_first_run:
-            self._log("首次运行，创建默认配置...")
-            # 创建默认配置
-            config['Network'] = {
-                'url': 'http://172.17.10.100/eportal/InterFace.do',
-                'user_id': '',
-                'password': '',
-                'service': '教学区免费上网',
-                'auto_login': 'false'
-            }
-            config['Debug'] = {
-                'enable_packet_capture': 'false'
-            }
-            
-            try:
-                # 保存默认配置
-                with open(config_path, 'w', encoding='utf-8') as f:
-                    config.write(f)
-                self._log(f"配置文件已创建: {config_path}")
-            except Exception as e:
-                self._log(f"创建配置文件失败: {str(e)}")
-        else:
-            try:
-                # 读取现有配置
-                config.read(config_path, encoding='utf-8')
-                self._log("配置文件加载成功")
-            except Exception as e:
-                self._log(f"读取配置文件失败: {str(e)}")
-                # 使用默认配置
-                config['Network'] = {
-                    'url': 'http://172.17.10.100/eportal/InterFace.do',
-                    'user_id': '',
-                    'password': '',
-                    'service': '教学区免费上网',
-                    'auto_login': 'false'
-                }
-                config['Debug'] = {
-                    'enable_packet_capture': 'false'
-                }
+    def _create_session_manager(self) -> Optional[SessionManager]:
+        return SessionManager.from_config(self)
+
+    def _create_session(self) -> PortalSession:
+        """创建长连接会话"""
+        pool_size = self.config.getint('Network', 'pool_size', fallback=DEFAULT_POOL_SIZE)
+        return PortalSession(self.url, self.core.headers, pool_size, len(self.settings.endpoints))
         
-        return config
+    def login(self, cancel_event: Optional[threading.Event] = None, on_attempt=None,
+              identity: Optional[Identity] = None, persist_session: Optional[bool] = None) -> bool:
+        """
+        执行登录操作，可由多个线程同时调用
+        cancel_event: 被设置后停止后续重试，等待期间也会立即返回
+        on_attempt: 每次尝试结束后回调 on_attempt(次数, 是否成功, 说明, 是否还会重试)
+        identity: 登录使用的身份，为空时使用配置中的账号与本机设备信息
+        persist_session: 是否保存门户会话并发送心跳，默认只在使用配置中的账号时保存
+        """
+        if persist_session is None:
+            persist_session = identity is None
+        # 本次调用全程使用同一份设置快照
+        settings = self.settings
+        if identity is None:
+            # 检查账号密码是否已设置
+            if not settings.has_credentials:
+                self._log("错误：请先设置账号和密码")
+                return False
+            identity = self.resolve_identity(settings=settings)
+
+        # 熔断器放行的试探请求无论如何结束都会留下结果
+        with self.breaker.attempt():
+            if not self.breaker.allow():
+                self._log(f"认证门户连续失败，暂停登录 {self.breaker.retry_after():.0f} 秒")
+                return False
 
-    def _get_login_data(self) -> Dict:
-        """准备登录数据"""
-        return {
-            'method': 'login',
-            'userId': self.config.get('Network', 'user_id'),
-            'password': self.config.get('Network', 'password'),
-            'service': self.config.get('Network', 'service'),
-            'queryString': self._get_query_string(),
-            'operatorPwd': '',
-            'operatorUserId': '',
-            'validcode': '',
-            'passwordEncrypt': 'true'
-        }
+            with METRICS.timer(LOGIN_METRIC):
+                return self._login_attempts(settings, identity, cancel_event, on_attempt, persist_session)
 
-    def _get_query_string(self) -> str:
-        """获取查询字符串"""
-        if hasattr(self, 'custom_ip') and hasattr(self, 'custom_mac'):
-            # 使用自定义设备信息
-            ip = self.custom_ip
-            mac = self.custom_mac
-        else:
-            # 使用本机信息
-            try:
-                ip = socket.gethostbyname(socket.gethostname())
-            except:
-                ip = "172.17.0.0"
-            mac = self._get_real_mac()
+    def _send_login(self, url: str, request: LoginRequest, policy: RetryPolicy,
+                    primary: bool = True):
+        """向指定门户地址发送一次预编译的登录请求，返回 (响应, 解析结果)；primary 表示发往首选地址"""
+        # 记录请求数据包
+        with METRICS.phase('log'):
+            self.core.log_request('POST', url, self.core.headers, request.fields)
         
-        query = (
-            f'wlanuserip%3D{ip}'
-            '%26wlanacname%3DNAS'
-            '%26ssid%3DRuijie'
-            '%26nasip%3D172.17.10.10'
-            f'%26mac%3D{mac}'
-            '%26t%3Dwireless-v2-plain'
-            '%26url%3Dhttp%3A%252F%252Fwww.baidu.com%252F'
+        # 通过连接池发送预编译的登录请求
+        request_started = time.perf_counter()
+        response = self.session.post(
+            url,
+            data=request.body,
+            timeout=policy.timeout
         )
-        return query
+        self.core.observe_request(request_started, response, primary)
+        response.encoding = 'utf-8'
+        with METRICS.phase('parse'):
+            result = PortalResult.from_response(response)
+        return response, result
 
-    def _get_real_mac(self) -> str:
-        """获取真实的MAC地址"""
-        try:
-            mac = uuid.UUID(int=uuid.getnode()).hex[-12:]
-            return mac.upper()
-        except:
-            return "000000000000"
+    def _on_duplicate(self, identity: Identity, winner: PortalResult, result: PortalResult,
+                      persist_session: bool):
+        """落后的请求稍后也登录成功：必要时保存落后请求带回的会话，见 PortalCore.late_success"""
+        if self.core.late_success(winner, result) and persist_session and self.sessions is not None:
+            self.sessions.record_login(identity, result)
 
-    def _get_headers(self) -> Dict:
-        """获取请求头"""
-        return {
-            'Host': '172.17.10.100',
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.6533.100 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
-            'Accept-Language': 'zh-CN',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8'
-        }
+    def _race_login(self, identity: Identity, request: LoginRequest, policy: RetryPolicy,
+                    persist_session: bool):
+        """
+        发送登录请求，返回 (响应, 解析结果)
+        配置了多个门户地址时竞速请求；开启对冲时响应慢的请求会在另一个连接上补发一次
+        """
+        targets, delay = self.hedging.plan(self.endpoints)
 
-    def _log(self, message):
-        """统一的日志处理函数"""
-        print(message)  # 保留控制台输出
-        if self.log_callback:
-            self.log_callback('program', message)
+        def send(url):
+            return self._send_login(url, request, policy, primary=url == targets[0])
 
-    def login(self) -> bool:
-        """执行登录操作"""
-        # 检查账号密码是否已设置
-        if not self.config.get('Network', 'user_id') or not self.config.get('Network', 'password'):
-            self._log("错误：请先设置账号和密码")
-            return False
+        _, (response, result) = self.endpoints.race(
+            send,
+            lambda sent: sent[1].portal_healthy,
+            targets,
+            delay,
+            failover=len(self.endpoints.urls) > 1,
+            on_late=lambda url, sent, won: self._on_duplicate(identity, won[1], sent[1], persist_session),
+            # 只有开启对冲时按分位数补发的请求才计为对冲
+            on_hedge=self.core.on_hedge if self.hedging.enabled else None
+        )
+        return response, result
 
-        # 清除可能存在的自定义设备信息
-        if hasattr(self, 'custom_ip'):
-            delattr(self, 'custom_ip')
-        if hasattr(self, 'custom_mac'):
-            delattr(self, 'custom_mac')
-        
-        for attempt in range(self.max_retries):
+    def _login_attempts(self, settings: ClientSettings, identity: Identity,
+                        cancel_event: Optional[threading.Event], on_attempt, persist_session: bool) -> bool:
+        """按重试策略发送登录请求"""
+        policy = settings.retry_policy
+        started = time.monotonic()
+        for attempt in range(1, policy.max_attempts + 1):
+            if cancel_event is not None and cancel_event.is_set():
+                self._log("登录已取消")
+                return False
+
+            message = ''
+            retryable = True
+            METRICS.inc(ATTEMPTS_METRIC)
             try:
-                headers = self._get_headers()
-                data = self._get_login_data()
+                with METRICS.phase('template'):
+                    request = self.prepare_request(identity)
                 
-                # 记录请求数据包
-                self._log_request('POST', self.url, headers, data)
+                # 多个门户地址竞速、慢请求对冲，取最先得到的有效响应
+                response, result = self._race_login(identity, request, policy, persist_session)
                 
-                # 发送登录请求
-                response = requests.post(
-                    self.url,
-                    headers=headers,
-                    data=data,
-                    timeout=5
-                )
-                response.encoding = 'utf-8'
+                # 记录响应数据包（与登录判断共用同一次解析）
+                with METRICS.phase('log'):
+                    self.core.log_response(response, result)
+                    self._log(f"尝试第 {attempt} 次登录: {response.text}")
                 
-                # 记录响应数据包
-                self._log_response(response)
-                
-                self._log(f"尝试第 {attempt + 1} 次登录: {response.text}")
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    if result.get('result') == 'success':
-                        self._log("登录成功！")
-                        return True
-                    else:
-                        self._log(f"登录失败: {result.get('message', '未知错误')}")
+                message = self.core.handle_result(attempt, result, on_attempt)
+                if message is None:
+                    if persist_session and self.sessions is not None:
+                        self.sessions.record_login(identity, result)
+                    return True
+                retryable = policy.should_retry(result)
                 
             except requests.exceptions.RequestException as e:
-                error_msg = f"第 {attempt + 1} 次尝试失败: {str(e)}"
-                self._log(error_msg)
-                self.logger.error(error_msg)
-            except json.JSONDecodeError:
-                error_msg = f"第 {attempt + 1} 次尝试失败: 响应格式无效"
-                self._log(error_msg)
-                self.logger.error(error_msg)
-                
-            if attempt < self.max_retries - 1:
-                self._log(f"等待 {attempt + 1} 秒后重试...")
-                time.sleep(attempt + 1)
-        
-        return False
+                message = f"第 {attempt} 次尝试失败: {str(e)}"
+                self.core.network_error(message)
+
+            delay = self.core.retry_delay(policy, attempt, started, retryable)
+            if on_attempt:
+                on_attempt(attempt, False, message, delay is not None)
+            if delay is None:
+                return False
+            METRICS.inc(RETRIES_METRIC)
+            self._log(f"等待 {delay:.1f} 秒后重试...")
+            if cancel_event is not None:
+                if cancel_event.wait(delay):
+                    self._log("登录已取消")
+                    return False
+            else:
+                time.sleep(delay)
 
     def _check_internet_connection(self) -> bool:
         """检查网络连接状态"""
         try:
-            headers = self._get_headers()
-            data = self._get_login_data()
+            request = self.prepare_request(self.resolve_identity())
+            url = self.endpoints.preferred
             
             # 记录请求数据包
-            self._log_request('POST', self.url, headers, data)
+            self.core.log_request('POST', url, self.core.headers, request.fields)
             
-            response = requests.post(
-                self.url,
-                headers=headers,
-                data=data,
-                timeout=3
+            response = self.session.post(
+                url,
+                data=request.body,
+                timeout=(self.retry_policy.connect_timeout, 3)
             )
-            
-            # 记录响应数据包
-            self._log_response(response)
-            
-            if response.status_code == 200:
-                result = response.json()
-                if "已经在线" in result.get('message', ''):
-                    print("检测到已经登录")
-                    return True
-                print(f"检测到需要登录: {result.get('message', '未知状态')}")
-                return False
+            response.encoding = 'utf-8'
+            # 解析并记录响应数据包
+            return self.core.check_result(response)
             
         except requests.exceptions.RequestException as e:
             error_msg = f"网络请求失败: {str(e)}"
             print(error_msg)
-            self.logger.error(error_msg)
-            return False
-        except json.JSONDecodeError:
-            error_msg = "响应格式无效"
-            print(error_msg)
-            self.logger.error(error_msg)
+            self.core.logger.error(error_msg)
             return False
 
+    def check_online(self) -> bool:
+        """轻量检测是否已在线，必要时才回退到提交登录表单的检测"""
+        result = self.prober.probe()
+        self._log(f"网络状态: {result.status.value} ({result.strategy}, {result.latency * 1000:.0f}ms)")
+        return result.status == OnlineStatus.ONLINE
+
+    def resume_session(self) -> bool:
+        """用上次保存的门户会话恢复在线状态，成功时无需完整登录"""
+        return self.sessions is not None and self.sessions.resume()
+
     def ensure_connection(self) -> bool:
         """确保网络连接"""
-        if self._check_internet_connection():
+        if self.resume_session() or self.check_online():
             return True
         return self.login()
 
-    def set_log_callback(self, callback):
-        """设置日志回调函数"""
-        self.log_callback = callback
+    def get_connection_stats(self) -> Dict:
+        """获取连接池复用统计"""
+        return self.session.stats()
+
+    def close(self):
+        """停止心跳并释放连接池"""
+        if self.sessions is not None:
+            self.sessions.stop()
+        self.prober.close()
+        self.endpoints.close()
+        self.session.close()
 
     def setup_auto_start(self):
         """设置开机自动启动"""
-        try:
-            if self.is_windows:
-                import win32api
-                import win32con
-                
-                # 获取程序路径
-                if getattr(sys, 'frozen', False):
-                    app_path = sys.executable
-                    # 构建启动命令
-                    cmd = f'"{app_path}" --auto-login --startup'
-                else:
-                    current_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-                    python_path = os.path.join(current_dir, ".venv", "Scripts", "pythonw.exe")
-                    main_py = os.path.join(current_dir, "main.py")
-                    # 构建启动命令
-                    cmd = f'"{python_path}" "{main_py}" --auto-login --startup'
-                
-                # 打开注册表
-                key = win32api.RegOpenKey(
-                    win32con.HKEY_LOCAL_MACHINE,
-                    r'SOFTWARE\Microsoft\Windows\CurrentVersion\Run',
-                    0,
-                    win32con.KEY_ALL_ACCESS
-                )
-                
-                # 写入注册表
-                win32api.RegSetValueEx(
-                    key,
-                    "CQEVTCampusNetwork",
-                    0,
-                    win32con.REG_SZ,
-                    cmd
-                )
-                
-                win32api.RegCloseKey(key)
-                self._log(f"已设置开机自启动: {cmd}")
-                return True
-                
-        except Exception as e:
-            self._log(f"设置自启动失败: {str(e)}")
-            return False
+        from .launcher import set_startup_entry
+        if set_startup_entry(True):
+            self._log("已设置开机自启动")
+            return True
+        self._log("设置自启动失败")
+        return False
 
     def remove_auto_start(self):
         """移除开机自动启动"""
-        try:
-            if self.is_windows:
-                import win32api
-                import win32con
-                
-                key = win32api.RegOpenKey(
-                    win32con.HKEY_LOCAL_MACHINE,
-                    r'SOFTWARE\Microsoft\Windows\CurrentVersion\Run',
-                    0,
-                    win32con.KEY_ALL_ACCESS
-                )
-                
-                try:
-                    win32api.RegDeleteValue(key, "CQEVTCampusNetwork")
-                    self._log("已移除开机自启动")
-                except:
-                    pass
-                finally:
-                    win32api.RegCloseKey(key)
-                
-                return True
-                
-        except Exception as e:
-            self._log(f"移除自启动失败: {str(e)}")
-            return False
+        from .launcher import set_startup_entry
+        if set_startup_entry(False):
+            self._log("已移除开机自启动")
+            return True
+        self._log("移除自启动失败")
+        return False
 
     @staticmethod
     def get_config_path():
         """获取配置文件路径"""
-        if getattr(sys, 'frozen', False):
-            # 打包后的路径
-            base_path = os.path.dirname(sys.executable)
-        else:
-            # 开发环境路径
-            base_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        
-        config_path = os.path.join(base_path, 'config.ini')
-        print(f"配置文件路径: {config_path}")  # 添加日志
-        return config_path 
\ No newline at end of file
+        return get_config_path()
\ No newline at end of file
@@ -0,0 +1,347 @@
+import bisect
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEFAULT_METRICS_PORT = 9108
+
+# 登录流程各阶段名称及说明，按流程顺序排列
+LOGIN_PHASES = (
+    ('config', '读取配置'),
+    ('identity', '解析本机身份'),
+    ('template', '构建登录请求'),
+    ('dns', 'DNS 解析'),
+    ('connect', '建立连接'),
+    ('server', '门户响应'),
+    ('transfer', '读取响应体'),
+    ('parse', '解析响应'),
+    ('log', '日志记录'),
+)
+
+PHASE_METRIC = 'campus_login_phase_seconds'
+LOGIN_METRIC = 'campus_login_seconds'
+ATTEMPTS_METRIC = 'campus_login_attempts_total'
+RETRIES_METRIC = 'campus_login_retries_total'
+OUTCOMES_METRIC = 'campus_login_outcomes_total'
+CONNECTIONS_METRIC = 'campus_portal_connections_total'
+SESSION_METRIC = 'campus_portal_session_requests_total'
+HEDGES_METRIC = 'campus_login_hedges_total'
+
+_HELP = {
+    PHASE_METRIC: '登录各阶段耗时（秒）',
+    LOGIN_METRIC: '一次完整登录（含重试）耗时（秒）',
+    ATTEMPTS_METRIC: '登录请求次数',
+    RETRIES_METRIC: '登录重试次数',
+    OUTCOMES_METRIC: '登录尝试结果',
+    CONNECTIONS_METRIC: '与门户新建的连接数',
+    SESSION_METRIC: '门户会话校验与心跳请求',
+    HEDGES_METRIC: '对冲补发的登录请求',
+}
+
+
+class Histogram:
+    """固定分桶直方图"""
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """根据分桶估算分位数（桶内线性插值）"""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+def _label_key(labels: Dict) -> Tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key: Tuple, extra: str = '') -> str:
+    parts = [f'{name}="{value}"' for name, value in key]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+class _Shard:
+    """单个线程写入的指标，只有所属线程会修改"""
+    __slots__ = ('counters', 'histograms', 'alive')
+
+    def __init__(self):
+        self.counters: Dict[str, Dict[Tuple, float]] = {}
+        self.histograms: Dict[str, Dict[Tuple, Histogram]] = {}
+        self.alive = True
+
+    def retire(self):
+        """所属线程已结束，之后不会再有写入"""
+        self.alive = False
+
+    def merge(self, other: '_Shard'):
+        """把另一个分片的数据累加到本分片"""
+        for name, series in list(other.counters.items()):
+            merged = self.counters.setdefault(name, {})
+            for key, value in list(series.items()):
+                merged[key] = merged.get(key, 0) + value
+        for name, series in list(other.histograms.items()):
+            merged = self.histograms.setdefault(name, {})
+            for key, h in list(series.items()):
+                total = merged.get(key)
+                if total is None:
+                    total = merged[key] = Histogram(h.buckets)
+                total.counts = [a + b for a, b in zip(total.counts, h.counts)]
+                total.sum += h.sum
+                total.count += h.count
+
+
+class _ShardOwner:
+    """保存在线程局部变量中；线程结束时局部变量被释放，借此得知分片可以合并"""
+    __slots__ = ('__weakref__',)
+
+
+class MetricsRegistry:
+    """
+    进程内指标
+    功能：
+    1. 计数器：登录次数、重试次数、各类结果
+    2. 直方图：登录各阶段耗时、整体耗时
+    3. 以 Prometheus 文本格式或可读摘要导出
+    每个线程写入自己的分片，记录时不加锁；读取时再合并各分片，
+    已结束线程的分片并入汇总分片后移除，短命线程不会让分片无限增长
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._shards = []
+        # 已结束线程的数据
+        self._retired = _Shard()
+
+    def _shard(self) -> _Shard:
+        local = self._local
+        shard = getattr(local, 'shard', None)
+        if shard is None:
+            shard = local.shard = _Shard()
+            # 不依赖 threading.Thread：Qt 等非 Python 创建的线程结束时同样会释放线程局部变量
+            local.owner = _ShardOwner()
+            weakref.finalize(local.owner, shard.retire)
+            with self._lock:
+                self._prune()
+                self._shards.append(shard)
+        return shard
+
+    def _prune(self):
+        """把已结束线程的分片并入汇总分片（调用方持有锁）"""
+        live = []
+        for shard in self._shards:
+            if shard.alive:
+                live.append(shard)
+            else:
+                self._retired.merge(shard)
+        self._shards = live
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """计数器加 value"""
+        key = _label_key(labels)
+        counters = self._shard().counters
+        series = counters.get(name)
+        if series is None:
+            series = counters[name] = {}
+        series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        """向直方图记录一个观测值"""
+        key = _label_key(labels)
+        histograms = self._shard().histograms
+        series = histograms.get(name)
+        if series is None:
+            series = histograms[name] = {}
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram(self.buckets)
+        histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """记录代码块耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def phase(self, phase: str):
+        """记录登录流程某一阶段的耗时"""
+        return self.timer(PHASE_METRIC, phase=phase)
+
+    def _merged(self) -> Tuple[Dict[str, Dict[Tuple, float]], Dict[str, Dict[Tuple, Histogram]]]:
+        """合并所有线程的分片"""
+        total = _Shard()
+        with self._lock:
+            self._prune()
+            total.merge(self._retired)
+            shards = list(self._shards)
+        for shard in shards:
+            total.merge(shard)
+        return total.counters, total.histograms
+
+    def counter(self, name: str, **labels) -> float:
+        return self._merged()[0].get(name, {}).get(_label_key(labels), 0)
+
+    def histogram(self, name: str, **labels) -> Optional[Histogram]:
+        return self._merged()[1].get(name, {}).get(_label_key(labels))
+
+    def snapshot(self) -> Dict:
+        """当前所有指标的快照"""
+        counters, merged = self._merged()
+        histograms = {}
+        for name, series in merged.items():
+            histograms[name] = {
+                key: {
+                    'count': h.count,
+                    'sum': h.sum,
+                    'p50': h.quantile(0.5),
+                    'p95': h.quantile(0.95),
+                    'p99': h.quantile(0.99),
+                }
+                for key, h in series.items()
+            }
+        return {'counters': counters, 'histograms': histograms}
+
+    def reset(self):
+        with self._lock:
+            self._shards = []
+            self._retired = _Shard()
+            self._local = threading.local()
+
+    def render_prometheus(self) -> str:
+        """导出为 Prometheus 文本格式"""
+        lines = []
+        counters, histograms = self._merged()
+        for name, series in sorted(counters.items()):
+            lines.append(f'# HELP {name} {_HELP.get(name, name)}')
+            lines.append(f'# TYPE {name} counter')
+            for key, value in sorted(series.items()):
+                lines.append(f'{name}{_format_labels(key)} {value:g}')
+        for name, series in sorted(histograms.items()):
+            lines.append(f'# HELP {name} {_HELP.get(name, name)}')
+            lines.append(f'# TYPE {name} histogram')
+            for key, h in sorted(series.items()):
+                cumulative = 0
+                for bound, count in zip(h.buckets, h.counts):
+                    cumulative += count
+                    le = f'le="{bound:g}"'
+                    lines.append(f'{name}_bucket{_format_labels(key, le)} {cumulative}')
+                le = 'le="+Inf"'
+                lines.append(f'{name}_bucket{_format_labels(key, le)} {h.count}')
+                lines.append(f'{name}_sum{_format_labels(key)} {h.sum:.6f}')
+                lines.append(f'{name}_count{_format_labels(key)} {h.count}')
+        return '\n'.join(lines) + '\n'
+
+    def format_summary(self) -> str:
+        """可读的指标摘要，供界面显示"""
+        snapshot = self.snapshot()
+        counters = snapshot['counters']
+        histograms = snapshot['histograms']
+        lines = ["登录统计", "-" * 60]
+        lines.append(f"登录请求: {counters.get(ATTEMPTS_METRIC, {}).get((), 0):g}    "
+                     f"重试: {counters.get(RETRIES_METRIC, {}).get((), 0):g}    "
+                     f"新建连接: {counters.get(CONNECTIONS_METRIC, {}).get((), 0):g}")
+        hedges = counters.get(HEDGES_METRIC, {})
+        if hedges:
+            lines.append("对冲请求: " + "    ".join(f"{dict(key).get('result', '')} {value:g}"
+                                                 for key, value in sorted(hedges.items())))
+        for key, value in sorted(counters.get(OUTCOMES_METRIC, {}).items()):
+            lines.append(f"  {dict(key).get('outcome', '')}: {value:g}")
+
+        lines.extend(["", "阶段耗时 (ms)", "-" * 60,
+                      f"{'阶段':<14}{'次数':>8}{'平均':>10}{'p50':>10}{'p95':>10}{'p99':>10}"])
+        phases = histograms.get(PHASE_METRIC, {})
+        rows = [(name, title, phases.get((('phase', name),))) for name, title in LOGIN_PHASES]
+        total = histograms.get(LOGIN_METRIC, {}).get(())
+        rows.append(('total', '完整登录', total))
+        for name, title, h in rows:
+            if not h or not h['count']:
+                continue
+            lines.append(f"{title:<12}{h['count']:>8}{h['sum'] / h['count'] * 1000:>10.1f}"
+                         f"{h['p50'] * 1000:>10.1f}{h['p95'] * 1000:>10.1f}{h['p99'] * 1000:>10.1f}")
+        return '\n'.join(lines)
+
+
+# 进程内共享的指标
+METRICS = MetricsRegistry()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.registry.render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsServer:
+    """在本机地址提供 Prometheus 文本格式的 /metrics 接口"""
+    def __init__(self, registry: MetricsRegistry = METRICS, port: int = DEFAULT_METRICS_PORT,
+                 host: str = '127.0.0.1'):
+        self._server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        self._server.daemon_threads = True
+        self._server.registry = registry
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/metrics'
+
+    def start(self) -> 'MetricsServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, name='MetricsServer', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def start_metrics_server(config) -> Optional[MetricsServer]:
+    """按配置文件 [Metrics] 节启动指标接口，未开启或端口被占用时返回 None"""
+    if not config.getboolean('Metrics', 'enabled', fallback=False):
+        return None
+    port = config.getint('Metrics', 'port', fallback=DEFAULT_METRICS_PORT)
+    try:
+        server = MetricsServer(METRICS, port).start()
+    except OSError as e:
+        print(f"启动指标接口失败: {str(e)}")
+        return None
+    print(f"指标接口: {server.url}")
+    return server
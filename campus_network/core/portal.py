@@ -0,0 +1,336 @@
+import logging
+import time
+from typing import Dict, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+from .capture import RequestRecord, ResponseRecord
+from .config import get_config_service, get_config_path
+from .endpoints import EndpointPool
+from .hedging import HedgePolicy
+from .interfaces import HostIdentityResolver, DEFAULT_IDENTITY_TTL
+from .readiness import DEFAULT_CAMPUS_SUBNET
+from .result import PortalResult, PortalOutcome
+from .retry import CircuitBreaker, RetryPolicy
+from .settings import ClientSettings
+from .template import Identity, LoginRequest, TemplateCache
+from .metrics import METRICS, PHASE_METRIC, OUTCOMES_METRIC, HEDGES_METRIC
+from ..utils.logger import (setup_network_logger, LOGGER_NAME, DEFAULT_LOG_DIR, DEFAULT_MAX_BYTES,
+                            DEFAULT_BACKUP_COUNT, DEFAULT_ROTATE_HOURS)
+
+
+# 只在启动时读取、热加载无法生效的配置项（[Logging] 节整节如此）
+RESTART_KEYS = frozenset({
+    ('Network', 'pool_size'),
+    ('Network', 'async_pool_size'),
+    ('Endpoints', 'race_workers'),
+    ('Session', 'enabled'),
+})
+
+
+def config_modified(changed: Optional[Set[Tuple[str, str]]], section: str, *keys: str) -> bool:
+    """changed 中是否包含指定节（及键）的修改，changed 为空时视为全部修改"""
+    return changed is None or any(s == section and (not keys or k in keys) for s, k in changed)
+
+
+class PortalCore:
+    """
+    同步与异步登录客户端共用的部分，两个客户端各自持有一个实例
+    功能：
+    1. 读取配置，生成登录设置快照，热加载时更新各组件
+    2. 门户地址池、请求对冲与熔断器
+    3. 身份解析与按身份预编译的登录请求
+    4. 日志、抓包记录与登录结果的统一处理
+    发送请求、重试等待等与同步/异步有关的部分由客户端实现
+    """
+    def __init__(self, config_path: Optional[str] = None):
+        self.log_callback = None  # 初始化日志回调
+        # 配置文件路径，默认位于程序目录
+        self.config_path = config_path or get_config_path()
+        # 初始化配置和基本参数
+        with METRICS.phase('config'):
+            # 同一配置文件在进程内只解析一次，修改后自动热加载
+            self.config_service = get_config_service(self.config_path)
+        self.config = self.config_service.config
+        self.is_first_run = self.config_service.is_first_run
+        # 登录相关设置的不可变快照，登录过程中只读取不修改
+        self.settings = ClientSettings.from_config(self.config)
+        self.url = self.settings.url
+        # 门户地址池：记录各地址健康状态，多个地址时竞速请求
+        self.endpoints = EndpointPool.from_config(self.config, self.settings.endpoints)
+        # 请求对冲：响应慢于近期分位数时补发一次（默认关闭）
+        self.hedging = HedgePolicy.from_config(self.config)
+        # 门户熔断器
+        self.breaker = CircuitBreaker.from_config(self.config)
+        self._setup_logging()
+        # 请求头只构建一次，所有请求复用
+        self.headers = self._get_headers()
+        # 按身份缓存的预编译登录请求
+        self.templates = TemplateCache()
+        # 本机 IP/MAC 解析结果缓存，网络变化时失效
+        self.identity = self._create_identity_resolver()
+
+    @property
+    def retry_policy(self) -> RetryPolicy:
+        """当前使用的重试策略"""
+        return self.settings.retry_policy
+
+    @property
+    def enable_packet_capture(self) -> bool:
+        """抓包开关"""
+        return self.settings.enable_packet_capture
+
+    def apply_config(self, changed: Optional[Set[Tuple[str, str]]] = None):
+        """
+        self.config 修改后调用：生成新的设置快照并丢弃预编译的登录请求，
+        再按修改的配置项更新对应组件；changed 为空时视为全部修改
+        连接池大小、日志文件等只在启动时生效的配置项提示需要重启
+        """
+        self.settings = ClientSettings.from_config(self.config)
+        self.url = self.settings.url
+        self.endpoints.update(self.settings.endpoints)
+        self.invalidate_templates()
+
+        if config_modified(changed, 'Endpoints'):
+            self.endpoints.reconfigure(self.config)
+        if config_modified(changed, 'Hedging'):
+            self.hedging = HedgePolicy.from_config(self.config)
+        if config_modified(changed, 'Retry', 'breaker_threshold', 'breaker_reset'):
+            self.breaker.reconfigure(self.config)
+        if config_modified(changed, 'Network', 'url', 'campus_subnet', 'identity_ttl'):
+            self.identity = self._create_identity_resolver()
+        if config_modified(changed, 'Debug', 'enable_packet_capture'):
+            self._setup_logging()
+
+        if changed is not None:
+            restart = sorted(key for key in changed if key in RESTART_KEYS or key[0] == 'Logging')
+            if restart:
+                self.log(f"以下配置需要重启程序后生效: {', '.join(f'{s}.{k}' for s, k in restart)}")
+
+    def _create_identity_resolver(self) -> HostIdentityResolver:
+        return HostIdentityResolver(
+            self.config.get('Network', 'campus_subnet', fallback=DEFAULT_CAMPUS_SUBNET),
+            urlsplit(self.url).hostname,
+            self.config.getfloat('Network', 'identity_ttl', fallback=DEFAULT_IDENTITY_TTL)
+        )
+
+    def _setup_logging(self):
+        """设置日志记录，抓包开启时写入后台轮转日志文件（多个实例共用同一套处理器）"""
+        if not self.enable_packet_capture:
+            self.logger = logging.getLogger(LOGGER_NAME)
+            self.logger.setLevel(logging.DEBUG)
+            return
+
+        self.logger = setup_network_logger(
+            logs_dir=self.config.get('Logging', 'dir', fallback=DEFAULT_LOG_DIR),
+            max_bytes=self.config.getint('Logging', 'max_bytes', fallback=DEFAULT_MAX_BYTES),
+            backup_count=self.config.getint('Logging', 'backup_count', fallback=DEFAULT_BACKUP_COUNT),
+            rotate_hours=self.config.getfloat('Logging', 'rotate_hours', fallback=DEFAULT_ROTATE_HOURS),
+            compress=self.config.getboolean('Logging', 'compress', fallback=True),
+            json_format=self.config.get('Logging', 'format', fallback='json').lower() == 'json'
+        )
+
+    def _get_headers(self) -> Dict:
+        """获取请求头"""
+        # Host 由 requests 根据实际请求的门户地址生成
+        return {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.6533.100 Safari/537.36',
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
+            'Accept-Language': 'zh-CN',
+            'Accept-Encoding': 'gzip, deflate, br',
+            'Connection': 'keep-alive',
+            'Upgrade-Insecure-Requests': '1',
+            'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8'
+        }
+
+    def log(self, message):
+        """统一的日志处理函数"""
+        print(message)  # 保留控制台输出
+        if self.log_callback:
+            self.log_callback('program', message)
+
+    def _capture_enabled(self) -> bool:
+        """是否需要记录数据包：抓包开启且有日志回调消费时才记录"""
+        return self.enable_packet_capture and self.log_callback is not None
+
+    def log_request(self, method: str, url: str, headers: Dict, data: Optional[Dict] = None):
+        """记录请求数据包，文本在消费时才格式化"""
+        if not self._capture_enabled():
+            return
+        try:
+            self.log_callback('request', RequestRecord(method, url, headers, dict(data) if data else None))
+        except Exception as e:
+            print(f"记录请求日志失败: {str(e)}")
+
+    def log_response(self, response, result: Optional[PortalResult] = None):
+        """记录响应数据包，文本在消费时才格式化；传入已解析的结果可避免重复解析"""
+        if not self._capture_enabled():
+            return
+        try:
+            self.log_callback('response', ResponseRecord(response, result))
+        except Exception as e:
+            print(f"记录响应日志失败: {str(e)}")
+
+    def resolve_identity(self, account: Optional[Dict] = None,
+                         settings: Optional[ClientSettings] = None) -> Identity:
+        """
+        确定一次登录使用的身份
+        account 可覆盖 user_id/password/service/ip/mac，未提供的字段使用配置与本机网卡信息
+        """
+        settings = settings or self.settings
+        account = account or {}
+        ip, mac = account.get('ip'), account.get('mac')
+        if not ip and not mac and settings.custom_ip and settings.custom_mac:
+            # 使用自定义设备信息
+            ip, mac = settings.custom_ip, settings.custom_mac
+        if not ip or not mac:
+            # 使用本机网卡信息（已缓存，不做主机名解析）
+            host = self.identity.resolve()
+            ip = ip or host.ip
+            mac = mac or host.mac
+        return Identity(
+            account.get('user_id') or settings.user_id,
+            account.get('password') or settings.password,
+            account.get('service') or settings.service,
+            ip,
+            mac
+        )
+
+    def prepare_request(self, identity: Identity) -> LoginRequest:
+        """获取预编译的登录请求，同一身份只编码一次"""
+        request = self.templates.get(identity)
+        if request is None:
+            request = self.templates.put(identity, LoginRequest.compile(identity))
+        return request
+
+    def invalidate_templates(self):
+        """配置变更后调用，丢弃所有预编译的登录请求"""
+        self.templates.clear()
+
+    def observe_request(self, started: float, response, primary: bool = True):
+        """
+        记录一次门户请求的耗时：收到响应头之前计为门户响应，之后计为读取响应体
+        只有发往首选地址的请求计入对冲分位数，改发到其他地址的请求不影响补发时机
+        """
+        total = time.perf_counter() - started
+        if primary:
+            self.hedging.record(total)
+        server = response.elapsed.total_seconds()
+        METRICS.observe(PHASE_METRIC, server, phase='server')
+        METRICS.observe(PHASE_METRIC, max(0.0, total - server), phase='transfer')
+
+    def handle_result(self, attempt: int, result: PortalResult, on_attempt=None) -> Optional[str]:
+        """处理一次登录尝试的门户响应：已在线返回 None，否则返回失败说明"""
+        METRICS.inc(OUTCOMES_METRIC, outcome=result.outcome.value)
+        if result.portal_healthy:
+            # 门户能正常应答即视为可用，账号问题不计入熔断
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+
+        if result.online:
+            self.log("登录成功！" if result.outcome == PortalOutcome.SUCCESS else "已经在线，无需登录")
+            if on_attempt:
+                on_attempt(attempt, True, "登录成功", False)
+            return None
+
+        message = f"第 {attempt} 次尝试失败: {result.message}" if result.malformed else f"登录失败: {result.message}"
+        self.log(message)
+        if not result.portal_healthy:
+            self.logger.error(message)
+        return message
+
+    def network_error(self, message: str):
+        """一次登录尝试因网络错误失败"""
+        METRICS.inc(OUTCOMES_METRIC, outcome='network_error')
+        self.breaker.record_failure()
+        self.log(message)
+        self.logger.error(message)
+
+    def retry_delay(self, policy: RetryPolicy, attempt: int, started: float,
+                    retryable: bool) -> Optional[float]:
+        """一次尝试失败后是否重试：返回重试前的等待时间，不再重试时返回 None"""
+        if not retryable:
+            self.log("该错误重试无效，停止登录")
+            return None
+        if not self.breaker.allow():
+            self.log("认证门户连续失败，停止重试")
+            return None
+        return policy.next_delay(attempt, started)
+
+    def on_hedge(self, event: str, url: str):
+        """对冲补发的请求已发出（sent）或其结果被采用（won），见 EndpointPool.race"""
+        METRICS.inc(HEDGES_METRIC, result=event)
+
+    def late_success(self, winner: PortalResult, result: PortalResult) -> bool:
+        """
+        落后的请求稍后也登录成功：只计数，不再重复处理
+        先返回的只是“已经在线”（门户先处理了落后的请求）时返回 True，应保存落后请求带回的会话
+        """
+        if result.outcome != PortalOutcome.SUCCESS:
+            return False
+        METRICS.inc(HEDGES_METRIC, result='duplicate')
+        return winner.outcome != PortalOutcome.SUCCESS
+
+    def check_result(self, response) -> bool:
+        """解析提交登录表单检测网络状态的响应，已在线返回 True"""
+        result = PortalResult.from_response(response)
+        # 记录响应数据包
+        self.log_response(response, result)
+        if result.outcome == PortalOutcome.ALREADY_ONLINE:
+            print("检测到已经登录")
+            return True
+        if result.malformed:
+            self.logger.error("响应格式无效")
+        else:
+            print(f"检测到需要登录: {result.message or '未知状态'}")
+        return False
+
+
+def _forward(name: str, doc: str) -> property:
+    """只读属性，读取客户端持有的 PortalCore 的同名属性（热加载后总是最新值）"""
+    return property(lambda self: getattr(self.core, name), doc=doc)
+
+
+class PortalClientFacade:
+    """
+    登录客户端对外公开的共用属性与辅助方法，都转发给客户端持有的 PortalCore
+    登录、探测、关闭等方法由各客户端按自己的方式（同步或异步）实现
+    """
+    core: PortalCore
+
+    config_path = _forward('config_path', "配置文件路径")
+    config_service = _forward('config_service', "配置服务，用于保存与订阅配置修改")
+    config = _forward('config', "当前配置")
+    is_first_run = _forward('is_first_run', "是否首次运行（配置文件刚创建）")
+    settings = _forward('settings', "登录相关设置的不可变快照")
+    url = _forward('url', "首选门户地址")
+    endpoints = _forward('endpoints', "门户地址池")
+    hedging = _forward('hedging', "请求对冲策略")
+    breaker = _forward('breaker', "门户熔断器")
+    headers = _forward('headers', "门户请求头")
+    identity = _forward('identity', "本机 IP/MAC 解析器")
+    templates = _forward('templates', "按身份缓存的预编译登录请求")
+    retry_policy = _forward('retry_policy', "当前使用的重试策略")
+    enable_packet_capture = _forward('enable_packet_capture', "抓包开关")
+
+    @property
+    def max_retries(self) -> int:
+        """最大尝试次数"""
+        return self.core.retry_policy.max_attempts
+
+    def set_log_callback(self, callback):
+        """设置日志回调函数"""
+        self.core.log_callback = callback
+
+    def _log(self, message):
+        self.core.log(message)
+
+    def resolve_identity(self, account: Optional[Dict] = None,
+                         settings: Optional[ClientSettings] = None) -> Identity:
+        return self.core.resolve_identity(account, settings)
+
+    def prepare_request(self, identity: Identity) -> LoginRequest:
+        return self.core.prepare_request(identity)
+
+    def invalidate_templates(self):
+        self.core.invalidate_templates()
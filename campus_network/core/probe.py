@@ -0,0 +1,221 @@
+import socket
+import time
+from enum import Enum
+from typing import List, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+DEFAULT_DETECT_URL = 'http://www.msftconnecttest.com/connecttest.txt'
+DEFAULT_DETECT_TEXT = 'Microsoft Connect Test'
+DEFAULT_REDIRECT_URL = 'http://www.baidu.com/'
+DEFAULT_TCP_TARGET = 'www.baidu.com:443'
+DEFAULT_STRATEGIES = 'captive,redirect,tcp'
+DEFAULT_PROBE_TIMEOUT = 2.0
+
+
+class OnlineStatus(Enum):
+    """网络在线状态"""
+    ONLINE = 'online'        # 已认证，可以访问外网
+    CAPTIVE = 'captive'      # 被认证门户拦截，需要登录
+    OFFLINE = 'offline'      # 网络不可达
+    UNKNOWN = 'unknown'      # 无法判断
+
+
+class ProbeResult:
+    """单次探测结果"""
+    def __init__(self, status: OnlineStatus, strategy: str, latency: float = 0.0, detail: str = ''):
+        self.status = status
+        self.strategy = strategy
+        self.latency = latency
+        self.detail = detail
+
+    @property
+    def is_conclusive(self) -> bool:
+        """结果是否足以判断是否需要登录"""
+        return self.status in (OnlineStatus.ONLINE, OnlineStatus.CAPTIVE)
+
+    def __repr__(self):
+        return f"ProbeResult({self.status.value}, {self.strategy}, {self.latency * 1000:.0f}ms, {self.detail!r})"
+
+
+class ProbeStrategy:
+    """探测策略基类"""
+    name = 'base'
+
+    def __init__(self, timeout: float = DEFAULT_PROBE_TIMEOUT):
+        self.timeout = timeout
+
+    def probe(self) -> ProbeResult:
+        start = time.perf_counter()
+        try:
+            status, detail = self._probe()
+        except (requests.exceptions.RequestException, OSError) as e:
+            status, detail = self.classify_error(e), str(e)
+        return ProbeResult(status, self.name, time.perf_counter() - start, detail)
+
+    def _probe(self):
+        raise NotImplementedError
+
+    def classify_error(self, error) -> OnlineStatus:
+        """根据探测出错的异常判断状态（同步与异步探测共用）"""
+        return OnlineStatus.UNKNOWN
+
+
+class CaptivePortalProbe(ProbeStrategy):
+    """访问操作系统使用的联网检测地址，内容不符或被重定向即视为被门户拦截"""
+    name = 'captive'
+
+    def __init__(self, session: requests.Session, url: str = DEFAULT_DETECT_URL,
+                 expected_text: str = DEFAULT_DETECT_TEXT, portal_host: str = '', timeout: float = DEFAULT_PROBE_TIMEOUT):
+        super().__init__(timeout)
+        self.session = session
+        self.url = url
+        self.expected_text = expected_text
+        self.portal_host = portal_host
+
+    def _probe(self):
+        return self.classify(self.session.get(self.url, timeout=self.timeout, allow_redirects=False))
+
+    def classify(self, response):
+        """根据响应判断状态（同步与异步探测共用）"""
+        if response.status_code == 204:
+            return OnlineStatus.ONLINE, '204'
+        if response.is_redirect:
+            return OnlineStatus.CAPTIVE, f"重定向到 {response.headers.get('Location', '')}"
+        if response.status_code == 200:
+            if self.expected_text and self.expected_text in response.text:
+                return OnlineStatus.ONLINE, '检测内容匹配'
+            if self.portal_host and self.portal_host in response.text:
+                return OnlineStatus.CAPTIVE, '返回了认证页面'
+            return OnlineStatus.CAPTIVE, '检测内容不匹配'
+        return OnlineStatus.UNKNOWN, f"状态码 {response.status_code}"
+
+
+class RedirectProbe(ProbeStrategy):
+    """访问普通网站，检查是否被重定向到认证门户"""
+    name = 'redirect'
+
+    def __init__(self, session: requests.Session, url: str = DEFAULT_REDIRECT_URL,
+                 portal_host: str = '', timeout: float = DEFAULT_PROBE_TIMEOUT):
+        super().__init__(timeout)
+        self.session = session
+        self.url = url
+        self.portal_host = portal_host
+
+    def _probe(self):
+        return self.classify(self.session.get(self.url, timeout=self.timeout, allow_redirects=False))
+
+    def classify(self, response):
+        """根据响应判断状态（同步与异步探测共用）"""
+        location = response.headers.get('Location', '')
+        if response.is_redirect:
+            if self.portal_host and self.portal_host in location:
+                return OnlineStatus.CAPTIVE, f"重定向到 {location}"
+            return OnlineStatus.UNKNOWN, f"重定向到 {location}"
+        if response.status_code == 200:
+            # 锐捷门户常以 200 + 脚本跳转的方式拦截
+            if self.portal_host and self.portal_host in response.text:
+                return OnlineStatus.CAPTIVE, '页面跳转到认证门户'
+            return OnlineStatus.ONLINE, '页面正常'
+        return OnlineStatus.UNKNOWN, f"状态码 {response.status_code}"
+
+
+class TcpProbe(ProbeStrategy):
+    """与外网主机建立 TCP 连接，成功即视为在线；失败无法区分掉线与被拦截"""
+    name = 'tcp'
+
+    def __init__(self, target: str = DEFAULT_TCP_TARGET, timeout: float = DEFAULT_PROBE_TIMEOUT):
+        super().__init__(timeout)
+        host, _, port = target.rpartition(':')
+        self.host = host or target
+        self.port = int(port) if host else 443
+
+    def _probe(self):
+        with socket.create_connection((self.host, self.port), timeout=self.timeout):
+            return OnlineStatus.ONLINE, f"{self.host}:{self.port} 可连接"
+
+    def classify_error(self, error) -> OnlineStatus:
+        if isinstance(error, socket.gaierror):
+            return OnlineStatus.UNKNOWN
+        return OnlineStatus.OFFLINE
+
+
+class OnlineProber:
+    """
+    轻量级在线状态探测
+    功能：
+    1. 按配置顺序依次执行探测策略，得到明确结果即停止
+    2. 所有轻量探测都无法判断时，才回退到提交登录表单的检测方式
+    """
+    def __init__(self, client, strategies: Optional[List[ProbeStrategy]] = None):
+        self.client = client
+        self._session = None
+        self.strategies = strategies if strategies is not None else self._build_strategies()
+        self.use_login_fallback = client.config.getboolean('Probe', 'login_fallback', fallback=True)
+        self.last_result: Optional[ProbeResult] = None
+
+    def _get_session(self) -> requests.Session:
+        """探测使用独立会话，不带门户专用的请求头"""
+        if self._session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=2, pool_maxsize=2, max_retries=0)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._session = session
+        return self._session
+
+    def _build_strategies(self) -> List[ProbeStrategy]:
+        """根据配置文件构建探测策略"""
+        config = self.client.config
+        timeout = config.getfloat('Probe', 'timeout', fallback=DEFAULT_PROBE_TIMEOUT)
+        portal_host = urlsplit(self.client.url).hostname or ''
+        names = config.get('Probe', 'strategies', fallback=DEFAULT_STRATEGIES)
+        strategies = []
+        for name in [n.strip().lower() for n in names.split(',') if n.strip()]:
+            if name == 'captive':
+                strategies.append(CaptivePortalProbe(
+                    self._get_session(),
+                    config.get('Probe', 'detect_url', fallback=DEFAULT_DETECT_URL),
+                    config.get('Probe', 'detect_text', fallback=DEFAULT_DETECT_TEXT),
+                    portal_host, timeout))
+            elif name == 'redirect':
+                strategies.append(RedirectProbe(
+                    self._get_session(),
+                    config.get('Probe', 'redirect_url', fallback=DEFAULT_REDIRECT_URL),
+                    portal_host, timeout))
+            elif name == 'tcp':
+                strategies.append(TcpProbe(config.get('Probe', 'tcp_target', fallback=DEFAULT_TCP_TARGET), timeout))
+        return strategies
+
+    def reconfigure(self):
+        """配置或门户地址修改后重建探测策略，继续使用已有的连接"""
+        self.strategies = self._build_strategies()
+        self.use_login_fallback = self.client.config.getboolean('Probe', 'login_fallback', fallback=True)
+
+    def probe(self) -> ProbeResult:
+        """探测当前在线状态"""
+        result = ProbeResult(OnlineStatus.UNKNOWN, 'none')
+        for strategy in self.strategies:
+            result = strategy.probe()
+            if result.is_conclusive:
+                break
+        else:
+            if self.use_login_fallback:
+                result = self._login_fallback()
+        self.last_result = result
+        return result
+
+    def _login_fallback(self) -> ProbeResult:
+        """回退：提交登录表单，根据“已经在线”判断"""
+        start = time.perf_counter()
+        online = self.client._check_internet_connection()
+        status = OnlineStatus.ONLINE if online else OnlineStatus.CAPTIVE
+        return ProbeResult(status, 'login', time.perf_counter() - start)
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
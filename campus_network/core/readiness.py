@@ -0,0 +1,138 @@
+import ipaddress
+import socket
+import threading
+import time
+from typing import List, Optional
+from urllib.parse import urlsplit
+
+
+DEFAULT_CAMPUS_SUBNET = '172.17.0.0/16'
+DEFAULT_DNS_HOST = 'www.baidu.com'
+DEFAULT_READY_SIGNALS = 'gateway,address,dns'
+DEFAULT_READY_TIMEOUT = 30.0
+DEFAULT_POLL_INTERVAL = 0.2
+
+
+class NetworkReadiness:
+    """
+    开机网络就绪检测
+    功能：
+    1. 检测网卡是否已获得校园网网段的地址
+    2. 检测认证网关是否可以建立 TCP 连接
+    3. 检测 DNS 是否可以解析
+    任意一项满足即视为网络就绪，超过时限仍未就绪则放弃等待
+    """
+    def __init__(self, gateway_host: str, gateway_port: int = 80,
+                 campus_subnet: str = DEFAULT_CAMPUS_SUBNET,
+                 dns_host: str = DEFAULT_DNS_HOST,
+                 signals: Optional[List[str]] = None,
+                 timeout: float = DEFAULT_READY_TIMEOUT,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL):
+        self.gateway_host = gateway_host
+        self.gateway_port = gateway_port
+        self.campus_subnet = ipaddress.ip_network(campus_subnet, strict=False)
+        self.dns_host = dns_host
+        self.signals = signals if signals is not None else DEFAULT_READY_SIGNALS.split(',')
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._dns_thread: Optional[threading.Thread] = None
+        self._dns_ok = threading.Event()
+
+    @classmethod
+    def from_config(cls, config, url: str) -> 'NetworkReadiness':
+        """根据配置文件和门户地址创建"""
+        parts = urlsplit(url)
+        signals = config.get('Startup', 'ready_signals', fallback=DEFAULT_READY_SIGNALS)
+        return cls(
+            parts.hostname or '172.17.10.100',
+            parts.port or (443 if parts.scheme == 'https' else 80),
+            campus_subnet=config.get('Network', 'campus_subnet', fallback=DEFAULT_CAMPUS_SUBNET),
+            dns_host=config.get('Startup', 'dns_host', fallback=DEFAULT_DNS_HOST),
+            signals=[s.strip().lower() for s in signals.split(',') if s.strip()],
+            timeout=config.getfloat('Startup', 'ready_timeout', fallback=DEFAULT_READY_TIMEOUT)
+        )
+
+    def has_campus_address(self) -> bool:
+        """是否有网卡获得了校园网网段的 IPv4 地址"""
+        try:
+            import psutil
+        except ImportError:
+            return False
+        for addresses in psutil.net_if_addrs().values():
+            for address in addresses:
+                if address.family != socket.AF_INET:
+                    continue
+                try:
+                    if ipaddress.ip_address(address.address) in self.campus_subnet:
+                        return True
+                except ValueError:
+                    continue
+        return False
+
+    def gateway_reachable(self, timeout: float = 0.5) -> bool:
+        """认证网关是否可以建立 TCP 连接"""
+        try:
+            with socket.create_connection((self.gateway_host, self.gateway_port), timeout=timeout):
+                return True
+        except OSError:
+            return False
+
+    def dns_ready(self) -> bool:
+        """DNS 是否已可以解析；解析在后台线程进行，不阻塞轮询"""
+        if self._dns_ok.is_set():
+            return True
+        if self._dns_thread is None or not self._dns_thread.is_alive():
+            self._dns_thread = threading.Thread(target=self._resolve, name='DnsReadiness', daemon=True)
+            self._dns_thread.start()
+        return False
+
+    def _resolve(self):
+        try:
+            socket.getaddrinfo(self.dns_host, 80, socket.AF_INET, socket.SOCK_STREAM)
+            self._dns_ok.set()
+        except OSError:
+            pass
+
+    def check(self) -> Optional[str]:
+        """检查一次，返回已满足的信号名称，均未满足返回 None"""
+        for signal in self.signals:
+            if signal == 'address' and self.has_campus_address():
+                return signal
+            if signal == 'gateway' and self.gateway_reachable():
+                return signal
+            if signal == 'dns' and self.dns_ready():
+                return signal
+        return None
+
+    def wait(self, cancel_event: Optional[threading.Event] = None) -> Optional[str]:
+        """等待网络就绪，返回触发就绪的信号；超时或被取消返回 None"""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            signal = self.check()
+            if signal:
+                return signal
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            wait = min(self.poll_interval, remaining)
+            if cancel_event is not None:
+                if cancel_event.wait(wait):
+                    return None
+            else:
+                time.sleep(wait)
+
+
+def wait_for_network(client, cancel_event: Optional[threading.Event] = None) -> bool:
+    """等待网络就绪后再登录，记录等待时间，返回是否在时限内就绪"""
+    readiness = NetworkReadiness.from_config(client.config, client.url)
+    client._log("等待网络就绪...")
+    start = time.perf_counter()
+    signal = readiness.wait(cancel_event)
+    elapsed = time.perf_counter() - start
+    # 网络状态刚发生变化，之前缓存的本机身份不再可靠
+    client.identity.invalidate()
+    if signal:
+        client._log(f"网络已就绪（{signal}），等待 {elapsed:.1f} 秒")
+        return True
+    client._log(f"等待 {elapsed:.1f} 秒后网络仍未就绪，继续尝试登录")
+    return False
@@ -0,0 +1,99 @@
+import json
+from enum import Enum
+from functools import lru_cache
+from typing import Dict, Optional
+
+
+class PortalOutcome(Enum):
+    """门户登录响应的结果类型"""
+    SUCCESS = 'success'
+    ALREADY_ONLINE = 'already_online'
+    BAD_CREDENTIALS = 'bad_credentials'
+    DEVICE_LIMIT = 'device_limit'
+    PORTAL_ERROR = 'portal_error'
+
+
+# 门户失败消息关键字与结果类型的对应表，按顺序匹配，先匹配到的生效
+MESSAGE_RULES = (
+    ('已经在线', PortalOutcome.ALREADY_ONLINE),
+    ('已在线', PortalOutcome.ALREADY_ONLINE),
+    ('在线设备', PortalOutcome.DEVICE_LIMIT),
+    ('设备数', PortalOutcome.DEVICE_LIMIT),
+    ('终端数', PortalOutcome.DEVICE_LIMIT),
+    ('密码错误', PortalOutcome.BAD_CREDENTIALS),
+    ('密码不正确', PortalOutcome.BAD_CREDENTIALS),
+    ('用户不存在', PortalOutcome.BAD_CREDENTIALS),
+    ('账号不存在', PortalOutcome.BAD_CREDENTIALS),
+    # 账号本身不可用，与密码错误一样重试无效
+    ('已欠费', PortalOutcome.BAD_CREDENTIALS),
+    ('已停机', PortalOutcome.BAD_CREDENTIALS),
+    ('已暂停', PortalOutcome.BAD_CREDENTIALS),
+)
+
+
+@lru_cache(maxsize=256)
+def classify_message(message: str) -> PortalOutcome:
+    """根据门户失败消息判断结果类型，门户消息种类有限，结果缓存"""
+    for keyword, outcome in MESSAGE_RULES:
+        if keyword in message:
+            return outcome
+    return PortalOutcome.PORTAL_ERROR
+
+
+class PortalResult:
+    """
+    解析后的门户响应
+    每个响应只解析一次，日志记录与登录判断共用同一份结果
+    """
+    __slots__ = ('status_code', 'outcome', 'message', 'data', 'malformed')
+
+    def __init__(self, status_code: int, outcome: PortalOutcome, message: str = '',
+                 data: Optional[Dict] = None, malformed: bool = False):
+        self.status_code = status_code
+        self.outcome = outcome
+        self.message = message
+        self.data = data
+        self.malformed = malformed
+
+    @classmethod
+    def parse(cls, status_code: int, text: str) -> 'PortalResult':
+        """解析门户响应文本"""
+        if status_code != 200:
+            return cls(status_code, PortalOutcome.PORTAL_ERROR, f"状态码 {status_code}")
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return cls(status_code, PortalOutcome.PORTAL_ERROR, "响应格式无效", malformed=True)
+        if not isinstance(data, dict):
+            return cls(status_code, PortalOutcome.PORTAL_ERROR, "响应格式无效", data, malformed=True)
+
+        message = data.get('message') or ''
+        if not isinstance(message, str):
+            # 个别门户返回数字或对象形式的 message，统一按文本处理
+            message = str(message)
+        if data.get('result') == 'success':
+            return cls(status_code, PortalOutcome.SUCCESS, message, data)
+        return cls(status_code, classify_message(message), message or '未知错误', data)
+
+    @classmethod
+    def from_response(cls, response) -> 'PortalResult':
+        """从 requests.Response（或接口相同的对象）解析"""
+        return cls.parse(response.status_code, response.text)
+
+    @property
+    def online(self) -> bool:
+        """登录后是否已在线"""
+        return self.outcome in (PortalOutcome.SUCCESS, PortalOutcome.ALREADY_ONLINE)
+
+    @property
+    def portal_healthy(self) -> bool:
+        """门户是否正常应答（账号问题不代表门户故障）"""
+        return self.status_code == 200 and not self.malformed
+
+    @property
+    def retryable(self) -> bool:
+        """只有门户故障值得重试，账号或设备数问题重试无效"""
+        return self.outcome == PortalOutcome.PORTAL_ERROR
+
+    def __repr__(self):
+        return f"PortalResult({self.status_code}, {self.outcome.value}, {self.message!r})"
@@ -0,0 +1,195 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, Tuple
+
+from .result import PortalResult
+
+
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 30.0
+DEFAULT_DEADLINE = 60.0
+DEFAULT_CONNECT_TIMEOUT = 3.0
+DEFAULT_READ_TIMEOUT = 5.0
+DEFAULT_BREAKER_THRESHOLD = 5
+DEFAULT_BREAKER_RESET = 60.0
+
+# 除 result.MESSAGE_RULES 已识别的账号、设备数问题外，额外不重试的门户消息关键字
+DEFAULT_NO_RETRY_MESSAGES = ''
+
+
+class RetryPolicy:
+    """
+    登录重试策略
+    功能：
+    1. 指数退避 + 全抖动，避免整个机房在门户恢复瞬间同步重试
+    2. 总时限，超过后不再重试
+    3. 连接超时与读取超时分开设置
+    4. 区分可重试的网络错误与不应重试的门户消息
+    """
+    def __init__(self, max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 base_delay: float = DEFAULT_BASE_DELAY,
+                 max_delay: float = DEFAULT_MAX_DELAY,
+                 deadline: float = DEFAULT_DEADLINE,
+                 connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout: float = DEFAULT_READ_TIMEOUT,
+                 no_retry_messages: str = DEFAULT_NO_RETRY_MESSAGES,
+                 rng: Optional[random.Random] = None):
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = max(0.0, base_delay)
+        self.max_delay = max(self.base_delay, max_delay)
+        self.deadline = deadline
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.no_retry_messages = tuple(m.strip() for m in no_retry_messages.split(',') if m.strip())
+        self._rng = rng or random.Random()
+
+    @classmethod
+    def from_config(cls, config) -> 'RetryPolicy':
+        """从配置文件 [Retry] 节读取"""
+        return cls(
+            max_attempts=config.getint('Retry', 'max_attempts', fallback=DEFAULT_MAX_ATTEMPTS),
+            base_delay=config.getfloat('Retry', 'base_delay', fallback=DEFAULT_BASE_DELAY),
+            max_delay=config.getfloat('Retry', 'max_delay', fallback=DEFAULT_MAX_DELAY),
+            deadline=config.getfloat('Retry', 'deadline', fallback=DEFAULT_DEADLINE),
+            connect_timeout=config.getfloat('Retry', 'connect_timeout', fallback=DEFAULT_CONNECT_TIMEOUT),
+            read_timeout=config.getfloat('Retry', 'read_timeout', fallback=DEFAULT_READ_TIMEOUT),
+            no_retry_messages=config.get('Retry', 'no_retry_messages', fallback=DEFAULT_NO_RETRY_MESSAGES)
+        )
+
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        """requests 使用的 (连接超时, 读取超时)"""
+        return (self.connect_timeout, self.read_timeout)
+
+    def backoff(self, attempt: int) -> float:
+        """第 attempt 次失败后的等待时间：[0, min(max_delay, base * 2^(attempt-1))] 内均匀随机"""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return self._rng.uniform(0, ceiling)
+
+    def should_retry(self, result: PortalResult) -> bool:
+        """解析后的门户响应是否值得重试"""
+        return result.retryable and not any(keyword in result.message for keyword in self.no_retry_messages)
+
+    def next_delay(self, attempt: int, started: float) -> Optional[float]:
+        """
+        计算下一次重试前的等待时间
+        已达到最大次数或等待后会超过总时限时返回 None
+        """
+        if attempt >= self.max_attempts:
+            return None
+        delay = self.backoff(attempt)
+        if self.deadline and time.monotonic() - started + delay >= self.deadline:
+            return None
+        return delay
+
+
+class CircuitBreaker:
+    """
+    门户熔断器
+    连续失败达到阈值后进入熔断状态，在冷却时间内直接放弃请求；
+    冷却结束后只放行一次试探请求，成功则恢复，失败则继续熔断；
+    试探请求未记录结果就结束（取消、异常）或超过冷却时间仍未完成时按失败处理
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = DEFAULT_BREAKER_THRESHOLD,
+                 reset_timeout: float = DEFAULT_BREAKER_RESET):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_at = 0.0
+        # 当前试探请求的标识；持有者记录在各线程/协程自己的上下文中
+        self._trial: Optional[object] = None
+        self._trial_owner: ContextVar = ContextVar(f'breaker_trial_{id(self)}', default=None)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config) -> 'CircuitBreaker':
+        return cls(
+            config.getint('Retry', 'breaker_threshold', fallback=DEFAULT_BREAKER_THRESHOLD),
+            config.getfloat('Retry', 'breaker_reset', fallback=DEFAULT_BREAKER_RESET)
+        )
+
+    def reconfigure(self, config):
+        """配置修改后更新阈值与冷却时间，保留当前状态"""
+        fresh = self.from_config(config)
+        with self._lock:
+            self.failure_threshold = fresh.failure_threshold
+            self.reset_timeout = fresh.reset_timeout
+
+    def allow(self) -> bool:
+        """是否允许发送请求"""
+        # 正常状态下不加锁，只有状态转换时才需要
+        if self.state == self.CLOSED:
+            return True
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            now = time.monotonic()
+            if self.state == self.HALF_OPEN and now - self._trial_at >= self.reset_timeout:
+                # 试探请求迟迟没有结果，视为失败，重新开始冷却
+                self._open(now)
+                return False
+            if self.state == self.OPEN and now - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_at = now
+                self._trial = trial = object()
+                self._trial_owner.set(trial)
+                return True
+            return False
+
+    def _open(self, now: float):
+        self.state = self.OPEN
+        self._opened_at = now
+        self._trial = None
+
+    def retry_after(self) -> float:
+        """距离允许试探还需等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == self.OPEN:
+                return max(0.0, self.reset_timeout - (now - self._opened_at))
+            if self.state == self.HALF_OPEN:
+                # 试探请求超时后才会重新放行
+                return max(0.0, 2 * self.reset_timeout - (now - self._trial_at))
+            return 0.0
+
+    @contextmanager
+    def attempt(self):
+        """
+        包裹一次登录：其中 allow() 放行的试探请求若直到结束都没有记录结果，按失败处理，
+        避免熔断器永远停在半开状态
+        """
+        token = self._trial_owner.set(None)
+        try:
+            yield
+        finally:
+            trial = self._trial_owner.get()
+            self._trial_owner.reset(token)
+            if trial is not None:
+                with self._lock:
+                    if self.state == self.HALF_OPEN and self._trial is trial:
+                        self.failures += 1
+                        self._open(time.monotonic())
+
+    def record_success(self):
+        if self.state == self.CLOSED and self.failures == 0:
+            return
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self._open(time.monotonic())
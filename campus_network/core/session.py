@@ -0,0 +1,177 @@
+import ipaddress
+import socket
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util.connection import allowed_gai_family
+
+from .metrics import METRICS, PHASE_METRIC, CONNECTIONS_METRIC
+
+
+DEFAULT_POOL_SIZE = 4
+
+
+def _is_ip_address(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host.strip('[]'))
+        return True
+    except ValueError:
+        return False
+
+
+class _TimedConnectionMixin:
+    """
+    记录新建连接的耗时：DNS 解析单独计时，其余（TCP 与 TLS 握手）计入 connect
+    DNS 单独计时依赖 urllib3 2.x 的内部属性 _dns_host/_new_conn，
+    缺少时直接使用 urllib3 自带的建连过程，DNS 耗时一并计入 connect
+    """
+    _dns_elapsed = 0.0
+
+    def _new_conn(self):
+        host = getattr(self, '_dns_host', None)
+        if not isinstance(host, str) or _is_ip_address(host):
+            return super()._new_conn()
+        started = time.perf_counter()
+        try:
+            with METRICS.phase('dns'):
+                addresses = socket.getaddrinfo(host, self.port, allowed_gai_family(), socket.SOCK_STREAM)
+        except socket.gaierror:
+            # 解析失败时交给 urllib3 重新解析并抛出对应的异常
+            return super()._new_conn()
+        finally:
+            self._dns_elapsed = time.perf_counter() - started
+
+        # 依次连接解析出的地址，与 urllib3 的 create_connection 行为一致
+        error = None
+        for *_, sockaddr in addresses:
+            self._dns_host = sockaddr[0]
+            try:
+                return super()._new_conn()
+            except ConnectTimeoutError as e:
+                error = e
+            finally:
+                self._dns_host = host
+        if error is None:
+            raise NewConnectionError(self, f"无法解析门户地址 {host}: getaddrinfo 未返回任何地址")
+        raise error
+
+    def connect(self):
+        self._dns_elapsed = 0.0
+        started = time.perf_counter()
+        super().connect()
+        METRICS.observe(PHASE_METRIC, time.perf_counter() - started - self._dns_elapsed, phase='connect')
+        METRICS.inc(CONNECTIONS_METRIC)
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedHTTPAdapter(HTTPAdapter):
+    """新建连接时记录耗时的 HTTPAdapter"""
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool
+        }
+
+
+class PortalSession:
+    """
+    ePortal 长连接会话
+    功能：
+    1. 复用 requests.Session 的连接池，避免每次请求都重新建立 TCP 连接（每个门户地址一个池）
+    2. 请求头只构建一次，后续请求直接复用
+    3. 统计连接复用情况，新建连接的耗时计入指标
+    """
+    def __init__(self, base_url: str, headers: Dict, pool_size: int = DEFAULT_POOL_SIZE, hosts: int = 1):
+        self.base_url = base_url
+        self.pool_size = max(1, int(pool_size))
+        # 每个门户地址各自保留一个连接池，多个地址交替使用时不会互相挤掉
+        self.hosts = max(1, int(hosts))
+        self._lock = threading.Lock()
+        self._session = self._create_session(headers)
+
+    def _create_session(self, headers: Dict) -> requests.Session:
+        """创建带连接池的会话"""
+        session = requests.Session()
+        adapter = _TimedHTTPAdapter(
+            pool_connections=self.hosts,
+            pool_maxsize=self.pool_size,
+            pool_block=False,
+            max_retries=0
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        # 请求头只设置一次，Session 会在每次请求时合并
+        session.headers.clear()
+        session.headers.update(headers)
+        return session
+
+    @property
+    def headers(self) -> Dict:
+        """当前会话使用的请求头"""
+        return dict(self._session.headers)
+
+    def post(self, url: Optional[str] = None, data=None, timeout=5, **kwargs) -> requests.Response:
+        """通过连接池发送 POST 请求"""
+        return self._session.post(url or self.base_url, data=data, timeout=timeout, **kwargs)
+
+    def get(self, url: Optional[str] = None, timeout=5, **kwargs) -> requests.Response:
+        """通过连接池发送 GET 请求"""
+        return self._session.get(url or self.base_url, timeout=timeout, **kwargs)
+
+    def cookies(self) -> Dict[str, str]:
+        """当前会话的 Cookie"""
+        return requests.utils.dict_from_cookiejar(self._session.cookies)
+
+    def restore_cookies(self, cookies: Dict[str, str]):
+        """恢复之前保存的 Cookie"""
+        requests.utils.add_dict_to_cookiejar(self._session.cookies, cookies)
+
+    def stats(self) -> Dict:
+        """获取连接复用统计"""
+        requests_sent = 0
+        connections = 0
+        with self._lock:
+            for adapter in set(self._session.adapters.values()):
+                pools = adapter.poolmanager.pools
+                for key in list(pools.keys()):
+                    pool = pools.get(key)
+                    if pool is None:
+                        continue
+                    requests_sent += pool.num_requests
+                    connections += pool.num_connections
+        reused = max(0, requests_sent - connections)
+        return {
+            'host': urlsplit(self.base_url).netloc,
+            'pool_size': self.pool_size,
+            'requests': requests_sent,
+            'connections': connections,
+            'reused': reused,
+            'reuse_ratio': (reused / requests_sent) if requests_sent else 0.0
+        }
+
+    def close(self):
+        """关闭会话并释放连接池"""
+        self._session.close()
@@ -0,0 +1,45 @@
+from typing import NamedTuple, Optional, Tuple
+
+from .endpoints import parse_endpoints
+from .retry import RetryPolicy
+
+
+DEFAULT_URL = 'http://172.17.10.100/eportal/InterFace.do'
+
+
+class ClientSettings(NamedTuple):
+    """
+    登录客户端的设置快照
+    由配置文件生成后不再修改；配置变更时整体替换为新的快照，
+    正在进行的登录继续使用旧快照，不需要加锁
+    """
+    url: str
+    endpoints: Tuple[str, ...]
+    user_id: str
+    password: str
+    service: str
+    custom_ip: Optional[str]
+    custom_mac: Optional[str]
+    enable_packet_capture: bool
+    retry_policy: RetryPolicy
+
+    @classmethod
+    def from_config(cls, config) -> 'ClientSettings':
+        # [Endpoints] urls 可配置多个门户地址，未配置时只使用 Network.url
+        endpoints = parse_endpoints(config.get('Endpoints', 'urls', fallback='')) or \
+            (config.get('Network', 'url', fallback=DEFAULT_URL),)
+        return cls(
+            url=endpoints[0],
+            endpoints=endpoints,
+            user_id=config.get('Network', 'user_id', fallback=''),
+            password=config.get('Network', 'password', fallback=''),
+            service=config.get('Network', 'service', fallback=''),
+            custom_ip=config.get('Network', 'custom_ip', fallback=None) or None,
+            custom_mac=config.get('Network', 'custom_mac', fallback=None) or None,
+            enable_packet_capture=config.getboolean('Debug', 'enable_packet_capture', fallback=False),
+            retry_policy=RetryPolicy.from_config(config)
+        )
+
+    @property
+    def has_credentials(self) -> bool:
+        return bool(self.user_id and self.password)
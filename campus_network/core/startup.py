@@ -1,88 +1,39 @@
 import os
-import sys
 import time
-import subprocess
-import win32api
-import win32con
+
+from .launcher import PhaseTimer, boot_login, get_app_dir, set_startup_entry, spawn_gui
 
 def add_to_startup():
-    """添加到注册表启动项"""
-    try:
-        # 获取当前脚本的完整路径
-        startup_script = os.path.abspath(sys.argv[0])
-        startup_path = os.path.dirname(startup_script)
-        
-        # 打开注册表键
-        key = win32api.RegOpenKey(
-            win32con.HKEY_LOCAL_MACHINE,
-            r'SOFTWARE\Microsoft\Windows\CurrentVersion\Run',
-            0,
-            win32con.KEY_ALL_ACCESS
-        )
-        
-        # 设置启动命令，添加工作目录
-        if getattr(sys, 'frozen', False):
-            # 打包后的命令
-            cmd = f'cmd /c "cd /d "{startup_path}" && "{startup_script}"'
-        else:
-            # 开发环境的命令
-            python_path = os.path.join(startup_path, ".venv", "Scripts", "pythonw.exe")
-            cmd = f'cmd /c "cd /d "{startup_path}" && "{python_path}" "{startup_script}"'
-        
-        # 写入注册表
-        win32api.RegSetValueEx(
-            key,
-            "CQEVTCampusNetwork",
-            0,
-            win32con.REG_SZ,
-            cmd
-        )
-        
-        win32api.RegCloseKey(key)
-        print(f"已添加到开机启动项: {cmd}")
-        return True
-        
-    except Exception as e:
-        print(f"添加启动项失败: {str(e)}")
-        return False
+    """添加到注册表启动项，启动项已存在时不写注册表"""
+    return set_startup_entry(True)
 
 def startup():
+    """开机启动：在当前进程中完成登录，失败时才打开主窗口"""
     print("启动中...")
+    timer = PhaseTimer()
     try:
-        # 获取真实路径
-        startup_path = os.path.dirname(os.path.abspath(sys.argv[0]))
-        # 切换工作目录
-        os.chdir(startup_path)
-        print(f"工作目录已设置为: {startup_path}")
+        with timer.phase('设置工作目录'):
+            startup_path = get_app_dir()
+            os.chdir(startup_path)
+            print(f"工作目录已设置为: {startup_path}")
         
         # 确保程序在启动项中
-        add_to_startup()
-        
-        if getattr(sys, 'frozen', False):
-            # 打包后的路径
-            main_exe = os.path.join(startup_path, "重庆工程职业技术学院校园网自动登录.exe")
-            cmd = [main_exe, "--auto-login", "--startup"]
-        else:
-            # 开发环境路径
-            venv_path = os.path.join(startup_path, ".venv", "Scripts", "pythonw.exe")
-            main_py = os.path.join(startup_path, "main.py")
-            cmd = [venv_path, main_py, "--auto-login", "--startup"]
-        
-        print(f"启动命令: {' '.join(cmd)}")
-        
-        # 等待系统初始化
-        time.sleep(5)
-        
-        # 启动主程序（设置工作目录）
-        subprocess.Popen(cmd, cwd=startup_path)
-        print("启动完成...")
+        with timer.phase('检查启动项'):
+            add_to_startup()
+        
+        success = boot_login(timer)
+        timer.report()
+        if success:
+            print("启动完成...")
+            return
+
+        print("自动登录失败，打开主窗口...")
+        spawn_gui()
         
     except Exception as e:
         print(f"自启动失败: {str(e)}")
         print("请手动启动程序...")
         time.sleep(3)
-    
-    time.sleep(1)
 
 if __name__ == "__main__":
-    startup() 
\ No newline at end of file
+    startup() 
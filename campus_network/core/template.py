@@ -0,0 +1,97 @@
+from types import MappingProxyType
+from typing import Dict, Mapping, NamedTuple, Optional
+from urllib.parse import quote_plus
+
+
+# 登录表单字段顺序与 LoginRequest.fields 保持一致，保证编码结果与 urlencode 完全相同
+_STATIC_SUFFIX = b'&operatorPwd=&operatorUserId=&validcode=&passwordEncrypt=true'
+
+
+def _encode(value: str) -> bytes:
+    """
+    表单字段值编码（与 urlencode 使用相同的 quote_plus 规则）
+    不做全局缓存：编码结果已随 TemplateCache 按身份缓存，密码不应在其失效后仍留在内存中
+    """
+    return quote_plus(value).encode('ascii')
+
+
+def build_query_string(ip: str, mac: str) -> str:
+    """门户登录所需的 queryString"""
+    return (
+        f'wlanuserip%3D{ip}'
+        '%26wlanacname%3DNAS'
+        '%26ssid%3DRuijie'
+        '%26nasip%3D172.17.10.10'
+        f'%26mac%3D{mac}'
+        '%26t%3Dwireless-v2-plain'
+        '%26url%3Dhttp%3A%252F%252Fwww.baidu.com%252F'
+    )
+
+
+class Identity(NamedTuple):
+    """一次登录使用的身份（账号、服务与设备），不可变，可直接作为缓存键"""
+    user_id: str
+    password: str
+    service: str
+    ip: str
+    mac: str
+
+
+class LoginRequest(NamedTuple):
+    """
+    预编译的登录请求
+    每个身份只编码一次，之后每次尝试直接复用同一份请求体字节；
+    不可变，可在多个线程间共享
+    """
+    identity: Identity
+    fields: Mapping[str, str]
+    body: bytes
+
+    @classmethod
+    def compile(cls, identity: Identity) -> 'LoginRequest':
+        fields = {
+            'method': 'login',
+            'userId': identity.user_id,
+            'password': identity.password,
+            'service': identity.service,
+            'queryString': build_query_string(identity.ip, identity.mac),
+            'operatorPwd': '',
+            'operatorUserId': '',
+            'validcode': '',
+            'passwordEncrypt': 'true'
+        }
+        body = b''.join((
+            b'method=login',
+            b'&userId=', _encode(fields['userId']),
+            b'&password=', _encode(fields['password']),
+            b'&service=', _encode(fields['service']),
+            b'&queryString=', _encode(fields['queryString']),
+            _STATIC_SUFFIX
+        ))
+        return cls(identity, MappingProxyType(fields), body)
+
+
+class TemplateCache:
+    """
+    按身份缓存预编译的登录请求，配置变更时整体失效
+    读写都是单次字典操作，多线程共用时不需要加锁
+    """
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self._templates: Dict[Identity, LoginRequest] = {}
+
+    def get(self, identity: Identity) -> Optional[LoginRequest]:
+        return self._templates.get(identity)
+
+    def put(self, identity: Identity, request: LoginRequest) -> LoginRequest:
+        if len(self._templates) >= self.max_size:
+            # 超出上限时整体替换为新字典，避免为淘汰顺序加锁
+            self._templates = {}
+        self._templates[identity] = request
+        return request
+
+    def clear(self):
+        self._templates = {}
+
+    def __len__(self):
+        return len(self._templates)
@@ -0,0 +1,111 @@
+import os
+import threading
+from typing import Optional
+
+from .login import CampusNetworkLogin
+from .coordination import HostCoordinator, coordinated_login
+from .metrics import start_metrics_server
+
+
+DEFAULT_MIN_INTERVAL = 10.0
+DEFAULT_MAX_INTERVAL = 600.0
+DEFAULT_DECAY = 2.0
+
+
+class ConnectionWatchdog:
+    """
+    网络连接看门狗
+    功能：
+    1. 长期运行，周期性检测网络状态
+    2. 自适应检测间隔：掉线后快速检测，持续在线时按指数退避到慢速稳定状态
+    3. 仅在检测到掉线时重新登录
+    4. 本机其他实例刚确认在线时不再重复探测，掉线后的登录与其他实例协调
+    """
+    def __init__(self, client: CampusNetworkLogin,
+                 min_interval: Optional[float] = None,
+                 max_interval: Optional[float] = None,
+                 decay: Optional[float] = None,
+                 coordinator: Optional[HostCoordinator] = None):
+        self.client = client
+        self.coordinator = coordinator
+        config = client.config
+        self.min_interval = min_interval if min_interval is not None else \
+            config.getfloat('Watchdog', 'min_interval', fallback=DEFAULT_MIN_INTERVAL)
+        self.max_interval = max_interval if max_interval is not None else \
+            config.getfloat('Watchdog', 'max_interval', fallback=DEFAULT_MAX_INTERVAL)
+        self.decay = decay if decay is not None else \
+            config.getfloat('Watchdog', 'decay', fallback=DEFAULT_DECAY)
+        self.max_interval = max(self.min_interval, self.max_interval)
+        self.decay = max(1.0, self.decay)
+        self.interval = self.min_interval
+        self._stop_event = threading.Event()
+        # 统计信息
+        self.checks = 0
+        self.relogins = 0
+
+    def next_interval(self, online: bool) -> float:
+        """根据本次检测结果计算下一次检测间隔"""
+        if online:
+            self.interval = min(self.interval * self.decay, self.max_interval)
+        else:
+            self.interval = self.min_interval
+        return self.interval
+
+    def check_once(self) -> bool:
+        """检测一次网络状态，掉线时重新登录，返回本次是否处于在线状态"""
+        self.checks += 1
+        status = self.coordinator.cache.read() if self.coordinator is not None else None
+        if status is not None and status['online'] and status.get('pid') != os.getpid():
+            # 只信任其他实例刚确认的在线状态，自己写入的状态不能代替本次探测
+            return True
+        online = self.client.check_online()
+        if self.coordinator is not None:
+            self.coordinator.publish(online, 'probe')
+        if online:
+            return True
+        self.client._log("检测到网络已断开，尝试重新登录...")
+        # 掉线可能意味着网卡或地址发生了变化
+        self.client.identity.invalidate()
+        self.relogins += 1
+        coordinated_login(self.client, self.coordinator, use_cache=False)
+        # 掉线后无论重新登录是否成功，都需要尽快复查
+        return False
+
+    def run(self):
+        """持续运行直到 stop() 被调用"""
+        self.client._log(f"看门狗已启动，检测间隔 {self.min_interval:g}~{self.max_interval:g} 秒")
+        while not self._stop_event.is_set():
+            try:
+                online = self.check_once()
+            except Exception as e:
+                self.client._log(f"网络检测出错: {str(e)}")
+                online = False
+            interval = self.next_interval(online)
+            self.client._log(f"下次检测将在 {interval:g} 秒后进行")
+            self._stop_event.wait(interval)
+        self.client._log("看门狗已停止")
+
+    def stop(self):
+        """停止看门狗"""
+        self._stop_event.set()
+
+
+def run_daemon():
+    """以无界面守护模式运行看门狗"""
+    client = CampusNetworkLogin()
+    coordinator = HostCoordinator.from_config(client.config)
+    metrics_server = start_metrics_server(client.config)
+    watchdog = ConnectionWatchdog(client, coordinator=coordinator)
+    # 修改账号等配置后无需重启守护进程
+    client.config_service.watch()
+    try:
+        watchdog.run()
+    except KeyboardInterrupt:
+        watchdog.stop()
+    finally:
+        if metrics_server is not None:
+            metrics_server.stop()
+        if coordinator is not None:
+            coordinator.release()
+        client.config_service.stop()
+        client.close()
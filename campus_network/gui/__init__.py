@@ -1,4 +1,16 @@
-from .main_window import MainWindow
 from .styles import MODERN_STYLE, LOG_COLORS
 
-__all__ = ['MainWindow', 'MODERN_STYLE', 'LOG_COLORS'] 
\ No newline at end of file
+_LAZY_IMPORTS = {
+    'MainWindow': '.main_window',
+}
+
+__all__ = ['MainWindow', 'MODERN_STYLE', 'LOG_COLORS']
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        import importlib
+        value = getattr(importlib.import_module(_LAZY_IMPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
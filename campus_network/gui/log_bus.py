@@ -0,0 +1,97 @@
+import threading
+from collections import deque
+from typing import Callable, Dict, List
+
+from PySide6.QtCore import QObject, QTimer
+
+
+DEFAULT_FLUSH_INTERVAL = 100   # 毫秒
+DEFAULT_MAX_PENDING = 5000
+
+
+class LogBus(QObject):
+    """
+    日志合并投递总线
+    功能：
+    1. 任意线程都可以投递日志，只在内存队列中排队，不触发界面刷新
+    2. 界面线程的定时器按固定间隔把积压的日志成批交给视图
+    3. 积压超过上限时丢弃最旧的日志并计数
+    """
+    def __init__(self, interval_ms: int = DEFAULT_FLUSH_INTERVAL,
+                 max_pending: int = DEFAULT_MAX_PENDING, parent=None):
+        super().__init__(parent)
+        self.max_pending = max(1, int(max_pending))
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._sinks: Dict[str, List[Callable]] = {}
+        # 统计信息
+        self.posted = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.max_batch = 0
+        self._dropped_reported = 0
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(max(1, int(interval_ms)))
+        self._timer.timeout.connect(self.flush)
+        self._timer.start()
+
+    def subscribe(self, log_type: str, sink: Callable[[List], None]):
+        """订阅某一类日志，sink 每次收到按时间顺序排列的一批日志"""
+        self._sinks.setdefault(log_type, []).append(sink)
+
+    def post(self, log_type: str, message):
+        """投递一条日志（线程安全）"""
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                self._pending.popleft()
+                self.dropped += 1
+            self._pending.append((log_type, message))
+            self.posted += 1
+
+    def flush(self):
+        """把积压的日志成批交给订阅者，只能在界面线程调用"""
+        with self._lock:
+            if not self._pending:
+                return
+            pending = self._pending
+            self._pending = deque()
+            dropped = self.dropped - self._dropped_reported
+            self._dropped_reported = self.dropped
+
+        batches: Dict[str, List] = {}
+        for log_type, message in pending:
+            batches.setdefault(log_type, []).append(message)
+
+        self.flushes += 1
+        self.max_batch = max(self.max_batch, len(pending))
+        self.delivered += len(pending)
+
+        if dropped:
+            batches.setdefault('program', []).append(f"日志过多，已丢弃 {dropped} 条")
+
+        for log_type, messages in batches.items():
+            for sink in self._sinks.get(log_type, ()):
+                try:
+                    sink(messages)
+                except Exception as e:
+                    print(f"投递日志失败: {str(e)}")
+
+    def stats(self) -> Dict:
+        """获取投递统计"""
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            'posted': self.posted,
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+            'pending': pending,
+            'flushes': self.flushes,
+            'max_batch': self.max_batch
+        }
+
+    def stop(self):
+        """停止定时投递并投递剩余日志"""
+        self._timer.stop()
+        self.flush()
@@ -0,0 +1,67 @@
+from collections import deque
+from typing import Iterable
+
+from PySide6.QtWidgets import QPlainTextEdit
+from PySide6.QtGui import QTextCursor
+
+
+DEFAULT_MAX_ENTRIES = 500
+
+
+class LogView(QPlainTextEdit):
+    """
+    日志显示控件
+    功能：
+    1. 新日志通过光标增量插入到顶部，不再整篇重写文档
+    2. 使用环形缓冲记录每条日志占用的行数，超出上限时从底部删除最旧的日志
+    """
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, parent=None):
+        super().__init__(parent)
+        self.setReadOnly(True)
+        self.setUndoRedoEnabled(False)
+        self.max_entries = max(1, int(max_entries))
+        # 每条日志占用的文本块数量，左侧为最新
+        self._entries = deque()
+
+    def prepend(self, message: str):
+        """在顶部插入一条日志"""
+        self.prepend_entries([message])
+
+    def prepend_entries(self, messages: Iterable[str]):
+        """按顺序在顶部插入多条日志（最后一条位于最上方），只做一次编辑"""
+        # 只格式化最终会显示的日志，抓包记录在这里才转换为文本
+        messages = [str(message) for message in list(messages)[-self.max_entries:]]
+        if not messages:
+            return
+
+        cursor = QTextCursor(self.document())
+        cursor.beginEditBlock()
+        cursor.movePosition(QTextCursor.MoveOperation.Start)
+        for message in messages:
+            if self._entries:
+                cursor.insertText(message + '\n')
+            else:
+                cursor.insertText(message)
+            cursor.movePosition(QTextCursor.MoveOperation.Start)
+            self._entries.appendleft(message.count('\n') + 1)
+        self._trim(cursor)
+        cursor.endEditBlock()
+        self.verticalScrollBar().setValue(0)
+
+    def _trim(self, cursor: QTextCursor):
+        """删除超出上限的旧日志"""
+        excess = len(self._entries) - self.max_entries
+        if excess <= 0:
+            return
+        remove_blocks = sum(self._entries.pop() for _ in range(excess))
+        document = self.document()
+        first_removed = document.findBlockByNumber(document.blockCount() - remove_blocks)
+        # 连同上一条日志末尾的换行符一起删除
+        cursor.setPosition(max(0, first_removed.position() - 1))
+        cursor.movePosition(QTextCursor.MoveOperation.End, QTextCursor.MoveMode.KeepAnchor)
+        cursor.removeSelectedText()
+
+    def clear(self):
+        """清空日志"""
+        self._entries.clear()
+        super().clear()
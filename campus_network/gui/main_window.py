@@ -1,20 +1,21 @@
-import sys
 import os
 from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                               QHBoxLayout, QTabWidget, QPushButton, QLabel, 
                               QLineEdit, QCheckBox, QMessageBox, QGroupBox,
-                              QTextEdit, QSplitter, QFrame, QMenu, QTextBrowser,
-                              QDialog)
-from PySide6.QtCore import Qt, Signal, QObject
+                              QSplitter, QFrame, QMenu, QTextBrowser,
+                              QDialog, QPlainTextEdit)
+from PySide6.QtCore import Qt, Signal, QThreadPool, QTimer
 from PySide6.QtGui import QFont, QTextCharFormat, QColor, QSyntaxHighlighter, QIcon, QPixmap
 from datetime import datetime
 
 from ..core.login import CampusNetworkLogin
+from ..core.launcher import set_startup_entry
+from ..core.coordination import HostCoordinator
+from ..core.metrics import METRICS, start_metrics_server
 from .styles import MODERN_STYLE, LOG_COLORS
-
-class LogSignals(QObject):
-    request_log = Signal(str)
-    response_log = Signal(str)
+from .workers import LoginWorker
+from .log_view import LogView, DEFAULT_MAX_ENTRIES
+from .log_bus import LogBus, DEFAULT_FLUSH_INTERVAL, DEFAULT_MAX_PENDING
 
 class LogHighlighter(QSyntaxHighlighter):
     def __init__(self, parent, log_type):
@@ -144,22 +145,43 @@ class SponsorDialog(QDialog):
         layout.addWidget(thanks_label)
 
 class MainWindow(QMainWindow):
+    # 后台登录结束时发出，参数为是否登录成功
+    login_finished = Signal(bool)
+
     def __init__(self):
         super().__init__()
         self.login_client = CampusNetworkLogin()
-        self.log_signals = LogSignals()
         self.login_successful = False
+        self._login_worker = None
         
-        # 先连接信号
-        self.log_signals.request_log.connect(self.update_request_log)
-        self.log_signals.response_log.connect(self.update_response_log)
-        
-        # 设置日志回调
-        self.login_client.set_log_callback(self.handle_log)
+        # 日志总线：任意线程投递，定时成批刷新到界面
+        config = self.login_client.config
+        self.log_bus = LogBus(
+            config.getint('GUI', 'log_flush_interval', fallback=DEFAULT_FLUSH_INTERVAL),
+            config.getint('GUI', 'log_max_pending', fallback=DEFAULT_MAX_PENDING),
+            self
+        )
         
         # 初始化UI
         self.init_ui()
         
+        # 视图创建完成后再订阅日志并设置回调
+        self.log_bus.subscribe('request', self.request_log.prepend_entries)
+        self.log_bus.subscribe('response', self.response_log.prepend_entries)
+        self.log_bus.subscribe('program', self.update_program_logs)
+        self.login_client.set_log_callback(self.handle_log)
+        
+        # 监视配置文件，外部修改后自动生效
+        self.login_client.config_service.watch()
+        
+        # 本机 Prometheus 指标接口（默认关闭）
+        self.metrics_server = start_metrics_server(config)
+        
+        # 本机多实例协调：订阅负责登录的实例推送的网络状态，它退出后由本实例接管
+        self.coordinator = HostCoordinator.from_config(config)
+        if self.coordinator is not None:
+            self.coordinator.subscribe(self._on_host_status, self.login_client.login)
+        
         # 设置样式
         self.setStyleSheet(MODERN_STYLE) 
 
@@ -317,10 +339,10 @@ class MainWindow(QMainWindow):
         buttons_layout.setSpacing(10)  # 增加按钮间距
         buttons_layout.setContentsMargins(15, 20, 15, 15)  # 增加内部边距
         
-        login_btn = QPushButton('登录')
-        login_btn.setMinimumHeight(40)
-        login_btn.clicked.connect(self.handle_local_login)
-        buttons_layout.addWidget(login_btn)
+        self.login_btn = QPushButton('登录')
+        self.login_btn.setMinimumHeight(40)
+        self.login_btn.clicked.connect(self.handle_local_login)
+        buttons_layout.addWidget(self.login_btn)
         
         save_btn = QPushButton('保存设置')
         save_btn.setMinimumHeight(40)
@@ -376,13 +398,18 @@ class MainWindow(QMainWindow):
         self.program_log_btn.setCheckable(True)
         self.program_log_btn.clicked.connect(lambda: self.switch_view("program"))
         
+        # 运行指标按钮
+        self.metrics_btn = QPushButton("运行指标")
+        self.metrics_btn.setCheckable(True)
+        self.metrics_btn.clicked.connect(lambda: self.switch_view("metrics"))
+        
         # 关于按钮
         self.about_btn = QPushButton("关于")
         self.about_btn.setCheckable(True)
         self.about_btn.clicked.connect(lambda: self.switch_view("about"))
         
         # 设置按钮样式
-        for btn in [self.network_log_btn, self.program_log_btn, self.about_btn]:
+        for btn in [self.network_log_btn, self.program_log_btn, self.metrics_btn, self.about_btn]:
             btn.setStyleSheet("""
                 QPushButton {
                     background-color: #f8f9fa;
@@ -405,6 +432,7 @@ class MainWindow(QMainWindow):
         
         log_type_layout.addWidget(self.network_log_btn)
         log_type_layout.addWidget(self.program_log_btn)
+        log_type_layout.addWidget(self.metrics_btn)
         log_type_layout.addWidget(self.about_btn)
         log_type_layout.addStretch()
         right_layout.addWidget(log_type_group)
@@ -423,14 +451,16 @@ class MainWindow(QMainWindow):
         # 请求和响应日志分割器
         log_splitter = QSplitter(Qt.Orientation.Vertical)
         
+        # 每个日志视图最多保留的条数
+        log_max_entries = self.login_client.config.getint('GUI', 'log_max_entries', fallback=DEFAULT_MAX_ENTRIES)
+        
         # 请求日志
         request_group = QGroupBox("请求数据包")
         request_layout = QVBoxLayout()
-        self.request_log = QTextEdit()
-        self.request_log.setReadOnly(True)
+        self.request_log = LogView(log_max_entries)
         self.request_log.setFont(QFont("Consolas", 10))
         self.request_log.setStyleSheet("""
-            QTextEdit {
+            QPlainTextEdit {
                 background-color: #1e1e1e;
                 color: #d4d4d4;
                 border: 1px solid #333;
@@ -446,11 +476,10 @@ class MainWindow(QMainWindow):
         # 响应日志
         response_group = QGroupBox("响应数据包")
         response_layout = QVBoxLayout()
-        self.response_log = QTextEdit()
-        self.response_log.setReadOnly(True)
+        self.response_log = LogView(log_max_entries)
         self.response_log.setFont(QFont("Consolas", 10))
         self.response_log.setStyleSheet("""
-            QTextEdit {
+            QPlainTextEdit {
                 background-color: #1e1e1e;
                 color: #d4d4d4;
                 border: 1px solid #333;
@@ -475,11 +504,10 @@ class MainWindow(QMainWindow):
         program_group = QGroupBox("程序运行日志")
         program_inner_layout = QVBoxLayout()
         program_inner_layout.setContentsMargins(10, 15, 10, 10)  # 统一内边距
-        self.program_log = QTextEdit()
-        self.program_log.setReadOnly(True)
+        self.program_log = LogView(log_max_entries)
         self.program_log.setFont(QFont("Consolas", 10))
         self.program_log.setStyleSheet("""
-            QTextEdit {
+            QPlainTextEdit {
                 background-color: #1e1e1e;
                 color: #d4d4d4;
                 border: 1px solid #333;
@@ -493,6 +521,38 @@ class MainWindow(QMainWindow):
         
         content_layout.addWidget(self.program_log_widget)
         
+        # 运行指标视图
+        self.metrics_widget = QWidget()
+        metrics_layout = QVBoxLayout(self.metrics_widget)
+        metrics_layout.setContentsMargins(0, 0, 0, 0)
+        
+        metrics_group = QGroupBox("登录流程指标")
+        metrics_inner_layout = QVBoxLayout()
+        metrics_inner_layout.setContentsMargins(10, 15, 10, 10)
+        self.metrics_view = QPlainTextEdit()
+        self.metrics_view.setReadOnly(True)
+        self.metrics_view.setFont(QFont("Consolas", 10))
+        self.metrics_view.setStyleSheet("""
+            QPlainTextEdit {
+                background-color: #1e1e1e;
+                color: #d4d4d4;
+                border: 1px solid #333;
+                border-radius: 4px;
+                padding: 8px;
+            }
+        """)
+        metrics_inner_layout.addWidget(self.metrics_view)
+        metrics_group.setLayout(metrics_inner_layout)
+        metrics_layout.addWidget(metrics_group)
+        
+        # 只在指标视图可见时定时刷新
+        self.metrics_timer = QTimer(self)
+        self.metrics_timer.setInterval(1000)
+        self.metrics_timer.timeout.connect(self.refresh_metrics)
+        
+        self.metrics_widget.hide()
+        content_layout.addWidget(self.metrics_widget)
+        
         # 关于视图
         self.about_widget = QWidget()
         about_layout = QVBoxLayout(self.about_widget)
@@ -674,126 +734,85 @@ class MainWindow(QMainWindow):
         self.statusBar().showMessage('就绪')
 
     def handle_log(self, log_type, message):
-        """处理日志回调"""
-        try:
-            if log_type == 'request':
-                self.log_signals.request_log.emit(message)
-            elif log_type == 'response':
-                self.log_signals.response_log.emit(message)
-            else:
-                # 直接更新程序日志
-                self.update_program_log(message)
-        except Exception as e:
-            print(f"处理日志失败: {str(e)}")
-
-    def update_request_log(self, message):
-        """更新请求日志"""
-        try:
-            current_text = self.request_log.toPlainText()
-            if current_text:
-                self.request_log.setText(message + "\n" + current_text)
-            else:
-                self.request_log.setText(message)
-            self.request_log.verticalScrollBar().setValue(0)
-        except Exception as e:
-            print(f"更新请求日志失败: {str(e)}")
+        """处理日志回调，可能来自后台线程，只入队不直接操作界面"""
+        self.log_bus.post(log_type, message)
 
-    def update_response_log(self, message):
-        """更新响应日志"""
-        try:
-            current_text = self.response_log.toPlainText()
-            if current_text:
-                self.response_log.setText(message + "\n" + current_text)
-            else:
-                self.response_log.setText(message)
-            self.response_log.verticalScrollBar().setValue(0)
-        except Exception as e:
-            print(f"更新响应日志失败: {str(e)}")
+    def _on_host_status(self, status):
+        """收到其他实例推送的网络状态（在订阅线程中调用）"""
+        if status.get('pid') != os.getpid():
+            self.log_bus.post('program', f"本机其他实例报告网络{'已在线' if status.get('online') else '未连接'}")
 
     def handle_local_login(self):
-        """处理本地登录"""
-        try:
-            success = self.login_client.login()
-            self.login_successful = success
-            
-            if success:
-                self.show_message("登录成功", "本机网络连接已建立！")
-                self.statusBar().showMessage('登录成功')
-            else:
-                self.show_message("登录失败", "网络连接失败，请检查设置。", QMessageBox.Icon.Warning)
-                self.statusBar().showMessage('登录失败')
-                
-        except Exception as e:
-            self.show_message("错误", str(e), QMessageBox.Icon.Critical)
-            self.statusBar().showMessage('发生错误')
+        """处理本地登录，登录在后台线程执行；登录进行中再次点击则取消"""
+        if self._login_worker is not None:
+            self._login_worker.cancel()
+            self.login_btn.setEnabled(False)
+            self.statusBar().showMessage('正在取消登录...')
+            return
+        self._start_login_worker(wait_ready=False)
+
+    def start_auto_login(self):
+        """自动登录：在后台等待网络就绪后再登录"""
+        if self._login_worker is None:
+            self._start_login_worker(wait_ready=True)
+
+    def _start_login_worker(self, wait_ready):
+        """创建并启动后台登录任务"""
+        worker = LoginWorker(self.login_client, wait_ready, self.coordinator)
+        worker.signals.progress.connect(self.statusBar().showMessage)
+        worker.signals.error.connect(self._on_login_error)
+        worker.signals.finished.connect(self._on_login_finished)
+        self._login_worker = worker
+        self.login_btn.setText('取消登录')
+        QThreadPool.globalInstance().start(worker)
+
+    def _on_login_error(self, message):
+        """后台登录出现异常"""
+        self.show_message("错误", message, QMessageBox.Icon.Critical)
+        self.statusBar().showMessage('发生错误')
+
+    def _on_login_finished(self, success):
+        """后台登录结束"""
+        cancelled = self._login_worker is not None and self._login_worker.is_cancelled
+        self._login_worker = None
+        self.login_btn.setText('登录')
+        self.login_btn.setEnabled(True)
+        self.login_successful = success
+        self.login_finished.emit(success)
+
+        if success:
+            self.statusBar().showMessage('登录成功')
+            self.show_message("登录成功", "本机网络连接已建立！")
+        elif cancelled:
+            self.statusBar().showMessage('登录已取消')
+        else:
+            self.statusBar().showMessage('登录失败')
+            self.show_message("登录失败", "网络连接失败，请检查设置。", QMessageBox.Icon.Warning)
 
     def save_settings(self):
         """保存设置"""
         try:
-            # 保存账号密码
-            self.login_client.config['Network']['user_id'] = self.user_id_input.text()
-            self.login_client.config['Network']['password'] = self.password_input.text()
-            
             # 获取自动登录状态
             auto_login = self.auto_login_cb.isChecked()
-            self.login_client.config['Network']['auto_login'] = str(auto_login).lower()
             
-            # 处理开机自启动
-            try:
-                import win32api
-                import win32con
-                
-                key = win32api.RegOpenKey(
-                    win32con.HKEY_LOCAL_MACHINE,
-                    r'SOFTWARE\Microsoft\Windows\CurrentVersion\Run',
-                    0,
-                    win32con.KEY_ALL_ACCESS
-                )
-                
-                if auto_login:
-                    # 设置开机自启动
-                    if getattr(sys, 'frozen', False):
-                        app_path = sys.executable
-                        cmd = f'"{app_path}" --auto-login --startup'
-                    else:
-                        current_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-                        python_path = os.path.join(current_dir, ".venv", "Scripts", "pythonw.exe")
-                        main_py = os.path.join(current_dir, "main.py")
-                        cmd = f'"{python_path}" "{main_py}" --auto-login --startup'
-                    
-                    try:
-                        win32api.RegSetValueEx(
-                            key,
-                            "CQEVTCampusNetwork",
-                            0,
-                            win32con.REG_SZ,
-                            cmd
-                        )
-                        self.update_program_log("已设置开机自启动")
-                    except Exception as e:
-                        self.update_program_log(f"设置开机自启动失败: {str(e)}")
+            # 处理开机自启动：启动项已是目标状态时不写注册表，权限不足时才请求管理员权限
+            if auto_login:
+                if set_startup_entry(True):
+                    self.update_program_log("已设置开机自启动")
                 else:
-                    # 移除开机自启动
-                    try:
-                        win32api.RegDeleteValue(key, "CQEVTCampusNetwork")
-                        self.update_program_log("已移除开机自启动")
-                    except WindowsError as e:
-                        if e.winerror == 2:  # 找不到注册表项
-                            self.update_program_log("开机自启动项不存在，无需移除")
-                        else:
-                            self.update_program_log(f"移除开机自启动失败: {str(e)}")
-                
-                win32api.RegCloseKey(key)
-                
-            except Exception as e:
-                self.update_program_log(f"访问注册表失败: {str(e)}")
-            
-            # 保存配置文件
-            config_path = self.login_client.get_config_path()
-            os.makedirs(os.path.dirname(config_path), exist_ok=True)
+                    self.update_program_log("设置开机自启动失败")
+            else:
+                if set_startup_entry(False):
+                    self.update_program_log("已移除开机自启动")
+                else:
+                    self.update_program_log("移除开机自启动失败")
             
-            with open(config_path, 'w', encoding='utf-8') as f:
-                self.login_client.config.write(f)
+            # 更新配置：登录设置立即生效，配置文件由后台线程合并写入，界面不等待磁盘
+            self.login_client.config_service.update({'Network': {
+                'user_id': self.user_id_input.text(),
+                'password': self.password_input.text(),
+                'auto_login': str(auto_login).lower()
+            }})
             
             self.show_message("成功", "设置已保存！")
             self.update_program_log("设置已保存！")
@@ -815,34 +834,45 @@ class MainWindow(QMainWindow):
         """切换视图"""
         self.network_log_btn.setChecked(view_type == "network")
         self.program_log_btn.setChecked(view_type == "program")
+        self.metrics_btn.setChecked(view_type == "metrics")
         self.about_btn.setChecked(view_type == "about")
         
         self.network_log_widget.hide()
         self.program_log_widget.hide()
+        self.metrics_widget.hide()
         self.about_widget.hide()
+        self.metrics_timer.stop()
         
         if view_type == "network":
             self.network_log_widget.show()
         elif view_type == "program":
             self.program_log_widget.show()
+        elif view_type == "metrics":
+            self.refresh_metrics()
+            self.metrics_widget.show()
+            self.metrics_timer.start()
         else:  # about
             self.about_widget.show()
 
+    def refresh_metrics(self):
+        """刷新运行指标视图"""
+        text = METRICS.format_summary()
+        stats = self.login_client.get_connection_stats()
+        text += (f"\n\n连接池: {stats['host']}  请求 {stats['requests']}  连接 {stats['connections']}  "
+                 f"复用率 {stats['reuse_ratio'] * 100:.0f}%")
+        if self.metrics_server is not None:
+            text += f"\nPrometheus: {self.metrics_server.url}"
+        self.metrics_view.setPlainText(text)
+
     def update_program_log(self, message):
         """更新程序日志"""
+        self.update_program_logs([message])
+
+    def update_program_logs(self, messages):
+        """批量更新程序日志"""
         try:
-            if not isinstance(message, str):
-                message = str(message)
-            
-            current_text = self.program_log.toPlainText()
             timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            formatted_message = f"[{timestamp}] {message.strip()}"
-            
-            if current_text:
-                self.program_log.setText(formatted_message + "\n" + current_text)
-            else:
-                self.program_log.setText(formatted_message)
-            self.program_log.verticalScrollBar().setValue(0)
+            self.program_log.prepend_entries(f"[{timestamp}] {str(message).strip()}" for message in messages)
         except Exception as e:
             print(f"更新程序日志失败: {str(e)}")
 
@@ -879,8 +909,22 @@ class MainWindow(QMainWindow):
     def on_auto_login_changed(self, state):
         """处理自动登录状态改变"""
         print(f"自动登录状态改变: {state == Qt.CheckState.Checked.value}")
-        # 立即更新配置（可选）
-        self.login_client.config['Network']['auto_login'] = str(state == Qt.CheckState.Checked.value).lower() 
+        # 立即更新配置，点击保存时再写入文件
+        self.login_client.config_service.update(
+            {'Network': {'auto_login': str(state == Qt.CheckState.Checked.value).lower()}}, save=False)
+
+    def closeEvent(self, event):
+        """关闭窗口时停止配置监视、指标接口与多实例协调，并停止心跳、释放连接"""
+        self.metrics_timer.stop()
+        self.log_bus.stop()
+        self.login_client.set_log_callback(None)
+        self.login_client.config_service.stop()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+        if self.coordinator is not None:
+            self.coordinator.release()
+        self.login_client.close()
+        super().closeEvent(event)
 
     def show_sponsor_dialog(self):
         dialog = SponsorDialog(self)
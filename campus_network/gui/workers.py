@@ -0,0 +1,60 @@
+import threading
+
+from PySide6.QtCore import QObject, QRunnable, Signal
+
+from ..core.readiness import wait_for_network
+from ..core.coordination import coordinated_login
+
+
+class WorkerSignals(QObject):
+    """后台任务信号，始终在 GUI 线程中投递"""
+    progress = Signal(str)              # 进度说明
+    attempt = Signal(int, bool, str)    # 第几次尝试、是否成功、说明
+    finished = Signal(bool)             # 最终结果
+    error = Signal(str)                 # 未预期的异常
+
+
+class LoginWorker(QRunnable):
+    """
+    后台登录任务
+    在 QThreadPool 中执行登录，避免网络请求和重试等待阻塞界面
+    """
+    def __init__(self, client, wait_ready: bool = False, coordinator=None):
+        super().__init__()
+        # 由 Python 端持有引用，避免执行完毕后被 Qt 提前释放
+        self.setAutoDelete(False)
+        self.client = client
+        self.wait_ready = wait_ready
+        self.coordinator = coordinator
+        self.signals = WorkerSignals()
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        """请求取消登录，当前请求结束后不再重试"""
+        self._cancel_event.set()
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def _on_attempt(self, attempt: int, success: bool, message: str, will_retry: bool):
+        self.signals.attempt.emit(attempt, success, message)
+        if will_retry and not self.is_cancelled:
+            self.signals.progress.emit(f"第 {attempt} 次登录失败，准备重试...")
+
+    def run(self):
+        success = False
+        try:
+            if self.wait_ready:
+                self.signals.progress.emit("等待网络就绪...")
+                wait_for_network(self.client, self._cancel_event)
+                if self.is_cancelled:
+                    return
+            self.signals.progress.emit("正在登录...")
+            # 手动登录不采用其他实例缓存的在线状态
+            success = coordinated_login(self.client, self.coordinator, self._cancel_event,
+                                        self._on_attempt, use_cache=self.wait_ready)
+        except Exception as e:
+            self.signals.error.emit(str(e))
+        finally:
+            self.signals.finished.emit(success)
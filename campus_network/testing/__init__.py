@@ -0,0 +1,3 @@
+from .mock_portal import MockPortalServer
+
+__all__ = ['MockPortalServer'] 
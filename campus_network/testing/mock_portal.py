@@ -0,0 +1,233 @@
+import argparse
+import json
+import random
+import socket
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+
+PORTAL_PATH = '/eportal/InterFace.do'
+ONLINE_MESSAGE = '您已经在线了，不需要再次认证'
+BAD_PASSWORD_MESSAGE = '密码错误'
+OFFLINE_MESSAGE = '用户已不在线'
+
+
+class _PortalHandler(BaseHTTPRequestHandler):
+    """模拟 ePortal 的 InterFace.do 接口"""
+    protocol_version = 'HTTP/1.1'
+    server_version = 'MockEPortal/1.0'
+
+    def log_message(self, format, *args):
+        if self.server.portal.verbose:
+            super().log_message(format, *args)
+
+    def setup(self):
+        super().setup()
+        # 响应头与响应体分两次写出，关闭 Nagle 避免长连接上出现 40ms 延迟确认
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.server.portal._count('connections')
+
+    def do_GET(self):
+        self._handle()
+
+    def do_POST(self):
+        self._handle()
+
+    def _handle(self):
+        portal = self.server.portal
+        parts = urlsplit(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode('utf-8', errors='replace') if length else ''
+
+        if parts.path != PORTAL_PATH:
+            self._send(404, 'text/plain; charset=utf-8', b'not found')
+            return
+
+        form = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        form.update({key: values[0] for key, values in parse_qs(body, keep_blank_values=True).items()})
+        status, content_type, payload = portal.handle(form)
+        self._send(status, content_type, payload)
+
+    def _send(self, status: int, content_type: str, payload: bytes):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class _PortalHTTPServer(ThreadingHTTPServer):
+    # 默认监听队列只有 5，压测并发下溢出的连接要等约 1 秒重传 SYN，测到的是模拟门户而不是客户端
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+class MockPortalServer:
+    """
+    本地模拟认证门户
+    功能：
+    1. 在本机提供 /eportal/InterFace.do，无需连接真实网关
+    2. 可配置响应延迟、服务器错误率、“已经在线”比例和畸形 JSON 比例
+    3. 统计请求数与 TCP 连接数，便于评估连接复用效果
+    4. 记录登录分配的 userIndex，支持 getOnlineUserInfo、keepalive 与 logout
+    """
+    def __init__(self, host: str = '127.0.0.1', port: int = 0,
+                 latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, online_rate: float = 0.0,
+                 malformed_rate: float = 0.0, seed: Optional[int] = None,
+                 verbose: bool = False):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.online_rate = online_rate
+        self.malformed_rate = malformed_rate
+        self.verbose = verbose
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._stats: Dict[str, int] = {}
+        self._sessions: Dict[str, str] = {}
+        self._server = _PortalHTTPServer((host, port), _PortalHandler)
+        self._server.portal = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}{PORTAL_PATH}'
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] = self._stats.get(key, 0) + 1
+
+    def _roll(self) -> float:
+        with self._lock:
+            return self._random.random()
+
+    def stats(self) -> Dict[str, int]:
+        """获取请求统计"""
+        with self._lock:
+            return dict(self._stats)
+
+    def expire_sessions(self):
+        """使所有已登录会话失效，模拟门户空闲超时"""
+        with self._lock:
+            self._sessions.clear()
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
+
+    def handle(self, form: Dict[str, str]):
+        """根据配置生成一次响应，返回 (状态码, Content-Type, 响应体)"""
+        self._count('requests')
+        delay = self.latency + (self._roll() * self.jitter if self.jitter else 0)
+        if delay > 0:
+            time.sleep(delay)
+
+        roll = self._roll()
+        if roll < self.error_rate:
+            self._count('error')
+            return 500, 'text/html; charset=utf-8', '<html><body>500 Internal Server Error</body></html>'.encode('utf-8')
+        roll -= self.error_rate
+        if roll < self.malformed_rate:
+            self._count('malformed')
+            return 200, 'application/json; charset=utf-8', b'{"result":"succ'
+        roll -= self.malformed_rate
+
+        method = form.get('method', 'login')
+        if method != 'login':
+            self._count(method)
+            return self._session_call(method, form.get('userIndex', ''))
+
+        if not form.get('userId') or not form.get('password'):
+            self._count('bad_password')
+            return self._json({'userIndex': None, 'result': 'fail', 'message': BAD_PASSWORD_MESSAGE})
+        if roll < self.online_rate:
+            self._count('online')
+            return self._json({'userIndex': None, 'result': 'fail', 'message': ONLINE_MESSAGE})
+
+        self._count('success')
+        user_index = uuid.uuid4().hex
+        with self._lock:
+            self._sessions[user_index] = form['userId']
+        return self._json({
+            'userIndex': user_index,
+            'result': 'success',
+            'message': '',
+            'forwordurl': None,
+            'keepaliveInterval': 0,
+            'validCodeUrl': ''
+        })
+
+    def _session_call(self, method: str, user_index: str):
+        """以 userIndex 调用的会话接口"""
+        with self._lock:
+            user_id = self._sessions.get(user_index)
+            if method == 'logout':
+                self._sessions.pop(user_index, None)
+        if user_id is None:
+            return self._json({'result': 'fail', 'message': OFFLINE_MESSAGE})
+        if method == 'getOnlineUserInfo':
+            return self._json({'result': 'success', 'message': '', 'userIndex': user_index, 'userId': user_id})
+        return self._json({'result': 'success', 'message': ''})
+
+    @staticmethod
+    def _json(body: Dict):
+        return 200, 'application/json;charset=UTF-8', json.dumps(body, ensure_ascii=False).encode('utf-8')
+
+    def start(self) -> 'MockPortalServer':
+        """在后台线程启动服务"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._server.serve_forever, name='MockPortal', daemon=True)
+            self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """在当前线程中运行服务，直到被中断"""
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def stop(self):
+        """停止服务"""
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地模拟校园网认证门户')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0, help='固定响应延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='额外随机延迟上限（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='返回 HTTP 500 的比例')
+    parser.add_argument('--online-rate', type=float, default=0.0, help='返回“已经在线”的比例')
+    parser.add_argument('--malformed-rate', type=float, default=0.0, help='返回畸形 JSON 的比例')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    server = MockPortalServer(args.host, args.port, args.latency, args.jitter, args.error_rate,
+                              args.online_rate, args.malformed_rate, args.seed, verbose=True)
+    print(f"模拟门户已启动: {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
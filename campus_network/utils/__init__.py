@@ -1,3 +1,5 @@
-from .logger import LogRedirector
+from .logger import (LogRedirector, JsonLinesFormatter, SizeAndTimeRotatingFileHandler,
+                     setup_network_logger, shutdown_network_logger)
 
-__all__ = ['LogRedirector'] 
\ No newline at end of file
+__all__ = ['LogRedirector', 'JsonLinesFormatter', 'SizeAndTimeRotatingFileHandler',
+           'setup_network_logger', 'shutdown_network_logger'] 
@@ -1 +1,166 @@
- 
\ No newline at end of file
+import atexit
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+
+
+LOGGER_NAME = 'NetworkLogger'
+DEFAULT_LOG_DIR = 'logs'
+DEFAULT_LOG_FILE = 'network.log'
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+DEFAULT_ROTATE_HOURS = 24.0
+
+_lock = threading.Lock()
+_listener: Optional[QueueListener] = None
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """每条日志输出为一行 JSON，便于程序解析"""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage()
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def _gzip_namer(name: str) -> str:
+    return name + '.gz'
+
+
+def _gzip_rotator(source: str, dest: str):
+    """压缩轮转出的旧日志"""
+    with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+class SizeAndTimeRotatingFileHandler(RotatingFileHandler):
+    """
+    按大小和时间轮转的日志文件
+    文件超过 max_bytes 或距离上次轮转超过 interval 秒时轮转，
+    旧文件依次编号为 .1 .. .N，可选 gzip 压缩
+    """
+    def __init__(self, filename: str, max_bytes: int = DEFAULT_MAX_BYTES,
+                 backup_count: int = DEFAULT_BACKUP_COUNT, interval: float = 0,
+                 compress: bool = False, encoding: str = 'utf-8'):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count,
+                         encoding=encoding, delay=True)
+        self.interval = interval
+        # 以现有文件的修改时间为起点，重启程序不会推迟轮转
+        start = os.path.getmtime(filename) if os.path.exists(filename) else time.time()
+        self.rollover_at = start + interval
+        if compress:
+            self.namer = _gzip_namer
+            self.rotator = _gzip_rotator
+
+    def shouldRollover(self, record) -> bool:
+        if self.interval and time.time() >= self.rollover_at \
+                and os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = time.time() + self.interval
+
+
+def setup_network_logger(logs_dir: str = DEFAULT_LOG_DIR,
+                         max_bytes: int = DEFAULT_MAX_BYTES,
+                         backup_count: int = DEFAULT_BACKUP_COUNT,
+                         rotate_hours: float = DEFAULT_ROTATE_HOURS,
+                         compress: bool = True,
+                         json_format: bool = True) -> logging.Logger:
+    """
+    配置网络日志
+    日志调用方只把记录放入内存队列，由后台线程写入轮转文件；
+    多次调用（例如创建多个登录客户端）只会配置一次
+    """
+    global _listener
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(logging.DEBUG)
+
+    with _lock:
+        if _listener is not None:
+            return logger
+
+        os.makedirs(logs_dir, exist_ok=True)
+        file_handler = SizeAndTimeRotatingFileHandler(
+            os.path.join(logs_dir, DEFAULT_LOG_FILE),
+            max_bytes=max_bytes,
+            backup_count=backup_count,
+            interval=rotate_hours * 3600,
+            compress=compress
+        )
+        file_handler.setLevel(logging.DEBUG)
+        if json_format:
+            file_handler.setFormatter(JsonLinesFormatter())
+        else:
+            file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+
+        log_queue = queue.SimpleQueue()
+        logger.addHandler(QueueHandler(log_queue))
+        _listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_network_logger)
+
+    return logger
+
+
+def shutdown_network_logger():
+    """停止后台写入线程并写完剩余日志"""
+    global _listener
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        logger = logging.getLogger(LOGGER_NAME)
+        for handler in list(logger.handlers):
+            if isinstance(handler, QueueHandler):
+                logger.removeHandler(handler)
+        _listener = None
+
+
+class LogRedirector:
+    """
+    把写入的文本按行转发到日志
+    用于 pythonw 等没有控制台的场景，替换 sys.stdout / sys.stderr
+    """
+    def __init__(self, logger: Optional[logging.Logger] = None, level: int = logging.INFO, stream=None):
+        self.logger = logger or logging.getLogger(LOGGER_NAME)
+        self.level = level
+        self.stream = stream
+        self._buffer = ''
+
+    def write(self, text: str):
+        if self.stream is not None:
+            self.stream.write(text)
+        self._buffer += text
+        while '\n' in self._buffer:
+            line, self._buffer = self._buffer.split('\n', 1)
+            if line.strip():
+                self.logger.log(self.level, line.rstrip())
+        return len(text)
+
+    def flush(self):
+        if self._buffer.strip():
+            self.logger.log(self.level, self._buffer.rstrip())
+        self._buffer = ''
+        if self.stream is not None:
+            self.stream.flush()
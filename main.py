@@ -1,87 +1,93 @@
 import sys
 import os
 import time
-import platform
-import ctypes
 import argparse
-from PySide6.QtWidgets import QApplication
 
-from campus_network.gui import MainWindow
-from campus_network.core import startup
+from campus_network.core.launcher import (PhaseTimer, boot_login, get_app_dir, set_startup_entry)
 
-def is_admin():
-    """检查是否有管理员权限"""
-    try:
-        return ctypes.windll.shell32.IsUserAnAdmin()
-    except:
-        return False
+# 注意：PySide6 与界面模块只在真正需要显示窗口时才导入，
+# 开机自动登录、守护模式和批量模式只依赖 requests
 
 def main():
+    timer = PhaseTimer()
     print("程序启动...")
     print(f"当前工作目录: {os.getcwd()}")  # 添加工作目录日志
     print(f"程序路径: {sys.executable}")   # 添加程序路径日志
-    
-    if not is_admin():
-        print("请求管理员权限...")
-        if platform.system().lower() == 'windows':
-            if getattr(sys, 'frozen', False):
-                exe_path = sys.executable
-                args = " ".join(sys.argv[1:])
-            else:
-                exe_path = sys.executable.replace("pythonw.exe", "python.exe")
-                script_path = os.path.abspath(sys.argv[0])
-                args = f'"{script_path}" {" ".join(sys.argv[1:])}'
-            
-            print(f"重启程序: {exe_path} {args}")
-            try:
-                result = ctypes.windll.shell32.ShellExecuteW(
-                    None, 
-                    "runas", 
-                    exe_path,
-                    args,
-                    os.getcwd(),  # 设置工作目录
-                    1  # 正常显示窗口
-                )
-                print(f"ShellExecute 结果: {result}")
-                if result <= 32:  # 如果返回值小于等于32，表示发生错误
-                    print(f"启动失败，错误码: {result}")
-            except Exception as e:
-                print(f"启动失败: {str(e)}")
-            return
 
     print("解析命令行参数...")
     parser = argparse.ArgumentParser(description='重庆工程职业技术学院校园网自动登录')
     parser.add_argument('--auto-login', action='store_true', help='自动登录模式')
     parser.add_argument('--startup', action='store_true', help='开机自启动模式')
+    parser.add_argument('--daemon', action='store_true', help='无界面守护模式，持续检测网络并在掉线时重新登录')
+    parser.add_argument('--batch', metavar='FILE', help='批量登录模式，读取 CSV/JSONL 账号文件')
+    parser.add_argument('--batch-output', metavar='FILE', help='批量登录结果输出文件（JSONL），默认输出到控制台')
+    parser.add_argument('--concurrency', type=int, default=32, help='批量登录最大并发数')
+    parser.add_argument('--rate', type=float, default=20.0, help='批量登录每秒最多请求数')
+    parser.add_argument('--register-startup', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--unregister-startup', action='store_true', help=argparse.SUPPRESS)
     args = parser.parse_args()
 
+    # 由提升权限后的进程执行：只写注册表，不做其他事情
+    if args.register_startup or args.unregister_startup:
+        ok = set_startup_entry(args.register_startup, elevate_if_needed=False)
+        sys.exit(0 if ok else 1)
+
+    if args.daemon:
+        from campus_network.core.watchdog import run_daemon
+        run_daemon()
+        sys.exit(0)
+
+    if args.batch:
+        from campus_network.core.batch import run_batch
+        summary = run_batch(args.batch, args.batch_output, args.concurrency, args.rate)
+        sys.exit(0 if summary['failed'] == 0 else 1)
+
+    if args.auto_login and args.startup:
+        # 开机自启动：由注册表启动时工作目录不是程序目录
+        os.chdir(get_app_dir())
+        # 先在当前进程中无界面登录，成功后直接退出，不加载 Qt
+        success = boot_login(timer)
+        timer.report()
+        if success:
+            print("开机自启动模式，登录成功，退出...")
+            sys.exit(0)
+        print("自动登录失败，打开主窗口...")
+        sys.exit(run_gui(timer, auto_login=False, status_message='自动登录失败，请检查设置'))
+
+    sys.exit(run_gui(timer, auto_login=args.auto_login))
+
+def run_gui(timer: PhaseTimer, auto_login: bool = False, status_message: str = '') -> int:
+    """启动图形界面，返回事件循环退出码"""
     try:
-        print("初始化 QApplication...")
-        app = QApplication(sys.argv)
-        print("创建主窗口...")
-        window = MainWindow()
-        print("显示主窗口...")
-        window.show()
+        with timer.phase('加载界面模块'):
+            from PySide6.QtWidgets import QApplication
+            from PySide6.QtCore import QTimer
+            from campus_network.gui.main_window import MainWindow
+
+        with timer.phase('创建主窗口'):
+            print("初始化 QApplication...")
+            app = QApplication(sys.argv)
+            print("创建主窗口...")
+            window = MainWindow()
+            print("显示主窗口...")
+            window.show()
+        timer.report()
+        if status_message:
+            window.statusBar().showMessage(status_message)
+            window.update_program_log(status_message)
         
-        if args.auto_login:
-            print("等待系统初始化...")
-            time.sleep(2)
-            print("尝试自动登录...")
-            window.handle_local_login()
-            
-            if args.startup and window.login_successful:
-                print("开机自启动模式，准备退出...")
-                time.sleep(1)
-                sys.exit(0)
+        if auto_login:
+            # 先让窗口完成绘制，再在后台等待网络就绪并登录
+            QTimer.singleShot(0, window.start_auto_login)
         
         print("进入主事件循环...")
-        sys.exit(app.exec())
+        return app.exec()
         
     except Exception as e:
         print(f"程序运行出错: {str(e)}")
         print("错误详情:", sys.exc_info())
         time.sleep(5)
-        sys.exit(1)
+        return 1
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
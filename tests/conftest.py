@@ -0,0 +1,21 @@
+import pytest
+
+from campus_network.testing import MockPortalServer
+
+
+@pytest.fixture
+def portal():
+    """本地模拟门户，测试结束后停止"""
+    server = MockPortalServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def write_config(tmp_path):
+    """在临时目录写入配置文件并返回路径，默认关闭多实例协调"""
+    def write(text: str) -> str:
+        path = tmp_path / 'config.ini'
+        path.write_text(text + '\n[Coordination]\nenabled = false\n', encoding='utf-8')
+        return str(path)
+    return write
@@ -0,0 +1,104 @@
+import asyncio
+import io
+import json
+import os
+
+import pytest
+
+from campus_network.core.async_login import AsyncCampusNetworkLogin
+from campus_network.core.batch import BatchLoginRunner, load_accounts
+from campus_network.core.login import CampusNetworkLogin
+
+
+@pytest.fixture
+def config_path(portal, write_config):
+    return write_config(
+        f'[Network]\nurl = {portal.url}\nuser_id = host\npassword = p\n'
+        f'custom_ip = 10.0.0.1\ncustom_mac = AABBCCDDEEFF\n'
+        f'[Retry]\nmax_attempts = 1\n[Session]\nkeepalive_interval = 0\n'
+    )
+
+
+def write_accounts(directory, rows) -> str:
+    path = os.path.join(directory, 'accounts.jsonl')
+    with open(path, 'w', encoding='utf-8') as f:
+        for row in rows:
+            f.write((row if isinstance(row, str) else json.dumps(row)) + '\n')
+    return path
+
+
+def run_batch(config_path, accounts_path):
+    output = io.StringIO()
+
+    async def run():
+        async with AsyncCampusNetworkLogin(config_path) as client:
+            summary = await BatchLoginRunner(client, concurrency=4, rate=0).run(load_accounts(accounts_path), output)
+            return summary, client.sessions.record
+    summary, record = asyncio.run(run())
+    return summary, record, [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def test_batch_reports_each_row(portal, config_path, tmp_path):
+    accounts = write_accounts(tmp_path, [
+        {'user_id': 'u1', 'password': 'p', 'ip': '10.0.1.1'},
+        {'user_id': 'u2', 'password': ''},
+        'not json',
+    ])
+    summary, _, rows = run_batch(config_path, accounts)
+    assert summary == {'total': 3, 'success': 1, 'failed': 2}
+    by_line = {row['line']: row for row in rows}
+    assert by_line[1]['success']
+    assert not by_line[2]['success'] and by_line[2]['error']
+    assert 'JSON' in by_line[3]['error']
+    assert portal.stats()['success'] == 1
+
+
+def test_batch_does_not_persist_session(config_path, tmp_path):
+    accounts = write_accounts(tmp_path, [{'user_id': f'u{i}', 'password': 'p'} for i in range(5)])
+    summary, record, _ = run_batch(config_path, accounts)
+    assert summary['success'] == 5
+    # 批量账号不是本机账号，不应覆盖本机的门户会话
+    assert record is None
+    assert not os.path.exists(tmp_path / 'session.json')
+
+
+def test_host_login_persists_session_after_batch(portal, config_path, tmp_path):
+    run_batch(config_path, write_accounts(tmp_path, [{'user_id': 'u1', 'password': 'p'}]))
+    client = CampusNetworkLogin(config_path)
+    try:
+        assert client.login()
+        record = client.sessions.record
+        assert record.user_id == 'host'
+        assert (record.ip, record.mac) == ('10.0.0.1', 'AABBCCDDEEFF')
+        assert json.loads((tmp_path / 'session.json').read_text(encoding='utf-8'))['user_id'] == 'host'
+        # 会话失效后按保存的身份重新登录
+        identity = client.sessions.relogin_identity(record)
+        assert (identity.user_id, identity.ip) == ('host', '10.0.0.1')
+    finally:
+        client.close()
+
+
+def test_relogin_skips_record_of_other_account(config_path):
+    client = CampusNetworkLogin(config_path)
+    try:
+        assert client.login()
+        record = client.sessions.record
+        client.config_service.update({'Network': {'user_id': 'other'}}, save=False)
+        assert client.sessions.relogin_identity(record) is None
+    finally:
+        client.close()
+
+
+def test_resume_saved_session(portal, config_path):
+    client = CampusNetworkLogin(config_path)
+    try:
+        assert client.login()
+    finally:
+        client.close()
+    resumed = CampusNetworkLogin(config_path)
+    try:
+        assert resumed.resume_session()
+        portal.expire_sessions()
+        assert not resumed.resume_session()
+    finally:
+        resumed.close()
@@ -0,0 +1,104 @@
+import time
+
+from campus_network.core.config import ConfigService
+
+
+def read(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def test_first_run_creates_default_config(tmp_path):
+    path = tmp_path / 'config.ini'
+    service = ConfigService(str(path))
+    assert service.is_first_run
+    assert path.exists()
+    assert service.config.has_section('Network')
+
+
+def test_update_notifies_changed_keys(tmp_path):
+    service = ConfigService(str(tmp_path / 'config.ini'), debounce=60)
+    changes = []
+    service.subscribe(lambda config, changed: changes.append((config, changed)))
+    service.update({'Network': {'user_id': 'u1'}}, save=False)
+    service.update({'Network': {'user_id': 'u1'}}, save=False)
+    assert len(changes) == 1
+    config, changed = changes[0]
+    assert changed == {('Network', 'user_id')}
+    assert config.get('Network', 'user_id') == 'u1'
+
+
+def test_update_debounces_writes(tmp_path):
+    path = tmp_path / 'config.ini'
+    service = ConfigService(str(path), debounce=0.1)
+    for i in range(5):
+        service.update({'Network': {'user_id': f'u{i}'}})
+    # 防抖时间内不写入文件
+    assert 'u4' not in read(path)
+    time.sleep(0.3)
+    assert 'user_id = u4' in read(path)
+
+
+def test_stop_flushes_pending_write(tmp_path):
+    path = tmp_path / 'config.ini'
+    service = ConfigService(str(path), debounce=60)
+    service.update({'Network': {'user_id': 'pending'}})
+    service.stop()
+    assert 'user_id = pending' in read(path)
+
+
+def test_reload_external_edit(tmp_path):
+    path = tmp_path / 'config.ini'
+    path.write_text('[Network]\nuser_id = a\n', encoding='utf-8')
+    service = ConfigService(str(path))
+    changes = []
+    service.subscribe(lambda config, changed: changes.append(changed))
+    path.write_text('[Network]\nuser_id = b\npassword = p\n', encoding='utf-8')
+    assert service.reload() == {('Network', 'user_id'), ('Network', 'password')}
+    assert service.config.get('Network', 'user_id') == 'b'
+    assert service.reload() == set()
+    assert len(changes) == 1
+
+
+def test_reload_ignores_own_write_and_invalid_file(tmp_path):
+    path = tmp_path / 'config.ini'
+    service = ConfigService(str(path), debounce=60)
+    service.update({'Network': {'user_id': 'mine'}})
+    service.flush()
+    assert service.reload() == set()
+    path.write_text('not an ini file', encoding='utf-8')
+    assert service.reload() == set()
+    assert service.config.get('Network', 'user_id') == 'mine'
+
+
+def test_watch_picks_up_external_edit(tmp_path):
+    path = tmp_path / 'config.ini'
+    path.write_text('[Network]\nuser_id = a\n', encoding='utf-8')
+    service = ConfigService(str(path), poll_interval=0.05)
+    service.watch()
+    try:
+        time.sleep(0.1)
+        path.write_text('[Network]\nuser_id = watched\n', encoding='utf-8')
+        deadline = time.monotonic() + 5
+        while service.config.get('Network', 'user_id') != 'watched' and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert service.config.get('Network', 'user_id') == 'watched'
+    finally:
+        service.stop()
+
+
+def test_bound_method_subscriber_is_weak(tmp_path):
+    service = ConfigService(str(tmp_path / 'config.ini'))
+
+    class Client:
+        calls = 0
+
+        def on_change(self, config, changed):
+            Client.calls += 1
+
+    client = Client()
+    service.subscribe(client.on_change)
+    service.update({'Network': {'user_id': 'x'}}, save=False)
+    del client
+    service.update({'Network': {'user_id': 'y'}}, save=False)
+    assert Client.calls == 1
@@ -0,0 +1,108 @@
+import asyncio
+import time
+
+import pytest
+
+from campus_network.core.endpoints import EndpointPool, parse_endpoints
+
+
+@pytest.fixture
+def pool():
+    pool = EndpointPool(['a', 'b', 'c'], race_delay=0.05, failure_threshold=1, cooldown=60)
+    yield pool
+    pool.close()
+
+
+def sender(latencies, failing=()):
+    def send(url):
+        if url in failing:
+            raise OSError(f'{url} refused')
+        time.sleep(latencies.get(url, 0))
+        return url
+    return send
+
+
+def test_parse_endpoints():
+    assert parse_endpoints('http://a, http://b\nhttp://a') == ('http://a', 'http://b')
+
+
+def test_ordered_by_latency_then_config_order(pool):
+    assert pool.ordered() == ['a', 'b', 'c']
+    pool.record_success('c', 0.01)
+    pool.record_success('b', 0.05)
+    pool.record_success('a', 0.03)
+    assert pool.ordered() == ['c', 'a', 'b']
+    assert pool.preferred == 'c'
+
+
+def test_ordered_puts_unavailable_last(pool):
+    pool.record_success('a', 0.01)
+    pool.record_failure('a')
+    assert pool.ordered()[-1] == 'a'
+
+
+def test_ordered_moves_unmeasured_endpoint_forward():
+    pool = EndpointPool(['a', 'b', 'c', 'd'])
+    pool.record_success('a', 0.02)
+    pool.record_success('b', 0.01)
+    pool.record_success('c', 0.03)
+    # 未测得延迟的地址紧跟在最优地址之后，竞速时能得到测量
+    assert pool.ordered() == ['b', 'd', 'a', 'c']
+
+
+def test_race_prefers_fastest_response(pool):
+    url, result = pool.race(sender({'a': 0.3, 'b': 0.01, 'c': 0.01}), lambda r: True)
+    assert (url, result) == ('b', 'b')
+    assert pool.preferred == 'b'
+
+
+def test_race_fails_over_on_error(pool):
+    events = []
+    url, _ = pool.race(sender({}, failing={'a'}), lambda r: True, delay=5,
+                       on_hedge=lambda event, u: events.append(event))
+    assert url == 'b'
+    assert not pool.health()[0].available
+    # 出错后改发的请求不算对冲
+    assert events == []
+
+
+def test_race_reports_delay_triggered_requests_as_hedges(pool):
+    events = []
+    url, _ = pool.race(sender({'a': 0.3}), lambda r: True, delay=0.02,
+                       on_hedge=lambda event, u: events.append((event, u)))
+    assert url == 'b'
+    assert events == [('sent', 'b'), ('won', 'b')]
+
+
+def test_race_returns_last_invalid_result(pool):
+    url, result = pool.race(sender({}), lambda r: False, targets=['a', 'b'])
+    assert result in ('a', 'b')
+
+
+def test_race_raises_when_all_fail(pool):
+    with pytest.raises(OSError):
+        pool.race(sender({}, failing={'a', 'b', 'c'}), lambda r: True)
+
+
+def test_race_measures_unmeasured_endpoint(pool):
+    pool.record_success('a', 0.01)
+    pool.race(sender({'a': 0.01, 'b': 0.05}), lambda r: True)
+    time.sleep(0.1)
+    assert all(health.latency is not None for health in pool.health()[:2])
+
+
+def test_race_on_late_reports_slower_valid_result(pool):
+    late = []
+    pool.race(sender({'a': 0.1, 'b': 0.01}), lambda r: True, targets=['a', 'b'], delay=0.01,
+              on_late=lambda url, result, winner: late.append((url, winner)))
+    time.sleep(0.2)
+    assert late == [('a', 'b')]
+
+
+def test_race_async(pool):
+    async def send(url):
+        await asyncio.sleep({'a': 0.3}.get(url, 0.01))
+        return url
+
+    url, result = asyncio.run(pool.race_async(send, lambda r: True))
+    assert (url, result) == ('b', 'b')
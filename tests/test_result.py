@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from campus_network.core.result import PortalOutcome, PortalResult, classify_message
+
+
+@pytest.mark.parametrize('message, outcome', [
+    ('您已经在线了，不需要再次认证', PortalOutcome.ALREADY_ONLINE),
+    ('在线设备数量超过限制', PortalOutcome.DEVICE_LIMIT),
+    ('密码错误', PortalOutcome.BAD_CREDENTIALS),
+    ('账号已欠费', PortalOutcome.BAD_CREDENTIALS),
+    ('系统繁忙', PortalOutcome.PORTAL_ERROR),
+    ('', PortalOutcome.PORTAL_ERROR),
+])
+def test_classify_message(message, outcome):
+    assert classify_message(message) == outcome
+
+
+def test_parse_success():
+    result = PortalResult.parse(200, json.dumps({'result': 'success', 'message': '', 'userIndex': 'abc'}))
+    assert result.outcome == PortalOutcome.SUCCESS
+    assert result.online and result.portal_healthy and not result.retryable
+    assert result.data['userIndex'] == 'abc'
+
+
+def test_parse_failure_message():
+    result = PortalResult.parse(200, json.dumps({'result': 'fail', 'message': '密码错误'}, ensure_ascii=False))
+    assert result.outcome == PortalOutcome.BAD_CREDENTIALS
+    assert result.message == '密码错误'
+    assert result.portal_healthy and not result.retryable
+
+
+def test_parse_http_error():
+    result = PortalResult.parse(500, '<html>500</html>')
+    assert result.outcome == PortalOutcome.PORTAL_ERROR
+    assert not result.portal_healthy and result.retryable
+
+
+@pytest.mark.parametrize('text', ['{"result":"succ', '[1, 2]', ''])
+def test_parse_malformed(text):
+    result = PortalResult.parse(200, text)
+    assert result.malformed
+    assert result.outcome == PortalOutcome.PORTAL_ERROR
+    assert not result.portal_healthy
+
+
+@pytest.mark.parametrize('message, expected', [(123, '123'), ({'code': 1}, "{'code': 1}"), (None, '未知错误')])
+def test_parse_non_string_message(message, expected):
+    result = PortalResult.parse(200, json.dumps({'result': 'fail', 'message': message}))
+    assert result.message == expected
+    assert result.outcome == PortalOutcome.PORTAL_ERROR
@@ -0,0 +1,67 @@
+import random
+import time
+
+from campus_network.core.result import PortalResult
+from campus_network.core.retry import CircuitBreaker, RetryPolicy
+
+
+def test_backoff_is_bounded():
+    policy = RetryPolicy(max_attempts=10, base_delay=1.0, max_delay=4.0, rng=random.Random(1))
+    for attempt in range(1, 10):
+        ceiling = min(4.0, 2 ** (attempt - 1))
+        assert all(0 <= policy.backoff(attempt) <= ceiling for _ in range(50))
+
+
+def test_next_delay_stops_at_max_attempts():
+    policy = RetryPolicy(max_attempts=3, base_delay=0.01, deadline=0)
+    started = time.monotonic()
+    assert policy.next_delay(1, started) is not None
+    assert policy.next_delay(2, started) is not None
+    assert policy.next_delay(3, started) is None
+
+
+def test_next_delay_respects_deadline():
+    policy = RetryPolicy(max_attempts=10, base_delay=1.0, deadline=5.0)
+    assert policy.next_delay(1, time.monotonic() - 10) is None
+
+
+def test_should_retry():
+    policy = RetryPolicy(no_retry_messages='维护中, 系统升级')
+    assert policy.should_retry(PortalResult.parse(500, ''))
+    assert policy.should_retry(PortalResult.parse(200, '{"result":"fail","message":"系统繁忙"}'))
+    assert not policy.should_retry(PortalResult.parse(200, '{"result":"fail","message":"密码错误"}'))
+    assert not policy.should_retry(PortalResult.parse(200, '{"result":"fail","message":"门户维护中"}'))
+
+
+def test_breaker_opens_after_threshold():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert 0 < breaker.retry_after() <= 60
+
+
+def test_breaker_half_open_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    with breaker.attempt():
+        # 冷却结束后只放行一次试探请求
+        assert breaker.allow()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert not breaker.allow()
+        breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_breaker_unfinished_trial_counts_as_failure():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    with breaker.attempt():
+        assert breaker.allow()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()